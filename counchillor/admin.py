@@ -1,3 +1,5 @@
 from django.contrib import admin
+from .models import CounselSession
 
 # Register your models here.
+admin.site.register(CounselSession)
@@ -1,6 +1,20 @@
+import os
 from django.apps import AppConfig
 
 
 class CounchillorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'counchillor'
+
+    def ready(self):
+        from llm.prompts import prompts
+        prompts.register(
+            'counselling',
+            os.path.join(os.path.dirname(__file__), 'prompts', 'counsel_prompt.txt'),
+            fields=['counsel_content'],
+        )
+        prompts.register(
+            'counselling_session',
+            os.path.join(os.path.dirname(__file__), 'prompts', 'counsel_session_prompt.txt'),
+            fields=['summary', 'recent_turns', 'counsel_content'],
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from counchillor.sessions import prune_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "만료된 상담 세션과 대화 기록을 일괄 삭제합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="한 번에 삭제할 세션 수")
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_sessions(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired counselling sessions."))
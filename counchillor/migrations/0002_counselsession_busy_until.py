@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('counchillor', '0001_counselsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='counselsession',
+            name='busy_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
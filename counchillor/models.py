@@ -1,3 +1,37 @@
+import uuid
 from django.db import models
 
-# Create your models here.
+
+class CounselSession(models.Model):
+    """여러 턴으로 이어지는 상담 세션
+
+    오래된 턴은 summary(모델이 매 턴 갱신하는 누적 요약)로 대신하고,
+    최근 턴만 CounselTurn으로 남깁니다.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    summary = models.TextField(blank=True, default='')
+    turn_count = models.PositiveIntegerField(default=0)
+    # 모델 답변을 기다리는 턴이 있으면 그 턴의 점유 만료 시각 (같은 세션의 동시 요청을 호출 전에 거절)
+    busy_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.turn_count} turns)"
+
+
+class CounselTurn(models.Model):
+    class Role(models.TextChoices):
+        USER = 'u', 'user'
+        ASSISTANT = 'a', 'assistant'
+
+    session = models.ForeignKey(CounselSession, on_delete=models.CASCADE, related_name='turns')
+    index = models.PositiveIntegerField()
+    role = models.CharField(max_length=1, choices=Role.choices)
+    content = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'index'], name='unique_counsel_turn_index'),
+        ]
@@ -0,0 +1,128 @@
+"""
+다중 턴 상담 세션
+
+모델에 보내는 맥락은 누적 요약 + 토큰 예산(LLM_SESSION_CONTEXT_TOKENS) 안에 들어가는 최근 턴뿐이므로
+대화가 길어져도 턴마다 요청 크기와 지연 시간이 일정합니다.
+요약은 모델이 답변과 함께 돌려주므로 요약을 위한 추가 호출은 없습니다.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import CounselSession, CounselTurn
+
+SPEAKERS = {CounselTurn.Role.USER: '사용자', CounselTurn.Role.ASSISTANT: 'chill guy'}
+
+
+class SessionConflict(Exception):
+    """같은 세션에 동시에 두 턴이 들어옴"""
+
+
+def estimate_tokens(text):
+    """토큰 수 근사치 (ASCII는 4글자당 1토큰, 한글 등은 글자당 1토큰)"""
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def new_expiry():
+    return timezone.now() + timedelta(seconds=settings.LLM_SESSION_TTL)
+
+
+def create_session():
+    return CounselSession.objects.create(expires_at=new_expiry())
+
+
+def load_session(session_id):
+    """만료되지 않은 세션과 최근 턴(오래된 순)을 반환합니다. 없으면 (None, [])"""
+    session = CounselSession.objects.filter(pk=session_id, expires_at__gt=timezone.now()).first()
+    if session is None:
+        return None, []
+    turns = list(
+        session.turns.order_by('-index')
+        .values_list('role', 'content')[:settings.LLM_SESSION_KEEP_TURNS]
+    )
+    turns.reverse()
+    return session, turns
+
+
+def turn_lease():
+    """한 턴이 세션을 점유하는 최대 시간 (재시도를 포함한 모델 호출 시간). 요청이 중간에 죽어도 이후 풀림"""
+    seconds = settings.LLM_CONNECT_TIMEOUT + settings.LLM_READ_TIMEOUT * (settings.LLM_MAX_RETRIES + 1)
+    return timedelta(seconds=seconds + settings.LLM_QUEUE_TIMEOUT)
+
+
+def begin_turn(session):
+    """모델을 호출하기 전에 세션을 점유합니다. 다른 턴이 처리 중이거나 먼저 저장됐으면 SessionConflict"""
+    now = timezone.now()
+    claimed = (
+        CounselSession.objects.filter(pk=session.pk, turn_count=session.turn_count)
+        .filter(Q(busy_until__isnull=True) | Q(busy_until__lte=now))
+        .update(busy_until=now + turn_lease())
+    )
+    if not claimed:
+        raise SessionConflict()
+
+
+def end_turn(session):
+    """저장하지 않고 끝난 턴(호출 실패·고민이 아닌 내용)의 점유를 풉니다"""
+    CounselSession.objects.filter(pk=session.pk, turn_count=session.turn_count).update(busy_until=None)
+
+
+def build_context(summary, turns, budget):
+    """요약과, 예산 안에 들어가는 가장 최근 턴들로 맥락 문자열 (summary, recent_turns)을 만듭니다"""
+    summary = summary or '(없음)'
+    remaining = budget - estimate_tokens(summary)
+    lines = []
+    for role, content in reversed(turns):
+        line = f"{SPEAKERS[role]}: {content}"
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            break
+        lines.append(line)
+        remaining -= cost
+    lines.reverse()
+    return summary, '\n'.join(lines) or '(없음)'
+
+
+def compact_reply(reply):
+    """저장할 답변 텍스트 (요약 등 나머지 필드는 버림)"""
+    return ' '.join(str(reply.get(field, '')) for field in ('message', 'advice')).strip()
+
+
+def save_turn(session, counsel_content, reply, summary):
+    """사용자 턴과 답변을 저장하고 요약·만료 시각을 갱신합니다.
+
+    세션을 읽은 뒤 다른 턴이 먼저 저장됐으면 SessionConflict.
+    보관 개수(LLM_SESSION_KEEP_TURNS)를 넘는 오래된 턴은 요약에 포함되어 있으므로 삭제합니다.
+    """
+    index = session.turn_count
+    with transaction.atomic():
+        updated = CounselSession.objects.filter(pk=session.pk, turn_count=index).update(
+            turn_count=F('turn_count') + 2,
+            summary=summary[:settings.LLM_SESSION_SUMMARY_CHARS],
+            expires_at=new_expiry(),
+            busy_until=None,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise SessionConflict()
+        CounselTurn.objects.bulk_create([
+            CounselTurn(session=session, index=index, role=CounselTurn.Role.USER, content=counsel_content),
+            CounselTurn(session=session, index=index + 1, role=CounselTurn.Role.ASSISTANT, content=compact_reply(reply)),
+        ])
+        CounselTurn.objects.filter(session=session, index__lt=index + 2 - settings.LLM_SESSION_KEEP_TURNS).delete()
+
+
+def prune_expired_sessions(batch_size=1000):
+    """만료된 세션과 턴을 배치 단위로 삭제하고 삭제한 세션 수를 반환합니다"""
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(CounselSession.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            CounselTurn.objects.filter(session_id__in=ids).delete()
+            CounselSession.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
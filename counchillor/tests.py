@@ -1,3 +1,196 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import timedelta
+from io import StringIO
+import httpx
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from llm.resilience import Bulkhead, UpstreamGuard
+from llm.tests import claude_reply, claude_stream, make_breaker, patch_upstream
+from .models import CounselSession, CounselTurn
+from .sessions import build_context, estimate_tokens
 
-# Create your tests here.
+
+class CounsellingTests(TestCase):
+    def post(self, data):
+        return self.client.post('/api/counchillor/counselling/', data, content_type='application/json')
+
+    def test_counselling(self):
+        reply = {'message': 'chill', 'advice': '쉬어요', 'chillness_level': 7}
+        with patch_upstream(lambda request: httpx.Response(200, json=claude_reply(reply))):
+            response = self.post({'counsel_content': '고민이 있어요'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), reply)
+
+    def test_empty_content(self):
+        response = self.post({})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'empty_content')
+
+    def test_malformed_reply(self):
+        bad = {'content': [{'type': 'text', 'text': 'not json'}]}
+        with patch_upstream(lambda request: httpx.Response(200, json=bad)):
+            response = self.post({'counsel_content': '고민'})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['error'], 'api_call_fail')
+
+    def test_circuit_open(self):
+        breaker = make_breaker(min_calls=1)
+        breaker.record(True, elapsed=0)
+        guard = UpstreamGuard(Bulkhead(5, 5, 1), breaker)
+        with patch_upstream(lambda request: self.fail('upstream called'), guard=guard):
+            response = self.post({'counsel_content': '고민'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['error'], 'upstream_unavailable')
+        self.assertIn('Retry-After', response)
+
+
+def parse_events(body):
+    """SSE 본문을 (event, data) 목록으로 파싱합니다"""
+    events = []
+    for block in body.decode().strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class CounsellingStreamTests(TestCase):
+    reply = {'message': 'chill', 'advice': '쉬어요', 'chillness_level': 7}
+
+    def chunks(self):
+        text = json.dumps(self.reply, ensure_ascii=False)
+        return [text[:10], text[10:25], text[25:]]
+
+    async def test_stream_events(self):
+        with patch_upstream(lambda request: httpx.Response(200, content=claude_stream(self.chunks()))):
+            response = await self.async_client.post(
+                '/api/counchillor/counselling/',
+                {'counsel_content': '고민이 있어요'},
+                content_type='application/json',
+                headers={'Accept': 'text/event-stream'},
+            )
+            self.assertEqual(response['Content-Type'], 'text/event-stream; charset=utf-8')
+            body = b''.join([chunk async for chunk in response.streaming_content])
+
+        events = parse_events(body)
+        self.assertEqual([data['text'] for event, data in events if event == 'token'], self.chunks())
+        self.assertEqual(events[-1], ('result', self.reply))
+
+    async def test_stream_error_event(self):
+        with patch_upstream(lambda request: httpx.Response(200, content=claude_stream(['not json']))):
+            response = await self.async_client.post(
+                '/api/counchillor/counselling/?stream=1',
+                {'counsel_content': '고민'},
+                content_type='application/json',
+            )
+            body = b''.join([chunk async for chunk in response.streaming_content])
+
+        event, data = parse_events(body)[-1]
+        self.assertEqual(event, 'error')
+        self.assertEqual(data['error'], 'api_call_fail')
+
+
+class CounselSessionTests(TestCase):
+    def setUp(self):
+        self.prompts = []
+
+    def handler(self, request):
+        body = json.loads(request.content)
+        self.prompts.append(body['messages'][0]['content'])
+        turn = len(self.prompts)
+        return httpx.Response(200, json=claude_reply({
+            'message': f'답변 {turn}', 'advice': '쉬어요', 'chillness_level': 7, 'summary': f'요약 {turn}',
+        }))
+
+    def post(self, content, session_id=None):
+        url = '/api/counchillor/counselling/sessions/'
+        if session_id:
+            url += f'{session_id}/'
+        return self.client.post(url, {'counsel_content': content}, content_type='application/json')
+
+    def test_conversation(self):
+        with patch_upstream(self.handler):
+            first = self.post('회사 고민')
+            session_id = first.json()['session_id']
+            second = self.post('그래도 걱정돼요', session_id)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('summary', first.json())
+        self.assertEqual(second.json()['message'], '답변 2')
+        self.assertIn('요약 1', self.prompts[1])
+        self.assertIn('사용자: 회사 고민', self.prompts[1])
+        self.assertIn('chill guy: 답변 1 쉬어요', self.prompts[1])
+
+        session = CounselSession.objects.get(pk=session_id)
+        self.assertEqual((session.summary, session.turn_count), ('요약 2', 4))
+
+    @override_settings(LLM_SESSION_CONTEXT_TOKENS=60, LLM_SESSION_KEEP_TURNS=6)
+    def test_context_stays_bounded(self):
+        with patch_upstream(self.handler):
+            session_id = self.post('첫 고민').json()['session_id']
+            for turn in range(30):
+                self.assertEqual(self.post(f'고민 {turn} ' + '길게 ' * 5, session_id).status_code, 200)
+
+        self.assertLess(max(map(len, self.prompts)) - min(map(len, self.prompts[6:])), 20)
+        self.assertNotIn('첫 고민', self.prompts[-1])
+        self.assertEqual(CounselTurn.objects.filter(session_id=session_id).count(), 6)
+
+    def test_missing_or_expired_session(self):
+        self.assertEqual(self.post('고민', uuid.uuid4()).status_code, 404)
+        expired = CounselSession.objects.create(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.post('고민', expired.pk)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['error'], 'session_not_found')
+
+    def test_invalid_content(self):
+        response = self.post(['고민'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'invalid_content')
+
+    def test_busy_session_is_rejected_before_upstream(self):
+        with patch_upstream(self.handler):
+            session_id = self.post('회사 고민').json()['session_id']
+            CounselSession.objects.filter(pk=session_id).update(busy_until=timezone.now() + timedelta(minutes=1))
+            response = self.post('그래도 걱정돼요', session_id)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['error'], 'session_conflict')
+            self.assertEqual(len(self.prompts), 1)
+
+            # 점유가 만료되면(요청이 중간에 죽은 경우) 다시 받음
+            CounselSession.objects.filter(pk=session_id).update(busy_until=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(self.post('그래도 걱정돼요', session_id).status_code, 200)
+        self.assertIsNone(CounselSession.objects.get(pk=session_id).busy_until)
+
+    def test_failed_turn_releases_session(self):
+        with patch_upstream(self.handler):
+            session_id = self.post('회사 고민').json()['session_id']
+        with patch_upstream(lambda request: httpx.Response(200, json=claude_reply('not json'))):
+            self.assertEqual(self.post('그래도 걱정돼요', session_id).status_code, 500)
+        session = CounselSession.objects.get(pk=session_id)
+        self.assertEqual((session.busy_until, session.turn_count), (None, 2))
+
+    def test_wrong_content_is_not_stored(self):
+        reply = {'error': 'wrong_content', 'reason': '고민을 알려주세요'}
+        with patch_upstream(lambda request: httpx.Response(200, json=claude_reply(reply))):
+            response = self.post('asdf')
+        self.assertEqual(response.json()['error'], 'wrong_content')
+        self.assertFalse(CounselTurn.objects.exists())
+
+    def test_build_context(self):
+        turns = [('u', '첫 번째'), ('a', '답변'), ('u', '두 번째')]
+        self.assertEqual(build_context('', turns, 1000), ('(없음)', '사용자: 첫 번째\nchill guy: 답변\n사용자: 두 번째'))
+        budget = estimate_tokens('요약') + estimate_tokens('사용자: 두 번째')
+        self.assertEqual(build_context('요약', turns, budget), ('요약', '사용자: 두 번째'))
+
+    def test_prune_expired_sessions(self):
+        now = timezone.now()
+        live = CounselSession.objects.create(expires_at=now + timedelta(days=1))
+        for _ in range(3):
+            expired = CounselSession.objects.create(expires_at=now - timedelta(days=1))
+            CounselTurn.objects.create(session=expired, index=0, role='u', content='x')
+        CounselTurn.objects.create(session=live, index=0, role='u', content='x')
+
+        call_command('prune_counsel_sessions', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(list(CounselSession.objects.values_list('pk', flat=True)), [live.pk])
+        self.assertEqual(CounselTurn.objects.count(), 1)
@@ -1,6 +1,8 @@
 from django.urls import path, include
-from .views import counselling
+from .views import counselling, counsellingSession
 
 urlpatterns = [
     path("counselling/", counselling),
+    path("counselling/sessions/", counsellingSession),
+    path("counselling/sessions/<uuid:session_id>/", counsellingSession),
 ]
\ No newline at end of file
@@ -1,83 +1,181 @@
-from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework import status
-import requests
-import os
-import json
+from llm.cache import make_key
+from llm.client import get_client, build_payload, parse_json_reply, parse_json_text, LLMError
+from llm.http import read_request_data, json_response, unavailable_response, event_stream_response, sse_event, wants_event_stream
+from llm.prompts import prompts
+from llm.resilience import UpstreamUnavailable
+from llm.singleflight import single_flight
+from .sessions import SessionConflict, begin_turn, build_context, create_session, end_turn, load_session, save_turn
 
 # Create your views here.
-@api_view(['POST'])
-def counselling(request):
-    counsel_content = request.data.get('counsel_content')
+@csrf_exempt
+@require_POST
+async def counselling(request):
+    counsel_content = read_request_data(request).get('counsel_content')
     
     if not counsel_content: 
-        return Response({
+        return json_response({
                 'error': 'empty_content',
                 'reason': 'counsel_content is required'
             }, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # 프롬프트 파일을 읽어오기
-    prompt_path = os.path.join(os.path.dirname(__file__), 'prompts', 'counsel_prompt.txt') 
+    # 프롬프트에 상담 내용을 삽입 (템플릿은 시작 시 로드, 파일이 바뀌면 다시 로드)
+    template = prompts.get('counselling')
+    system, prompt = template.render_parts(counsel_content=counsel_content)
+
+    # 스트리밍 모드: 토큰을 도착하는 대로 보내고 마지막에 파싱된 JSON을 result 이벤트로 전송
+    if wants_event_stream(request):
+        return event_stream_response(stream_counselling(system, prompt))
+
+    # Claude API 호출 (공용 비동기 클라이언트), 동시에 들어온 같은 요청은 한 번만 호출
+    flight_key = make_key('counselling', counsel_content, template.version, settings.LLM_MODEL)
     try:
-        with open(prompt_path, 'r', encoding='utf-8') as file: 
-            prompt_template = file.read()
-    except Exception as e:
-        return Response(
+        response_json = await single_flight.do(
+            flight_key, lambda: get_client().create_message(build_payload(prompt, system=system))
+        )
+    except UpstreamUnavailable as e:
+        return unavailable_response({'error': 'upstream_unavailable', 'reason': str(e)}, e)
+    except LLMError:
+        return json_response(
             {
-                'error': 'read_prompt',
-                'reason': 'Failed to read prompt'
+                'error': 'api_call_fail',
+                'reason': 'Failed to get recommendation from Claude API'
             }, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    # 프롬프트에 상담 내용을 삽입 
-    prompt = prompt_template.format(counsel_content=counsel_content)
+    try:
+        response_content = parse_json_reply(response_json)
+        return json_response(response_content, status=status.HTTP_200_OK)
+    except LLMError as e:
+        return json_response(
+            {
+                'error': 'api_call_fail',
+                'reason': str(e)
+            },
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
 
-    # Claude API 호출
-    api_url = os.environ.get('X_API_URL') 
 
-    headers = { 
-        'x-api-key': os.environ.get('X_API_KEY'), 
-        'content-type': 'application/json',
-        'anthropic-version': '2023-06-01',
-        } 
-    
-    post_data = {
-            'model': 'claude-3-5-sonnet-20241022',
-            'max_tokens': 1024,
-            'messages': [
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-        }
-    
-    response = requests.post(
-        url = api_url, 
-        json = post_data,
-        headers = headers
-    )
+async def stream_counselling(system, prompt):
+    """token 이벤트(텍스트 조각)를 보낸 뒤 result 또는 error 이벤트로 끝나는 SSE 스트림"""
+    chunks = []
+    try:
+        async for text in get_client().stream_message(build_payload(prompt, system=system)):
+            chunks.append(text)
+            yield sse_event('token', {'text': text})
+        result = parse_json_text(''.join(chunks))
+    except UpstreamUnavailable as e:
+        yield sse_event('error', {'error': 'upstream_unavailable', 'reason': str(e)})
+        return
+    except LLMError as e:
+        yield sse_event('error', {'error': 'api_call_fail', 'reason': str(e)})
+        return
+    yield sse_event('result', result)
 
-    if response.status_code == 200: 
-        try:
-            response_content = json.loads(response.json()["content"][0]["text"])
-            return Response(response_content, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response(
-                {
-                    'error': 'api_call_fail',
-                    'reason': e
+
+@csrf_exempt
+@require_POST
+async def counsellingSession(request, session_id=None):
+    """세션 상담: session_id가 없으면 새 세션을 만들고 첫 턴을 처리합니다"""
+    counsel_content = read_request_data(request).get('counsel_content')
+
+    if not counsel_content:
+        return json_response({
+                'error': 'empty_content',
+                'reason': 'counsel_content is required'
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not isinstance(counsel_content, str):
+        return json_response({
+                'error': 'invalid_content',
+                'reason': 'counsel_content must be a string'
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(counsel_content) > settings.LLM_SESSION_MAX_TURN_CHARS:
+        return json_response({
+                'error': 'content_too_long',
+                'reason': f'counsel_content must be at most {settings.LLM_SESSION_MAX_TURN_CHARS} characters'
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if session_id is None:
+        session, turns = await sync_to_async(create_session)(), []
+    else:
+        session, turns = await sync_to_async(load_session)(session_id)
+        if session is None:
+            return json_response({
+                    'error': 'session_not_found',
+                    'reason': 'Session does not exist or has expired'
                 },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )    
-    else: 
-        return Response(
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # 같은 세션의 다른 턴이 처리 중이면 유료 모델 호출 전에 거절
+        try:
+            await sync_to_async(begin_turn)(session)
+        except SessionConflict:
+            return session_conflict_response()
+
+    try:
+        return await answer_turn(session, turns, counsel_content)
+    finally:
+        # 저장된 턴은 save_turn이 이미 점유를 풀었으므로 아무것도 바뀌지 않음
+        if session_id is not None:
+            await sync_to_async(end_turn)(session)
+
+
+async def answer_turn(session, turns, counsel_content):
+    # 누적 요약 + 토큰 예산 안의 최근 턴만 맥락으로 보냄
+    summary, recent_turns = build_context(session.summary, turns, settings.LLM_SESSION_CONTEXT_TOKENS)
+    system, prompt = prompts.get('counselling_session').render_parts(
+        summary=summary, recent_turns=recent_turns, counsel_content=counsel_content)
+
+    try:
+        response_json = await get_client().create_message(build_payload(prompt, system=system))
+        reply = parse_json_reply(response_json)
+    except UpstreamUnavailable as e:
+        return unavailable_response({'error': 'upstream_unavailable', 'reason': str(e)}, e)
+    except LLMError as e:
+        return json_response(
             {
                 'error': 'api_call_fail',
-                'reason': 'Failed to get recommendation from Claude API'
-            }, 
+                'reason': str(e)
+            },
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    if not isinstance(reply, dict):
+        return json_response(
+            {
+                'error': 'api_call_fail',
+                'reason': 'Model reply is not a JSON object'
+            },
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+    # 고민이 아니라고 판단한 답변은 대화에 남기지 않음
+    new_summary = reply.pop('summary', None)
+    if 'error' not in reply:
+        try:
+            await sync_to_async(save_turn)(session, counsel_content, reply, str(new_summary or session.summary))
+        except SessionConflict:
+            return session_conflict_response()
+    return json_response(dict(reply, session_id=str(session.pk)), status=status.HTTP_200_OK)
+
+
+def session_conflict_response():
+    return json_response({
+            'error': 'session_conflict',
+            'reason': 'Another message for this session is being processed'
+        },
+        status=status.HTTP_409_CONFLICT
+    )
@@ -0,0 +1,144 @@
+"""
+LLM 응답 캐시
+
+메모리 LRU 계층 → DB(SQLite) 계층 → 업스트림 순으로 조회합니다.
+DB 계층은 워커 간에 공유되고 재시작 후에도 유지됩니다.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from .models import CachedResponse
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts):
+    """여러 부분을 하나의 sha256 키로 만듭니다"""
+    raw = json.dumps(parts, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def normalize_history(viewing_history):
+    """시청 기록을 순서·공백·대소문자에 무관한 정렬된 튜플로 정규화합니다"""
+    if isinstance(viewing_history, str):
+        items = viewing_history.replace('\n', ',').split(',')
+    elif isinstance(viewing_history, (list, tuple)):
+        items = viewing_history
+    else:
+        items = [viewing_history]
+    titles = {' '.join(str(item).split()).casefold() for item in items}
+    titles.discard('')
+    return tuple(sorted(titles))
+
+
+class ResponseCache:
+    def __init__(self, namespace, max_entries, ttl):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'memoryHits': 0, 'dbHits': 0, 'misses': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember(self, key, data, expires):
+        with self._lock:
+            self._entries[key] = (expires, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self._stats['memoryHits'] += 1
+            return entry[1]
+
+    def get(self, key):
+        """캐시된 응답(dict)을 반환합니다. 없거나 만료되면 None"""
+        data = self._get_memory(key)
+        if data is not None:
+            return data
+        try:
+            row = (CachedResponse.objects
+                   .filter(key=key, expires_at__gt=timezone.now())
+                   .values_list('payload', 'expires_at')
+                   .first())
+        except DatabaseError as e:
+            # 캐시 장애(SQLite 잠금 등)는 요청 실패가 아니라 미스로 처리
+            logger.warning(f"Response cache read failed: {e}")
+            row = None
+        if row is None:
+            self._count('misses')
+            return None
+        data = json.loads(row[0])
+        self._remember(key, data, row[1].timestamp())
+        self._count('dbHits')
+        return data
+
+    def set(self, key, data):
+        expires_at = timezone.now() + timedelta(seconds=self.ttl)
+        try:
+            CachedResponse.objects.update_or_create(
+                key=key,
+                defaults={
+                    'namespace': self.namespace,
+                    'payload': json.dumps(data, ensure_ascii=False),
+                    'expires_at': expires_at,
+                },
+            )
+        except DatabaseError as e:
+            logger.warning(f"Response cache write failed: {e}")
+        self._remember(key, data, expires_at.timestamp())
+
+    async def aget(self, key):
+        data = self._get_memory(key)
+        if data is not None:
+            return data
+        return await sync_to_async(self.get)(key)
+
+    async def aset(self, key, data):
+        await sync_to_async(self.set)(key, data)
+
+    def clear(self):
+        """메모리 계층과 카운터를 비웁니다 (DB 계층은 유지)"""
+        with self._lock:
+            self._entries.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, memoryEntries=len(self._entries))
+        lookups = stats['memoryHits'] + stats['dbHits'] + stats['misses']
+        stats['hitRate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else None
+        return stats
+
+
+def prune_expired():
+    """만료된 DB 캐시 행을 삭제하고 삭제 개수를 반환합니다"""
+    deleted, _ = CachedResponse.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+recommendation_cache = ResponseCache(
+    'movie_recommendation',
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl=settings.LLM_CACHE_TTL,
+)
@@ -0,0 +1,240 @@
+"""
+Claude API 공용 비동기 클라이언트
+
+이벤트 루프마다 httpx.AsyncClient 하나를 공유해 keep-alive 연결을 재사용하고,
+연결/응답 타임아웃과 제한된 횟수의 재시도를 적용합니다.
+"""
+import asyncio
+import json
+import logging
+import random
+import weakref
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_VERSION = '2023-06-01'
+# 재시도해도 안전한 응답 코드 (요청이 처리되지 않았거나 일시적인 과부하)
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504, 529}
+# 요청이 업스트림에 도달하기 전에 실패한 경우만 재시도 (응답 대기 중 타임아웃은 재시도하지 않음)
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+
+
+class LLMError(Exception):
+    """업스트림 모델 호출 실패"""
+
+    def __init__(self, message, status_code=None):
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class LLMClient:
+    def __init__(self, api_url, api_key, *, connect_timeout=5.0, read_timeout=60.0,
+                 max_retries=2, retry_backoff=0.5, max_connections=100, transport=None, guard=None):
+        self.api_url = api_url
+        self.guard = guard
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._client = httpx.AsyncClient(
+            headers={
+                'x-api-key': api_key or '',
+                'content-type': 'application/json',
+                'anthropic-version': ANTHROPIC_VERSION,
+            },
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    @classmethod
+    def from_settings(cls):
+        from .resilience import upstream_guard
+        return cls(
+            settings.LLM_API_URL,
+            settings.LLM_API_KEY,
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+            read_timeout=settings.LLM_READ_TIMEOUT,
+            max_retries=settings.LLM_MAX_RETRIES,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            guard=upstream_guard,
+        )
+
+    async def create_message(self, payload):
+        """Messages API를 호출하고 응답 JSON(dict)을 반환합니다. 실패하면 LLMError"""
+        if not self.api_url:
+            raise LLMError("X_API_URL is not configured.")
+        if self.guard is None:
+            return await self._create_message(payload)
+        async with self.guard.call():
+            return await self._create_message(payload)
+
+    async def _create_message(self, payload):
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._client.post(self.api_url, json=payload)
+            except RETRY_EXCEPTIONS as e:
+                error = LLMError(f"Upstream connection failed: {e!r}")
+            except httpx.HTTPError as e:
+                raise LLMError(f"Upstream request failed: {e!r}")
+            else:
+                if response.status_code == 200:
+                    try:
+                        response_json = response.json()
+                    except ValueError:
+                        raise LLMError("Upstream returned invalid JSON.", response.status_code)
+                    if isinstance(response_json, dict):
+                        log_usage(response_json.get('usage'))
+                    return response_json
+                error = LLMError(f"Upstream returned {response.status_code}.", response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    raise error
+            if attempt < self.max_retries:
+                await self._backoff(attempt, error)
+        raise error
+
+    async def stream_message(self, payload):
+        """Messages API를 스트리밍 모드로 호출하고 텍스트 조각을 도착하는 대로 yield합니다.
+
+        첫 조각을 받기 전의 실패만 재시도합니다 (이미 보낸 조각이 중복되지 않도록). 실패하면 LLMError
+        """
+        if not self.api_url:
+            raise LLMError("X_API_URL is not configured.")
+        if self.guard is None:
+            async for text in self._stream_message(payload):
+                yield text
+            return
+        async with self.guard.call():
+            async for text in self._stream_message(payload):
+                yield text
+
+    async def _stream_message(self, payload):
+        payload = dict(payload, stream=True)
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                async with self._client.stream('POST', self.api_url, json=payload) as response:
+                    if response.status_code == 200:
+                        async for text in _iter_text_deltas(response):
+                            started = True
+                            yield text
+                        return
+                    error = LLMError(f"Upstream returned {response.status_code}.", response.status_code)
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        raise error
+            except RETRY_EXCEPTIONS as e:
+                error = LLMError(f"Upstream connection failed: {e!r}")
+                if started:
+                    raise error
+            except httpx.HTTPError as e:
+                raise LLMError(f"Upstream request failed: {e!r}")
+            if attempt < self.max_retries:
+                await self._backoff(attempt, error)
+        raise error
+
+    async def _backoff(self, attempt, error):
+        delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+        logger.warning(f"{error} Retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+        await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+async def _iter_text_deltas(response):
+    """Messages API 스트림(SSE)에서 텍스트 조각만 꺼냅니다"""
+    async for line in response.aiter_lines():
+        if not line.startswith('data:'):
+            continue
+        try:
+            data = json.loads(line[5:])
+        except ValueError:
+            raise LLMError("Upstream sent a malformed stream event.")
+        kind = data.get('type')
+        if kind == 'message_start':
+            log_usage(data.get('message', {}).get('usage'))
+        elif kind == 'content_block_delta' and data['delta'].get('type') == 'text_delta':
+            yield data['delta']['text']
+        elif kind == 'message_stop':
+            return
+        elif kind == 'error':
+            raise LLMError(f"Upstream stream error: {data.get('error')}")
+    raise LLMError("Upstream stream ended before message_stop.")
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+async def _close_when_loop_stops(loop, client):
+    # 루프가 끝날 때(asyncio.run·async_to_sync가 남은 태스크를 취소할 때) 연결을 닫음
+    try:
+        await loop.create_future()
+    finally:
+        if _clients.get(loop) is client:
+            del _clients[loop]
+        await client.aclose()
+
+
+def get_client():
+    """현재 이벤트 루프에서 공유하는 LLMClient를 반환합니다.
+
+    ASGI 워커는 이벤트 루프가 하나이므로 워커 전체가 연결 풀 하나를 공유합니다.
+    WSGI에서는 요청마다 새 루프(async_to_sync)가 만들어지므로 연결 풀을 공유하지 못하고,
+    클라이언트는 요청이 끝나 루프가 멈출 때 닫힙니다.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = LLMClient.from_settings()
+        # 태스크가 GC되지 않도록 클라이언트에 보관
+        client._closer = loop.create_task(_close_when_loop_stops(loop, client))
+    return client
+
+
+def build_payload(prompt, max_tokens=1024, system=None):
+    """Messages API 요청 본문을 만듭니다.
+
+    system(프롬프트의 고정 앞부분)이 있으면 cache_control을 붙여 업스트림 프롬프트 캐시에 올리고,
+    요청마다 달라지는 부분(prompt)만 user 메시지로 보냅니다.
+    """
+    payload = {
+        'model': settings.LLM_MODEL,
+        'max_tokens': max_tokens,
+        'messages': [
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ],
+    }
+    if system:
+        payload['system'] = [{'type': 'text', 'text': system, 'cache_control': {'type': 'ephemeral'}}]
+    return payload
+
+
+def log_usage(usage):
+    """응답의 토큰 사용량(프롬프트 캐시 읽기/생성 포함)을 기록합니다"""
+    if not usage:
+        return
+    logger.info(
+        f"LLM usage: input={usage.get('input_tokens', 0)} "
+        f"cache_read={usage.get('cache_read_input_tokens', 0)} "
+        f"cache_creation={usage.get('cache_creation_input_tokens', 0)} "
+        f"output={usage.get('output_tokens', 0)}"
+    )
+
+
+def parse_json_reply(response_json):
+    """모델 응답의 첫 텍스트 블록을 JSON으로 파싱합니다. 형식이 다르면 LLMError"""
+    try:
+        return json.loads(response_json["content"][0]["text"])
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise LLMError(f"Failed to parse model reply: {e!r}")
+
+
+def parse_json_text(text):
+    """스트리밍으로 모은 응답 텍스트를 JSON으로 파싱합니다. 형식이 다르면 LLMError"""
+    try:
+        return json.loads(text)
+    except ValueError as e:
+        raise LLMError(f"Failed to parse model reply: {e!r}")
@@ -0,0 +1,205 @@
+"""
+로컬 가짜 Messages API 서버 (부하 테스트·통합 테스트용, Django 불필요)
+
+    python -m llm.fake_upstream --port 8765 --latency-ms 800 --error-rate 0.05
+    X_API_URL=http://127.0.0.1:8765/v1/messages python manage.py runserver
+
+지연 시간은 로그정규분포(중앙값 --latency-ms, 퍼짐 --latency-sigma)를 따르고,
+요청 본문에 "stream": true 가 있으면 SSE로 응답을 나눠 보냅니다.
+요청 형식(system 블록, cache_control 등)을 검사하고, cache_control이 붙은 블록은
+처음 본 내용이면 cache_creation, 다시 보면 cache_read 토큰으로 usage에 보고합니다.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = {'message': 'fake reply', 'advice': 'take a break', 'chillness_level': 5, 'movies': []}
+
+
+class FakeUpstreamConfig:
+    def __init__(self, latency_ms=0.0, latency_sigma=0.0, error_rate=0.0, error_status=529,
+                 malformed_rate=0.0, stream_chunks=8, reply=None, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.malformed_rate = malformed_rate
+        self.stream_chunks = stream_chunks
+        self.reply = DEFAULT_REPLY if reply is None else reply
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cached_prefixes = set()
+        self.requests = 0
+        self.last_payload = None
+
+    def usage(self, payload, output_text):
+        """프롬프트 캐시를 흉내 낸 usage (토큰 수는 글자 수 / 4로 근사)"""
+        usage = {'input_tokens': 0, 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0,
+                 'output_tokens': len(output_text) // 4}
+        system = payload.get('system')
+        blocks = [{'type': 'text', 'text': system}] if isinstance(system, str) else system or []
+        for block in blocks:
+            tokens = len(block['text']) // 4
+            if 'cache_control' not in block:
+                usage['input_tokens'] += tokens
+                continue
+            with self._lock:
+                hit = block['text'] in self._cached_prefixes
+                self._cached_prefixes.add(block['text'])
+            usage['cache_read_input_tokens' if hit else 'cache_creation_input_tokens'] += tokens
+        for message in payload['messages']:
+            usage['input_tokens'] += len(str(message['content'])) // 4
+        return usage
+
+    def draw(self):
+        """(지연 초, 오류 여부, 잘못된 JSON 여부)를 뽑습니다"""
+        with self._lock:
+            self.requests += 1
+            latency = 0.0
+            if self.latency_ms > 0:
+                latency = self.latency_ms / 1000 * math.exp(self._random.gauss(0, self.latency_sigma))
+            return (
+                latency,
+                self._random.random() < self.error_rate,
+                self._random.random() < self.malformed_rate,
+            )
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        config = self.server.config
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        except ValueError:
+            return self._send_json(400, {'type': 'error', 'error': {'type': 'invalid_request_error'}})
+
+        error = validate_payload(payload)
+        if error:
+            return self._send_json(400, {'type': 'error', 'error': {'type': 'invalid_request_error', 'message': error}})
+        config.last_payload = payload
+
+        latency, failed, malformed = config.draw()
+        if failed:
+            time.sleep(latency)
+            return self._send_json(config.error_status, {'type': 'error', 'error': {'type': 'overloaded_error'}})
+
+        text = '{"broken": ' if malformed else json.dumps(config.reply, ensure_ascii=False)
+        usage = config.usage(payload, text)
+        if payload.get('stream'):
+            return self._send_stream(text, latency, config.stream_chunks, usage)
+        time.sleep(latency)
+        self._send_json(200, {
+            'id': 'msg_fake',
+            'type': 'message',
+            'role': 'assistant',
+            'model': payload.get('model'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'usage': usage,
+        })
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, text, latency, chunks, usage):
+        """지연 시간을 조각 사이에 나눠 가며 SSE로 보냅니다"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        size = max(1, math.ceil(len(text) / chunks))
+        events = [{'type': 'message_start', 'message': {'id': 'msg_fake', 'usage': usage}},
+                  {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}]
+        events += [{'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': text[i:i + size]}}
+                   for i in range(0, len(text), size)]
+        events += [{'type': 'content_block_stop', 'index': 0}, {'type': 'message_stop'}]
+        delay = latency / max(1, len(events) - 4)
+        for event in events:
+            if event['type'] == 'content_block_delta':
+                time.sleep(delay)
+            self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def validate_payload(payload):
+    """Messages API 요청 형식 검사. 문제가 있으면 오류 메시지를 반환합니다"""
+    if not isinstance(payload.get('model'), str) or not isinstance(payload.get('max_tokens'), int):
+        return "model and max_tokens are required."
+    messages = payload.get('messages')
+    if not isinstance(messages, list) or not messages:
+        return "messages must be a non-empty list."
+    for message in messages:
+        if message.get('role') not in ('user', 'assistant') or not message.get('content'):
+            return "each message needs a role and content."
+    system = payload.get('system')
+    if system is None or isinstance(system, str):
+        return None
+    if not isinstance(system, list):
+        return "system must be a string or a list of text blocks."
+    for block in system:
+        if block.get('type') != 'text' or not isinstance(block.get('text'), str) or not block['text']:
+            return "system blocks must be non-empty text blocks."
+        if 'cache_control' in block and block['cache_control'] != {'type': 'ephemeral'}:
+            return "cache_control must be {'type': 'ephemeral'}."
+    return None
+
+
+def make_server(config, host='127.0.0.1', port=0):
+    """가짜 서버를 만듭니다 (port=0이면 빈 포트). serve_forever()로 실행합니다"""
+    server = ThreadingHTTPServer((host, port), FakeUpstreamHandler)
+    server.daemon_threads = True
+    server.config = config
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Anthropic Messages API server for load tests.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=800, help="지연 시간 중앙값 (ms)")
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help="로그정규분포 퍼짐 (0이면 고정 지연)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="오류 응답 비율 (0~1)")
+    parser.add_argument('--error-status', type=int, default=529, help="오류 응답 코드")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="JSON이 아닌 답변 비율 (0~1)")
+    parser.add_argument('--stream-chunks', type=int, default=8, help="스트리밍 시 나눌 조각 수")
+    parser.add_argument('--reply', type=json.loads, help="모델 답변으로 돌려줄 JSON")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    config = FakeUpstreamConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        malformed_rate=args.malformed_rate,
+        stream_chunks=args.stream_chunks,
+        reply=args.reply,
+        seed=args.seed,
+    )
+    server = make_server(config, args.host, args.port)
+    print(f"Fake upstream listening on http://{args.host}:{server.server_port}/v1/messages")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import json
+from django.http import JsonResponse, StreamingHttpResponse
+
+
+def read_request_data(request):
+    """JSON 또는 폼 요청 본문을 dict로 반환합니다 (형식이 잘못되면 빈 dict)."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def unavailable_response(data, error):
+    """업스트림 보호 장치가 거절한 요청에 대한 503 응답 (Retry-After 포함)"""
+    response = json_response(data, status=503)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def sse_event(event, data):
+    """Server-Sent Events 한 건을 bytes로 만듭니다"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+def wants_event_stream(request):
+    """?stream=1 또는 Accept: text/event-stream 이면 스트리밍 응답을 요청한 것으로 봅니다"""
+    return request.GET.get('stream') in ('1', 'true') or 'text/event-stream' in request.headers.get('Accept', '')
+
+
+def event_stream_response(events):
+    """비동기 제너레이터를 text/event-stream 응답으로 감쌉니다 (ASGI에서 스레드를 점유하지 않음)"""
+    response = StreamingHttpResponse(events, content_type='text/event-stream; charset=utf-8')
+    response['Cache-Control'] = 'no-cache'
+    # nginx 등 프록시가 버퍼링하지 않도록
+    response['X-Accel-Buffering'] = 'no'
+    return response
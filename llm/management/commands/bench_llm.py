@@ -0,0 +1,118 @@
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+from collections import Counter
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+# 벤치마크 중에는 실제 캐시(CACHES)에 가짜 응답이 남지 않도록 메모리 캐시 사용
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+ENDPOINTS = {
+    'recommendation': ('/api/recommendation/recommendation/', 'viewing_history'),
+    'counselling': ('/api/counchillor/counselling/', 'counsel_content'),
+}
+
+
+class Command(BaseCommand):
+    help = ("LLM 엔드포인트 부하 테스트. 지정한 동시성으로 요청을 보내고 처리량과 p50/p95/p99 지연을 보고합니다. "
+            "--base-url이 없으면 ASGI 앱을 프로세스 안에서 직접 호출하며, 이때는 임시 테스트 DB와 메모리 캐시를 쓰고 "
+            "끝나면 지웁니다 (X_API_URL은 가짜 서버를 가리키게 하세요). "
+            "요청은 응답 캐시와 시청 기록을 저장하므로 실제 DB에 쓰려면 --allow-db-writes가 필요합니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+        parser.add_argument('--requests', type=int, default=200, help="엔드포인트별 요청 수")
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--distinct', type=int, default=0,
+                            help="서로 다른 요청 본문 수 (0이면 매 요청이 다름, 작을수록 캐시·합치기 효과가 큼)")
+        parser.add_argument('--stream', action='store_true', help="counselling을 SSE 모드로 호출")
+        parser.add_argument('--base-url', help="실행 중인 서버 주소 (예: http://127.0.0.1:8000)")
+        parser.add_argument('--timeout', type=float, default=120)
+        parser.add_argument('--allow-db-writes', action='store_true',
+                            help="--base-url 서버의 DB나(프로세스 안 모드에서는) 설정된 DB에 벤치마크 데이터를 쓰는 것을 허용")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+        if options['base_url'] and not options['allow_db_writes']:
+            raise CommandError("--base-url writes cached responses and viewing histories to that server's database; "
+                               "pass --allow-db-writes to confirm.")
+        if options['base_url'] or options['allow_db_writes']:
+            self._bench(options)
+            return
+
+        # 가짜 응답·시청 기록이 실제 DB에 남지 않도록 임시 테스트 DB에서 실행하고 지움
+        with tempfile.TemporaryDirectory() as tmp:
+            for connection in connections.all():
+                if connection.vendor == 'sqlite':
+                    # 메모리 DB(공유 캐시)는 동시 쓰기에서 바로 "table is locked"가 나므로 임시 파일 사용
+                    connection.settings_dict['TEST']['NAME'] = os.path.join(tmp, f'bench_{connection.alias}.sqlite3')
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                with override_settings(CACHES=BENCH_CACHES):
+                    self._bench(options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+    def _bench(self, options):
+        self.stdout.write(
+            f"{'endpoint':<15} {'reqs':>6} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  statuses")
+        for name in options['endpoints']:
+            latencies, statuses, elapsed = asyncio.run(self._run(name, options))
+            self.stdout.write(
+                f"{name:<15} {len(latencies):>6} {options['concurrency']:>5} {len(latencies) / elapsed:>9.1f} "
+                f"{percentile(latencies, 50):>9.1f} {percentile(latencies, 95):>9.1f} "
+                f"{percentile(latencies, 99):>9.1f} {max(latencies):>9.1f}  "
+                f"{' '.join(f'{code}:{count}' for code, count in sorted(statuses.items()))}")
+
+    async def _run(self, name, options):
+        path, field = ENDPOINTS[name]
+        if options['stream'] and name == 'counselling':
+            path += '?stream=1'
+        if options['base_url']:
+            client = httpx.AsyncClient(base_url=options['base_url'], timeout=options['timeout'])
+        else:
+            from django.core.asgi import get_asgi_application
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=get_asgi_application()),
+                base_url='http://127.0.0.1',
+                timeout=options['timeout'],
+            )
+
+        distinct = options['distinct']
+        latencies = []
+        statuses = Counter()
+        queue = asyncio.Queue()
+        for i in range(options['requests']):
+            queue.put_nowait(i % distinct if distinct else i)
+
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                body = {field: [f"bench movie {i}", "인셉션"] if field == 'viewing_history' else f"bench 고민 {i}"}
+                started = time.perf_counter()
+                try:
+                    response = await client.post(path, content=json.dumps(body), headers={'Content-Type': 'application/json'})
+                    await response.aread()
+                    statuses[str(response.status_code)] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        async with client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - started
+        return latencies, statuses, elapsed
+
+
+def percentile(values, pct):
+    """최근접 순위 방식 백분위수"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
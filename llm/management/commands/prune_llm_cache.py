@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from llm.cache import prune_expired
+
+
+class Command(BaseCommand):
+    help = "만료된 LLM 응답 캐시 행을 삭제합니다."
+
+    def handle(self, *args, **options):
+        deleted = prune_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired cache entries."))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('llm', '0001_cachedresponse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpstreamLock',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('owner', models.CharField(max_length=64)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+    ]
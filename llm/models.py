@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class CachedResponse(models.Model):
+    """LLM 응답 캐시 (디스크 계층). 키는 정규화된 입력 + 프롬프트 버전 + 모델의 해시"""
+    key = models.CharField(max_length=64, primary_key=True)
+    namespace = models.CharField(max_length=50)
+    payload = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.namespace}:{self.key[:12]}"
+
+
+class UpstreamLock(models.Model):
+    """워커 간 single-flight 잠금. 같은 요청은 잠금을 가진 워커만 업스트림을 호출합니다."""
+    key = models.CharField(max_length=64, primary_key=True)
+    owner = models.CharField(max_length=64)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.owner})"
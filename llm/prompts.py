@@ -0,0 +1,129 @@
+"""
+프롬프트 템플릿 레지스트리
+
+템플릿은 앱 시작 시(AppConfig.ready) 한 번 읽어 검증·컴파일하고,
+이후에는 파일 mtime이 바뀐 경우에만 다시 읽습니다.
+프롬프트를 수정해도 재시작할 필요가 없습니다.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from string import Formatter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+
+class PromptTemplate:
+    """str.format 문법({name}, {{ }} 이스케이프)을 쓰는 프롬프트 파일"""
+
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = frozenset(fields)
+        self._parts, self.version, self.mtime = self._compile()
+
+    def _compile(self):
+        """파일을 읽어 (literal, field) 목록으로 컴파일합니다. 문제가 있으면 ImproperlyConfigured"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, 'r', encoding='utf-8') as file:
+                text = file.read()
+        except OSError as e:
+            raise ImproperlyConfigured(f"Prompt template {self.path} cannot be read: {e}")
+
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise ImproperlyConfigured(f"Prompt template {self.path} is malformed: {e}")
+
+        parts = []
+        used = set()
+        for literal, field, format_spec, conversion in parsed:
+            if field is not None:
+                if field not in self.fields or format_spec or conversion:
+                    raise ImproperlyConfigured(
+                        f"Prompt template {self.path} has an unexpected placeholder {{{field}}}. "
+                        f"Allowed: {', '.join(sorted(self.fields))}"
+                    )
+                used.add(field)
+            parts.append((literal, field))
+        missing = self.fields - used
+        if missing:
+            raise ImproperlyConfigured(
+                f"Prompt template {self.path} is missing placeholders: {', '.join(sorted(missing))}"
+            )
+        version = hashlib.sha256(text.encode()).hexdigest()[:12]
+        return parts, version, mtime
+
+    def reload_if_changed(self):
+        """mtime이 바뀌었으면 다시 컴파일합니다. 수정본이 잘못됐으면 기존 템플릿을 유지합니다."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Prompt template {self.path} disappeared, keeping version {self.version}: {e}")
+            return False
+        if mtime == self.mtime:
+            return False
+        try:
+            self._parts, self.version, self.mtime = self._compile()
+        except ImproperlyConfigured as e:
+            # 같은 오류를 매번 로그로 남기지 않도록 mtime은 갱신
+            self.mtime = mtime
+            logger.error(f"{e} Keeping version {self.version}.")
+            return False
+        logger.info(f"Reloaded prompt template {self.path} (version {self.version})")
+        return True
+
+    def render(self, **values):
+        return ''.join(
+            literal if field is None else literal + str(values[field])
+            for literal, field in self._parts
+        )
+
+    def render_parts(self, **values):
+        """(고정 앞부분, 사용자별 뒷부분)으로 나눠 렌더링합니다.
+
+        앞부분은 첫 플레이스홀더 앞까지의 텍스트로 요청마다 같으므로 프롬프트 캐시 대상이 됩니다.
+        """
+        parts = self._parts
+        prefix = []
+        for index, (literal, field) in enumerate(parts):
+            prefix.append(literal)
+            if field is not None:
+                break
+        suffix = str(values[field]) + ''.join(
+            literal if field is None else literal + str(values[field])
+            for literal, field in parts[index + 1:]
+        )
+        return ''.join(prefix), suffix
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates = {}
+        self._checked_at = {}
+
+    def register(self, name, path, fields):
+        """템플릿을 등록합니다. 파일이 없거나 플레이스홀더가 맞지 않으면 즉시 ImproperlyConfigured"""
+        template = PromptTemplate(path, fields)
+        with self._lock:
+            self._templates[name] = template
+            self._checked_at[name] = time.monotonic()
+        return template
+
+    def get(self, name):
+        """템플릿을 반환합니다. LLM_PROMPT_CHECK_INTERVAL초마다 파일 변경을 확인합니다."""
+        template = self._templates[name]
+        now = time.monotonic()
+        if now - self._checked_at[name] >= settings.LLM_PROMPT_CHECK_INTERVAL:
+            with self._lock:
+                self._checked_at[name] = now
+                template.reload_if_changed()
+        return template
+
+
+prompts = PromptRegistry()
@@ -0,0 +1,220 @@
+"""
+업스트림 보호: 벌크헤드(동시 호출 제한 + 제한된 대기열)와 서킷 브레이커
+
+업스트림이 느려지면 대기열이 찬 뒤의 요청과 브레이커가 열린 동안의 요청은
+바로 UpstreamUnavailable로 실패하므로, LLM 경로가 워커 전체를 붙잡지 않습니다.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from django.conf import settings
+from .client import LLMError, RETRY_STATUS_CODES
+
+
+class UpstreamUnavailable(LLMError):
+    """업스트림 보호 장치가 호출을 거절함 (reason: 'overloaded' 또는 'circuit_open')"""
+
+    def __init__(self, reason, retry_after):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Upstream is unavailable ({reason}), retry after {retry_after}s.", 503)
+
+
+class Bulkhead:
+    """동시 호출 수를 max_concurrent로 제한하고, 최대 max_waiting개까지 wait_timeout초 대기시킵니다.
+
+    이벤트 루프가 여러 개여도(WSGI + async 뷰) 동작하도록 스레드 잠금과
+    call_soon_threadsafe로 대기자를 깨웁니다.
+    """
+
+    def __init__(self, max_concurrent, max_waiting, wait_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()
+        self._rejected = 0
+
+    async def acquire(self):
+        with self._lock:
+            if self._active < self.max_concurrent:
+                self._active += 1
+                return
+            if len(self._waiters) >= self.max_waiting:
+                self._rejected += 1
+                raise UpstreamUnavailable('overloaded', retry_after=1)
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), self.wait_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    # 포기하는 사이에 자리를 넘겨받음
+                    waiter = None
+                else:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self._rejected += 1
+            if waiter is None:
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise UpstreamUnavailable('overloaded', retry_after=1)
+
+    def release(self):
+        with self._lock:
+            if self._waiters:
+                # 자리를 반납하지 않고 다음 대기자에게 바로 넘김
+                loop, future = self._waiters.popleft()
+                loop.call_soon_threadsafe(_wake, future)
+            else:
+                self._active -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'active': self._active, 'waiting': len(self._waiters), 'rejected': self._rejected}
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class CircuitBreaker:
+    """최근 window초 동안 실패(오류 + 느린 호출) 비율이 기준을 넘으면 open_seconds 동안 호출을 막습니다.
+
+    이후 half-open 상태에서 probes개의 시험 호출만 통과시키고, 성공하면 닫고 실패하면 다시 엽니다.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, window, min_calls, failure_ratio, slow_call_seconds, open_seconds, probes=1):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._calls = deque()
+        self._opened_at = 0.0
+        self._probing = 0
+        self._rejected = 0
+
+    def before_call(self):
+        """호출 전에 확인합니다. 막혀 있으면 UpstreamUnavailable"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self._rejected += 1
+                    raise UpstreamUnavailable('circuit_open', retry_after=max(1, round(remaining)))
+                self._state = self.HALF_OPEN
+                self._probing = 0
+            if self._state == self.HALF_OPEN:
+                if self._probing >= self.probes:
+                    self._rejected += 1
+                    raise UpstreamUnavailable('circuit_open', retry_after=1)
+                self._probing += 1
+
+    def record(self, failed, elapsed):
+        """호출 결과를 기록합니다. 느린 호출(slow_call_seconds 이상)도 실패로 셉니다"""
+        failed = failed or elapsed >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._probing -= 1
+                if failed:
+                    self._trip(now)
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                return
+            if self._state == self.OPEN:
+                return
+            self._calls.append((now, failed))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            failures = sum(1 for _, f in self._calls if f)
+            if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_ratio:
+                self._trip(now)
+
+    def release_probe(self):
+        """호출하지 못한(또는 결과를 알 수 없는) half-open 시험 자리를 돌려줍니다"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probing > 0:
+                self._probing -= 1
+
+    def _trip(self, now):
+        self._state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state, 'recentCalls': len(self._calls), 'rejected': self._rejected}
+
+
+def is_upstream_failure(error):
+    """업스트림 가용성 문제(연결 실패, 타임아웃, 5xx/429)인지. 4xx·파싱 오류는 세지 않습니다"""
+    return isinstance(error, LLMError) and (error.status_code is None or error.status_code in RETRY_STATUS_CODES)
+
+
+class UpstreamGuard:
+    def __init__(self, bulkhead, breaker):
+        self.bulkhead = bulkhead
+        self.breaker = breaker
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            Bulkhead(
+                settings.LLM_MAX_CONCURRENT,
+                settings.LLM_MAX_WAITING,
+                settings.LLM_QUEUE_TIMEOUT,
+            ),
+            CircuitBreaker(
+                window=settings.LLM_BREAKER_WINDOW,
+                min_calls=settings.LLM_BREAKER_MIN_CALLS,
+                failure_ratio=settings.LLM_BREAKER_FAILURE_RATIO,
+                slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+                open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+            ),
+        )
+
+    @asynccontextmanager
+    async def call(self):
+        """브레이커 확인 → 벌크헤드 자리 확보 → 호출 결과를 브레이커에 기록"""
+        self.breaker.before_call()
+        try:
+            await self.bulkhead.acquire()
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        except LLMError as e:
+            self.breaker.record(is_upstream_failure(e), time.monotonic() - started)
+            raise
+        except BaseException:
+            # 취소 등 결과를 알 수 없는 호출은 기록하지 않음
+            self.breaker.release_probe()
+            raise
+        else:
+            self.breaker.record(False, time.monotonic() - started)
+        finally:
+            self.bulkhead.release()
+
+    def stats(self):
+        return {'bulkhead': self.bulkhead.stats(), 'breaker': self.breaker.stats()}
+
+
+upstream_guard = UpstreamGuard.from_settings()
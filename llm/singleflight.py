@@ -0,0 +1,128 @@
+"""
+동일한 동시 요청 합치기 (single-flight)
+
+같은 키의 요청이 처리 중이면 새 요청은 업스트림을 다시 호출하지 않고
+진행 중인 호출의 결과(또는 예외)를 함께 받습니다.
+진행 중인 호출은 프로세스 단위로 기록하므로(스레드 안전한 concurrent.futures.Future)
+요청마다 이벤트 루프가 따로 도는 WSGI 스레드 워커에서도 같은 프로세스 안의 요청은 합쳐집니다.
+LLM_SINGLEFLIGHT_CROSS_WORKER가 켜져 있으면 UpstreamLock 테이블로 워커 간에도
+한 워커만 호출하고, 결과는 공유 캐시(CACHES)로 넘겨줍니다.
+"""
+import asyncio
+import concurrent.futures
+import os
+import threading
+import uuid
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import UpstreamLock
+
+OWNER = f"{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+def _result_key(key):
+    return f"llm:singleflight:{key}"
+
+
+def _try_lock(key):
+    now = timezone.now()
+    UpstreamLock.objects.filter(key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            UpstreamLock.objects.create(
+                key=key,
+                owner=OWNER,
+                expires_at=now + timedelta(seconds=settings.LLM_SINGLEFLIGHT_LOCK_TTL),
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def _release(key):
+    UpstreamLock.objects.filter(key=key, owner=OWNER).delete()
+
+
+def _lock_held(key):
+    return UpstreamLock.objects.filter(key=key, expires_at__gt=timezone.now()).exists()
+
+
+class SingleFlight:
+    def __init__(self):
+        # 진행 중인 호출 {key: concurrent.futures.Future} (어느 스레드·이벤트 루프에서든 기다릴 수 있음)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'followers': 0, 'remoteHits': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    async def do(self, key, fn):
+        """key에 대해 fn()을 한 번만 실행하고 결과를 모든 동시 호출자에게 돌려줍니다"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = concurrent.futures.Future()
+            self._stats['leaders' if leader else 'followers'] += 1
+
+        if not leader:
+            try:
+                # 이 요청이 취소돼도 공유 Future는 취소되지 않도록 shield
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                # 선행 요청(클라이언트 연결 끊김 등)만 취소된 경우 다시 시도
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.do(key, fn)
+                raise
+
+        try:
+            if settings.LLM_SINGLEFLIGHT_CROSS_WORKER:
+                result = await self._run_locked(key, fn)
+            else:
+                result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def _run_locked(self, key, fn):
+        """워커 간 잠금을 잡은 경우에만 fn()을 호출하고, 아니면 잠금 주인의 결과를 기다립니다"""
+        while True:
+            if await sync_to_async(_try_lock)(key):
+                try:
+                    result = await fn()
+                    await cache.aset(_result_key(key), result, settings.LLM_SINGLEFLIGHT_RESULT_TTL)
+                    return result
+                finally:
+                    await sync_to_async(_release)(key)
+
+            # 다른 워커가 호출 중: 결과가 올라오거나 잠금이 풀릴(실패·만료) 때까지 대기
+            while True:
+                result = await cache.aget(_result_key(key))
+                if result is not None:
+                    self._count('remoteHits')
+                    return result
+                if not await sync_to_async(_lock_held)(key):
+                    break
+                await asyncio.sleep(settings.LLM_SINGLEFLIGHT_POLL_INTERVAL)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,492 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
+import httpx
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from .fake_upstream import FakeUpstreamConfig, make_server
+from .client import LLMClient, LLMError, build_payload, get_client, parse_json_reply, parse_json_text
+from .cache import recommendation_cache
+from .models import UpstreamLock
+from .prompts import PromptRegistry
+from .resilience import Bulkhead, CircuitBreaker, UpstreamGuard, UpstreamUnavailable
+from .singleflight import SingleFlight, _result_key
+
+# 테스트가 실제 파일 캐시(BASE_DIR/django_cache)를 비우지 않도록 메모리 캐시 사용
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def claude_reply(payload):
+    return {'content': [{'type': 'text', 'text': json.dumps(payload)}]}
+
+
+def claude_stream(chunks, stop=True):
+    """Messages API 스트리밍 응답(SSE) 본문을 만듭니다"""
+    events = [{'type': 'message_start', 'message': {'id': 'msg'}},
+              {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}]
+    events += [{'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': chunk}}
+               for chunk in chunks]
+    if stop:
+        events += [{'type': 'content_block_stop', 'index': 0}, {'type': 'message_stop'}]
+    return ''.join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events).encode()
+
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault('retry_backoff', 0)
+    return LLMClient('http://upstream.test/v1/messages', 'key', transport=httpx.MockTransport(handler), **kwargs)
+
+
+class LLMClientTests(SimpleTestCase):
+    def call(self, client, payload=None):
+        async def run():
+            try:
+                return await client.create_message(payload or {'messages': []})
+            finally:
+                await client.aclose()
+        return async_to_sync(run)()
+
+    def test_sends_headers_and_returns_json(self):
+        def handler(request):
+            self.assertEqual(request.headers['x-api-key'], 'key')
+            self.assertEqual(request.headers['anthropic-version'], '2023-06-01')
+            return httpx.Response(200, json=claude_reply({'ok': True}))
+        self.assertEqual(parse_json_reply(self.call(make_client(handler))), {'ok': True})
+
+    def test_retries_overloaded_then_succeeds(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) < 3:
+                return httpx.Response(529)
+            return httpx.Response(200, json=claude_reply({}))
+        self.call(make_client(handler, max_retries=2))
+        self.assertEqual(len(calls), 3)
+
+    def test_retries_are_bounded(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ConnectError("refused")
+        with self.assertRaises(LLMError):
+            self.call(make_client(handler, max_retries=1))
+        self.assertEqual(len(calls), 2)
+
+    def test_client_error_is_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400, json={'error': 'bad'})
+        with self.assertRaises(LLMError) as cm:
+            self.call(make_client(handler))
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertEqual(len(calls), 1)
+
+    def test_read_timeout_is_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ReadTimeout("slow")
+        with self.assertRaises(LLMError):
+            self.call(make_client(handler))
+        self.assertEqual(len(calls), 1)
+
+    def test_shared_client_closes_with_its_loop(self):
+        async def use_client():
+            return get_client(), get_client()
+
+        # WSGI처럼 요청마다 새 루프: 루프 안에서는 공유하고, 루프가 끝나면 닫힘
+        clients = []
+        for _ in range(3):
+            first, second = async_to_sync(use_client)()
+            self.assertIs(first, second)
+            clients.append(first)
+        self.assertEqual(len({id(client) for client in clients}), 3)
+        self.assertTrue(all(client._client.is_closed for client in clients))
+
+    def test_parse_json_reply_malformed(self):
+        with self.assertRaises(LLMError):
+            parse_json_reply({'content': [{'type': 'text', 'text': 'not json'}]})
+
+
+class StreamMessageTests(SimpleTestCase):
+    def collect(self, client):
+        async def run():
+            try:
+                return [text async for text in client.stream_message({'messages': []})]
+            finally:
+                await client.aclose()
+        return async_to_sync(run)()
+
+    def test_stream(self):
+        def handler(request):
+            self.assertTrue(json.loads(request.content)['stream'])
+            return httpx.Response(200, content=claude_stream(['{"a"', ': 1}']))
+
+        chunks = self.collect(make_client(handler))
+        self.assertEqual(chunks, ['{"a"', ': 1}'])
+        self.assertEqual(parse_json_text(''.join(chunks)), {'a': 1})
+
+    def test_retry_before_first_chunk(self):
+        responses = iter([httpx.Response(529), httpx.Response(200, content=claude_stream(['ok']))])
+        self.assertEqual(self.collect(make_client(lambda request: next(responses))), ['ok'])
+
+    def test_broken_streams(self):
+        bodies = [
+            claude_stream(['partial'], stop=False),
+            b'event: error\ndata: {"type": "error", "error": {"type": "overloaded_error"}}\n\n',
+            b'data: {not json\n\n',
+        ]
+        for body in bodies:
+            with self.subTest(body=body), self.assertRaises(LLMError):
+                self.collect(make_client(lambda request: httpx.Response(200, content=body)))
+        with self.assertRaises(LLMError):
+            self.collect(make_client(lambda request: httpx.Response(400)))
+
+
+def patch_upstream(handler, **kwargs):
+    """뷰가 사용하는 공용 클라이언트를 MockTransport로 바꿉니다."""
+    return patch.object(LLMClient, 'from_settings', classmethod(lambda cls: make_client(handler, **kwargs)))
+
+
+@override_settings(LLM_PROMPT_CHECK_INTERVAL=0)
+class PromptRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, 'prompt.txt')
+        self.registry = PromptRegistry()
+
+    def write(self, text, mtime):
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.utime(self.path, ns=(mtime, mtime))
+
+    def test_render(self):
+        self.write('기록: {history}\n{{"movies": []}}', 1_000_000_000)
+        self.registry.register('p', self.path, fields=['history'])
+        rendered = self.registry.get('p').render(history=['A', 'B'])
+        self.assertEqual(rendered, '기록: [\'A\', \'B\']\n{"movies": []}')
+
+    def test_render_parts(self):
+        self.write('규칙 {{json}}\n기록: {history}\n끝 {history}', 1_000_000_000)
+        template = self.registry.register('p', self.path, fields=['history'])
+        self.assertEqual(template.render_parts(history='A'), ('규칙 {json}\n기록: ', 'A\n끝 A'))
+
+    def test_invalid_template_fails_fast(self):
+        for text in ['{other}', 'no placeholder', '{history!r}', '{history:>10}', '{history']:
+            self.write(text, 1_000_000_000)
+            with self.subTest(text=text), self.assertRaises(ImproperlyConfigured):
+                self.registry.register('p', self.path, fields=['history'])
+        with self.assertRaises(ImproperlyConfigured):
+            self.registry.register('missing', os.path.join(self.dir.name, 'nope.txt'), fields=['history'])
+
+    def test_reload_only_when_modified(self):
+        self.write('v1 {history}', 1_000_000_000)
+        template = self.registry.register('p', self.path, fields=['history'])
+        version = template.version
+
+        with patch('llm.prompts.PromptTemplate._compile', side_effect=AssertionError('recompiled')):
+            self.assertEqual(self.registry.get('p').render(history='x'), 'v1 x')
+
+        self.write('v2 {history}', 2_000_000_000)
+        self.assertEqual(self.registry.get('p').render(history='x'), 'v2 x')
+        self.assertNotEqual(template.version, version)
+
+    def test_bad_edit_keeps_previous_version(self):
+        self.write('v1 {history}', 1_000_000_000)
+        self.registry.register('p', self.path, fields=['history'])
+        self.write('v2 {typo}', 2_000_000_000)
+        with self.assertLogs('llm.prompts', level='ERROR'):
+            self.assertEqual(self.registry.get('p').render(history='x'), 'v1 x')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    async def slow(self, result='ok'):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def test_concurrent_calls_share_one_upstream_call(self):
+        async def burst():
+            return await asyncio.gather(*(self.flight.do('k', self.slow) for _ in range(5)))
+
+        self.assertEqual(async_to_sync(burst)(), ['ok'] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.stats(), {'leaders': 1, 'followers': 4, 'remoteHits': 0})
+
+        # 끝난 뒤의 요청은 다시 호출
+        async_to_sync(self.flight.do)('k', self.slow)
+        self.assertEqual(self.calls, 2)
+
+    def test_calls_from_different_event_loops_are_shared(self):
+        # WSGI 스레드 워커처럼 요청마다 다른 스레드·이벤트 루프에서 호출
+        started, release = threading.Event(), threading.Event()
+
+        async def blocking():
+            self.calls += 1
+            started.set()
+            await asyncio.to_thread(release.wait, 5)
+            return 'ok'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(asyncio.run(self.flight.do('k', blocking))))
+                   for _ in range(3)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while self.flight.stats()['followers'] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, ['ok'] * 3)
+        self.assertEqual(self.calls, 1)
+
+    def test_errors_are_shared(self):
+        async def burst():
+            return await asyncio.gather(
+                *(self.flight.do('k', lambda: self.slow(LLMError('boom'))) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        results = async_to_sync(burst)()
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(result, LLMError) for result in results))
+
+    def test_follower_retries_when_leader_is_cancelled(self):
+        async def scenario():
+            leader = asyncio.ensure_future(self.flight.do('k', self.slow))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(self.flight.do('k', self.slow))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(async_to_sync(scenario)(), 'ok')
+        self.assertEqual(self.calls, 2)
+
+    @override_settings(LLM_SINGLEFLIGHT_CROSS_WORKER=True, LLM_SINGLEFLIGHT_POLL_INTERVAL=0.01)
+    def test_cross_worker_lock(self):
+        async_to_sync(self.flight.do)('k', self.slow)
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(UpstreamLock.objects.exists())
+        self.assertEqual(cache.get(_result_key('k')), 'ok')
+
+        # 다른 워커가 잠금을 가진 채 결과를 올려두면 업스트림을 호출하지 않음
+        UpstreamLock.objects.create(key='other', owner='worker-2', expires_at=timezone.now() + timedelta(minutes=1))
+        cache.set(_result_key('other'), 'shared')
+        self.assertEqual(async_to_sync(self.flight.do)('other', self.slow), 'shared')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.stats()['remoteHits'], 1)
+
+    @override_settings(LLM_SINGLEFLIGHT_CROSS_WORKER=True, LLM_SINGLEFLIGHT_POLL_INTERVAL=0.01)
+    def test_expired_lock_is_taken_over(self):
+        UpstreamLock.objects.create(key='k', owner='worker-2', expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(async_to_sync(self.flight.do)('k', self.slow), 'ok')
+        self.assertEqual(self.calls, 1)
+        self.assertFalse(UpstreamLock.objects.exists())
+
+
+def make_breaker(**kwargs):
+    options = dict(window=60, min_calls=4, failure_ratio=0.5, slow_call_seconds=10, open_seconds=30)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+class BulkheadTests(SimpleTestCase):
+    def test_cap_queue_and_reject(self):
+        bulkhead = Bulkhead(max_concurrent=1, max_waiting=1, wait_timeout=1)
+        order = []
+
+        async def call(name):
+            await bulkhead.acquire()
+            try:
+                order.append(name)
+                await asyncio.sleep(0.02)
+            finally:
+                bulkhead.release()
+
+        async def burst():
+            return await asyncio.gather(call('a'), call('b'), call('c'), return_exceptions=True)
+
+        results = async_to_sync(burst)()
+        self.assertEqual(order, ['a', 'b'])
+        self.assertIsInstance(results[2], UpstreamUnavailable)
+        self.assertEqual(bulkhead.stats(), {'active': 0, 'waiting': 0, 'rejected': 1})
+
+    def test_wait_timeout(self):
+        bulkhead = Bulkhead(max_concurrent=1, max_waiting=5, wait_timeout=0.01)
+
+        async def scenario():
+            await bulkhead.acquire()
+            try:
+                with self.assertRaises(UpstreamUnavailable):
+                    await bulkhead.acquire()
+            finally:
+                bulkhead.release()
+
+        async_to_sync(scenario)()
+        self.assertEqual(bulkhead.stats(), {'active': 0, 'waiting': 0, 'rejected': 1})
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_trip_and_half_open(self):
+        breaker = make_breaker()
+        for failed in (True, False, True):
+            breaker.before_call()
+            breaker.record(failed, elapsed=0.1)
+        self.assertEqual(breaker.stats()['state'], 'closed')
+        breaker.before_call()
+        breaker.record(True, elapsed=0.1)
+        self.assertEqual(breaker.stats()['state'], 'open')
+        with self.assertRaises(UpstreamUnavailable) as cm:
+            breaker.before_call()
+        self.assertEqual(cm.exception.reason, 'circuit_open')
+
+        # open_seconds가 지나면 시험 호출 하나만 통과
+        breaker._opened_at -= 30
+        breaker.before_call()
+        with self.assertRaises(UpstreamUnavailable):
+            breaker.before_call()
+        breaker.record(True, elapsed=0.1)
+        self.assertEqual(breaker.stats()['state'], 'open')
+
+        breaker._opened_at -= 30
+        breaker.before_call()
+        breaker.record(False, elapsed=0.1)
+        self.assertEqual(breaker.stats()['state'], 'closed')
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = make_breaker(min_calls=2)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record(False, elapsed=11)
+        self.assertEqual(breaker.stats()['state'], 'open')
+
+    def test_guarded_client(self):
+        breaker = make_breaker(min_calls=2)
+        guard = UpstreamGuard(Bulkhead(5, 5, 1), breaker)
+        client = make_client(lambda request: httpx.Response(400), guard=guard, max_retries=0)
+
+        async def call():
+            await client.create_message({})
+
+        # 클라이언트 오류(4xx)는 업스트림 장애로 세지 않음
+        for _ in range(3):
+            with self.assertRaises(LLMError):
+                async_to_sync(call)()
+        self.assertEqual(breaker.stats()['state'], 'closed')
+
+        client = make_client(lambda request: httpx.Response(503), guard=guard, max_retries=0)
+        for _ in range(3):
+            with self.assertRaises(LLMError):
+                async_to_sync(call)()
+        with self.assertRaises(UpstreamUnavailable):
+            async_to_sync(call)()
+        self.assertEqual(guard.stats()['bulkhead']['active'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FakeUpstreamTests(TestCase):
+    """가짜 업스트림 서버를 띄우고 실제 HTTP로 두 LLM 엔드포인트를 호출합니다"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = make_server(FakeUpstreamConfig(seed=1))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.config = FakeUpstreamConfig(reply={'summary': 'fake'}, seed=1)
+        recommendation_cache.clear()
+        url = f"http://127.0.0.1:{self.server.server_port}/v1/messages"
+        settings_override = override_settings(LLM_API_URL=url, LLM_MAX_RETRIES=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # 오류 모드 호출이 공용 서킷 브레이커에 쌓이지 않도록 새 가드 사용
+        guard_patch = patch('llm.resilience.upstream_guard', UpstreamGuard.from_settings())
+        guard_patch.start()
+        self.addCleanup(guard_patch.stop)
+
+    def recommend(self):
+        return self.client.post(
+            '/api/recommendation/recommendation/', {'viewing_history': ['인셉션']}, content_type='application/json')
+
+    def test_recommendation(self):
+        response = self.recommend()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'summary': 'fake'})
+        self.assertEqual(self.server.config.requests, 1)
+
+    def test_counselling_stream(self):
+        response = self.client.post(
+            '/api/counchillor/counselling/?stream=1', {'counsel_content': '고민'}, content_type='application/json')
+        body = b''.join(response)
+        self.assertTrue(body.endswith(b'event: result\ndata: {"summary": "fake"}\n\n'))
+        self.assertGreater(body.count(b'event: token'), 1)
+
+    def test_prompt_prefix_cache(self):
+        with self.assertLogs('llm.client', level='INFO') as logs:
+            self.recommend()
+            self.client.post(
+                '/api/recommendation/recommendation/', {'viewing_history': ['기생충']}, content_type='application/json')
+
+        payload = self.server.config.last_payload
+        system = payload['system'][0]
+        self.assertEqual(system['cache_control'], {'type': 'ephemeral'})
+        self.assertNotIn('기생충', system['text'])
+        self.assertIn('기생충', payload['messages'][0]['content'])
+        self.assertIn('cache_read=0 cache_creation=', logs.output[0])
+        self.assertRegex(logs.output[1], r'cache_read=[1-9]\d* cache_creation=0')
+
+    def test_invalid_request_shape(self):
+        self.server.config.last_payload = None
+        client = LLMClient(f"http://127.0.0.1:{self.server.server_port}/v1/messages", 'key')
+        payload = build_payload('hi', system='static')
+        payload['system'][0]['cache_control'] = {'type': 'forever'}
+
+        async def call():
+            try:
+                await client.create_message(payload)
+            finally:
+                await client.aclose()
+
+        with self.assertRaises(LLMError) as cm:
+            async_to_sync(call)()
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertIsNone(self.server.config.last_payload)
+
+    def test_error_and_malformed_modes(self):
+        self.server.config.error_rate = 1
+        self.assertEqual(self.recommend().status_code, 500)
+        self.server.config = FakeUpstreamConfig(malformed_rate=1)
+        self.assertEqual(self.recommend().status_code, 500)
@@ -1,6 +1,20 @@
+import os
 from django.apps import AppConfig
 
 
 class MovieRecommendationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movie_recommendation'
+
+    def ready(self):
+        from llm.prompts import prompts
+        prompts.register(
+            'movie_recommendation',
+            os.path.join(os.path.dirname(__file__), 'prompts', 'ai_prompt.txt'),
+            fields=['viewing_history'],
+        )
+        prompts.register(
+            'movie_recommendation_hybrid',
+            os.path.join(os.path.dirname(__file__), 'prompts', 'hybrid_prompt.txt'),
+            fields=['candidates', 'viewing_history'],
+        )
@@ -0,0 +1,85 @@
+from collections import Counter
+from itertools import permutations
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from movie_recommendation.models import MovieCooccurrence, MovieStat, RecommenderState, ViewingHistory
+from movie_recommendation.recommender import clean_titles
+
+
+class Command(BaseCommand):
+    help = "ViewingHistory로 영화 공동 출현 행렬을 갱신합니다. 기본은 마지막 실행 이후 새 기록만 반영합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="행렬을 비우고 전체 기록으로 다시 계산")
+        parser.add_argument('--batch-size', type=int, default=2000, help="한 트랜잭션에 반영할 기록 수")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                MovieCooccurrence.objects.all().delete()
+                MovieStat.objects.all().delete()
+                RecommenderState.objects.filter(pk=RecommenderState.SINGLETON_PK).update(last_history_id=0)
+
+        last_id = RecommenderState.load().last_history_id
+        processed = 0
+        while True:
+            batch = list(
+                ViewingHistory.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'titles')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            movie_counts = Counter()
+            pair_counts = Counter()
+            display = {}
+            for _, titles in batch:
+                keys = []
+                for title in clean_titles(titles):
+                    key = title.casefold()
+                    display[key] = title
+                    keys.append(key)
+                movie_counts.update(keys)
+                pair_counts.update(permutations(keys, 2))
+            last_id = batch[-1][0]
+            # 기록 반영과 진행 위치 저장을 한 트랜잭션으로 묶어 중단돼도 중복 반영되지 않게 함
+            with transaction.atomic():
+                self._merge_stats(movie_counts, display)
+                self._merge_pairs(pair_counts)
+                RecommenderState.objects.filter(pk=RecommenderState.SINGLETON_PK).update(last_history_id=last_id)
+            processed += len(batch)
+
+        if processed or options['rebuild']:
+            RecommenderState.objects.filter(pk=RecommenderState.SINGLETON_PK).update(revision=F('revision') + 1)
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} viewing histories "
+            f"({MovieStat.objects.count()} movies, {MovieCooccurrence.objects.count()} pairs)."))
+
+    def _merge_stats(self, movie_counts, display):
+        keys = list(movie_counts)
+        existing = {}
+        for start in range(0, len(keys), 500):
+            existing.update(MovieStat.objects.filter(key__in=keys[start:start + 500]).values_list('key', 'count'))
+        MovieStat.objects.bulk_create(
+            [MovieStat(key=key, title=display[key], count=existing.get(key, 0) + count)
+             for key, count in movie_counts.items()],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['title', 'count'],
+            batch_size=500,
+        )
+
+    def _merge_pairs(self, pair_counts):
+        movies = list({movie for movie, _ in pair_counts})
+        existing = {}
+        for start in range(0, len(movies), 500):
+            rows = MovieCooccurrence.objects.filter(movie__in=movies[start:start + 500]).values_list('movie', 'other', 'count')
+            existing.update(((movie, other), count) for movie, other, count in rows if (movie, other) in pair_counts)
+        MovieCooccurrence.objects.bulk_create(
+            [MovieCooccurrence(movie=movie, other=other, count=existing.get((movie, other), 0) + count)
+             for (movie, other), count in pair_counts.items()],
+            update_conflicts=True,
+            unique_fields=['movie', 'other'],
+            update_fields=['count'],
+            batch_size=500,
+        )
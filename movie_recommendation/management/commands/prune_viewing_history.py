@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from movie_recommendation.recommender import prune_viewing_history
+
+
+class Command(BaseCommand):
+    help = ("공동 출현 행렬에 반영된 시청 기록 중 보관 기간이 지난 것을 일괄 삭제합니다. "
+            "삭제 후 build_cooccurrence --rebuild는 남은 기록만으로 다시 계산합니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="보관 기간(일, 기본값 MOVIE_HISTORY_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="한 번에 삭제할 기록 수")
+
+    def handle(self, *args, **options):
+        days = settings.MOVIE_HISTORY_RETENTION_DAYS if options['days'] is None else options['days']
+        deleted = prune_viewing_history(days, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} viewing histories older than {days} days."))
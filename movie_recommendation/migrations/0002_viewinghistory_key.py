@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie_recommendation', '0001_cooccurrence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='viewinghistory',
+            name='key',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -1,3 +1,54 @@
 from django.db import models
 
-# Create your models here.
+
+class ViewingHistory(models.Model):
+    """추천 요청으로 들어온 시청 기록 (build_cooccurrence 명령이 학습에 사용)"""
+    titles = models.JSONField()
+    # 같은 시청 기록을 하루에 한 번만 저장하기 위한 키 (정규화한 제목 + 날짜의 해시)
+    key = models.CharField(max_length=64, unique=True, null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class MovieStat(models.Model):
+    """영화별 등장 횟수. key는 정규화된 제목, title은 표시용 제목"""
+    key = models.CharField(max_length=200, primary_key=True)
+    title = models.CharField(max_length=200)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.title} ({self.count})"
+
+
+class MovieCooccurrence(models.Model):
+    """같은 시청 기록에 함께 등장한 횟수 (희소 행렬의 한 칸, 양방향으로 저장)"""
+    movie = models.CharField(max_length=200)
+    other = models.CharField(max_length=200)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'other'], name='unique_movie_cooccurrence'),
+        ]
+
+
+class RecommenderState(models.Model):
+    """공동 출현 학습 상태 (단일 행)
+
+    last_history_id까지의 ViewingHistory가 반영되어 있고,
+    revision이 바뀌면 각 워커의 메모리 인덱스를 다시 만듭니다.
+    """
+    last_history_id = models.PositiveBigIntegerField(default=0)
+    revision = models.PositiveBigIntegerField(default=0)
+
+    SINGLETON_PK = 1
+
+    @classmethod
+    def load(cls):
+        state, _ = cls.objects.get_or_create(pk=cls.SINGLETON_PK)
+        return state
+
+    @classmethod
+    def current_revision(cls):
+        """현재 리비전 (행이 없으면 0)"""
+        revision = cls.objects.filter(pk=cls.SINGLETON_PK).values_list('revision', flat=True).first()
+        return revision or 0
@@ -0,0 +1,170 @@
+"""
+시청 기록 공동 출현 기반 로컬 추천
+
+build_cooccurrence 명령이 ViewingHistory로 MovieStat/MovieCooccurrence(희소 행렬)를 쌓고,
+각 워커는 이를 영화별 상위 이웃 목록으로 메모리에 올려 두고 추천합니다.
+업스트림 모델 없이 메모리 조회만으로 답하므로 빠른 경로와 장애 시 대체 경로로 씁니다.
+"""
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+from llm.cache import make_key, normalize_history
+from .models import MovieCooccurrence, MovieStat, RecommenderState, ViewingHistory
+
+logger = logging.getLogger(__name__)
+
+# 한 시청 기록에서 학습할 최대 영화 수 (쌍의 수가 제곱으로 늘어나므로 제한)
+MAX_TITLES = 50
+MAX_TITLE_LENGTH = 200
+
+
+def clean_titles(viewing_history):
+    """저장할 표시용 제목 목록 (공백 정리, 중복·너무 긴 제목 제외)"""
+    items = viewing_history.replace('\n', ',').split(',') if isinstance(viewing_history, str) else viewing_history
+    if not isinstance(items, (list, tuple)):
+        items = [items]
+    titles = {}
+    for item in items:
+        title = ' '.join(str(item).split())
+        if title and len(title) <= MAX_TITLE_LENGTH:
+            titles.setdefault(title.casefold(), title)
+    return list(titles.values())[:MAX_TITLES]
+
+
+def history_key(titles, day):
+    return make_key('viewing_history', normalize_history(titles), day.isoformat())
+
+
+def record_history(viewing_history):
+    """추천 요청의 시청 기록을 학습용으로 저장합니다. 저장 실패는 로그만 남기고 요청을 막지 않습니다
+
+    같은 시청 기록은 하루에 한 번만 저장하므로 재시도·반복 요청으로 공동 출현 횟수가 부풀지 않습니다.
+    """
+    titles = clean_titles(viewing_history)
+    if not titles:
+        return
+    key = history_key(titles, timezone.localdate())
+    try:
+        ViewingHistory.objects.bulk_create([ViewingHistory(titles=titles, key=key)], ignore_conflicts=True)
+    except DatabaseError:
+        logger.exception("Failed to record viewing history")
+
+
+def prune_viewing_history(days, batch_size=1000):
+    """학습에 반영된(last_history_id 이하) 기록 중 days일보다 오래된 것을 배치 단위로 삭제하고 삭제한 수를 반환합니다"""
+    cutoff = timezone.now() - timedelta(days=days)
+    last_id = RecommenderState.objects.filter(pk=RecommenderState.SINGLETON_PK).values_list(
+        'last_history_id', flat=True).first() or 0
+    deleted = 0
+    while True:
+        ids = list(ViewingHistory.objects.filter(id__lte=last_id, created_at__lt=cutoff)
+                   .values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        ViewingHistory.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+class CooccurrenceIndex:
+    def __init__(self, neighbors=None, titles=None, popular=()):
+        # 정규화된 제목 -> [(코사인 점수, 이웃 제목)] (점수 내림차순)
+        self.neighbors = neighbors or {}
+        self.titles = titles or {}
+        self.popular = popular
+
+    def __len__(self):
+        return len(self.titles)
+
+    @classmethod
+    def build(cls, limit):
+        counts = {}
+        titles = {}
+        for key, title, count in MovieStat.objects.values_list('key', 'title', 'count').iterator(chunk_size=5000):
+            counts[key] = count
+            titles[key] = title
+
+        neighbors = defaultdict(list)
+        rows = MovieCooccurrence.objects.values_list('movie', 'other', 'count').iterator(chunk_size=5000)
+        for movie, other, count in rows:
+            if movie in counts and other in counts:
+                neighbors[movie].append((count / math.sqrt(counts[movie] * counts[other]), other))
+        for movie, items in neighbors.items():
+            items.sort(reverse=True)
+            del items[limit:]
+
+        popular = tuple(sorted(counts, key=counts.get, reverse=True)[:limit])
+        return cls(dict(neighbors), titles, popular)
+
+    def recommend(self, history_keys, k):
+        """시청 기록과 자주 함께 본 영화 k개를 [(표시용 제목, 점수)]로 반환합니다.
+
+        공동 출현 후보가 모자라면 인기순으로 채웁니다. 아는 영화가 하나도 없으면 빈 목록.
+        """
+        seen = set(history_keys)
+        known = [key for key in history_keys if key in self.titles]
+        if not known:
+            return []
+        scores = defaultdict(float)
+        for key in known:
+            for score, other in self.neighbors.get(key, ()):
+                if other not in seen:
+                    scores[other] += score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        if len(ranked) < k:
+            picked = seen | {key for key, _ in ranked}
+            ranked += [(key, 0.0) for key in self.popular if key not in picked][:k - len(ranked)]
+        return [(self.titles[key], round(score, 4)) for key, score in ranked]
+
+
+class LocalRecommender:
+    """RecommenderState.revision이 바뀔 때만 인덱스를 다시 만드는 워커 단위 추천기"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = (None, CooccurrenceIndex())
+        self._checked_at = 0.0
+
+    def _stale(self):
+        return (self._state[0] is None
+                or time.monotonic() - self._checked_at >= settings.MOVIE_RECOMMENDER_CHECK_INTERVAL)
+
+    def refresh(self):
+        """리비전을 확인하고 바뀌었으면 인덱스를 다시 만듭니다"""
+        revision = RecommenderState.current_revision()
+        with self._lock:
+            if revision != self._state[0]:
+                started = time.perf_counter()
+                self._state = (revision, CooccurrenceIndex.build(settings.MOVIE_RECOMMENDER_NEIGHBORS))
+                logger.info(f"Built co-occurrence index revision {revision} "
+                            f"({len(self._state[1])} movies) in {time.perf_counter() - started:.3f}s")
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._state = (None, self._state[1])
+
+    def recommend(self, viewing_history, k=None):
+        if self._stale():
+            self.refresh()
+        return self._state[1].recommend(normalize_history(viewing_history), k or settings.MOVIE_RECOMMENDER_CANDIDATES)
+
+    async def arecommend(self, viewing_history, k=None):
+        """async 뷰용. 리비전 확인이 필요할 때만 DB를 조회하고 나머지는 메모리에서 바로 답합니다"""
+        if self._stale():
+            try:
+                await sync_to_async(self.refresh)()
+            except DatabaseError as e:
+                # 다음 확인 주기까지는 기존 인덱스로 응답
+                self._checked_at = time.monotonic()
+                logger.warning(f"Failed to refresh co-occurrence index: {e}")
+        return self._state[1].recommend(normalize_history(viewing_history), k or settings.MOVIE_RECOMMENDER_CANDIDATES)
+
+
+local_recommender = LocalRecommender()
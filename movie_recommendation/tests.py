@@ -1,3 +1,190 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+import httpx
+from django.core.management import call_command
+from django.db import DatabaseError
 from django.test import TestCase
+from django.utils import timezone
+from llm.cache import normalize_history, recommendation_cache
+from llm.models import CachedResponse
+from .models import MovieCooccurrence, MovieStat, ViewingHistory
+from .recommender import local_recommender
+from llm.tests import claude_reply, patch_upstream
 
-# Create your tests here.
+
+class RecommendMovieTests(TestCase):
+    def setUp(self):
+        recommendation_cache.clear()
+        local_recommender.invalidate()
+
+    def test_recommendation(self):
+        def handler(request):
+            body = json.loads(request.content)
+            self.assertIn('인셉션', body['messages'][0]['content'])
+            return httpx.Response(200, json=claude_reply({'summary': 'ok'}))
+
+        with patch_upstream(handler):
+            response = self.client.post(
+                '/api/recommendation/recommendation/',
+                {'viewing_history': ['인셉션']},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'summary': 'ok'})
+
+    def test_missing_history(self):
+        response = self.client.post('/api/recommendation/recommendation/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_upstream_failure(self):
+        with patch_upstream(lambda request: httpx.Response(400)):
+            response = self.client.post(
+                '/api/recommendation/recommendation/',
+                {'viewing_history': ['인셉션']},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 500)
+
+    def post(self, viewing_history):
+        return self.client.post(
+            '/api/recommendation/recommendation/',
+            {'viewing_history': viewing_history},
+            content_type='application/json',
+        )
+
+    def test_normalize_history(self):
+        self.assertEqual(normalize_history([' Inception ', 'the  Matrix']), ('inception', 'the matrix'))
+        self.assertEqual(normalize_history('The Matrix,inception\n'), ('inception', 'the matrix'))
+
+    def test_cache_tiers(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json=claude_reply({'summary': 'ok'}))
+
+        with patch_upstream(handler):
+            self.assertEqual(self.post(['Inception', 'The Matrix']).json(), {'summary': 'ok'})
+            # 순서·공백·대소문자만 다른 요청은 메모리 계층에서 응답
+            self.assertEqual(self.post(['the matrix ', 'INCEPTION']).json(), {'summary': 'ok'})
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(CachedResponse.objects.count(), 1)
+
+            # 메모리 계층이 비어도 DB 계층에서 응답
+            recommendation_cache.clear()
+            self.assertEqual(self.post(['Inception', 'The Matrix']).json(), {'summary': 'ok'})
+            self.assertEqual(len(calls), 1)
+
+            self.post(['Interstellar'])
+            self.assertEqual(len(calls), 2)
+
+        stats = self.client.get('/api/recommendation/recommendation/cache/stats/').json()
+        self.assertEqual((stats['memoryHits'], stats['dbHits'], stats['misses']), (0, 1, 1))
+
+    def test_expired_entry_is_refreshed(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, json=claude_reply({'summary': len(calls)}))
+
+        with patch_upstream(handler), patch.object(recommendation_cache, 'ttl', 0):
+            self.post(['Inception'])
+            self.assertEqual(self.post(['Inception']).json(), {'summary': 2})
+        self.assertEqual(len(calls), 2)
+
+    def test_failures_are_not_cached(self):
+        with patch_upstream(lambda request: httpx.Response(400)):
+            self.assertEqual(self.post(['Inception']).status_code, 500)
+        self.assertFalse(CachedResponse.objects.exists())
+
+
+class LocalRecommenderTests(TestCase):
+    histories = [
+        ['Inception', 'Interstellar', 'The Prestige'],
+        ['inception ', 'Interstellar'],
+        ['Inception', 'Tenet'],
+        ['Parasite', 'Memories of Murder'],
+    ]
+
+    def setUp(self):
+        recommendation_cache.clear()
+        local_recommender.invalidate()
+        ViewingHistory.objects.bulk_create(ViewingHistory(titles=titles) for titles in self.histories)
+        call_command('build_cooccurrence', stdout=StringIO())
+
+    def post(self, viewing_history, mode):
+        return self.client.post(
+            '/api/recommendation/recommendation/',
+            {'viewing_history': viewing_history, 'mode': mode},
+            content_type='application/json',
+        )
+
+    def test_incremental_build_matches_rebuild(self):
+        self.assertEqual(MovieStat.objects.get(key='inception').count, 3)
+        self.assertEqual(MovieCooccurrence.objects.get(movie='inception', other='interstellar').count, 2)
+
+        ViewingHistory.objects.create(titles=['Interstellar', 'Inception'])
+        call_command('build_cooccurrence', stdout=StringIO())
+        incremental = set(MovieCooccurrence.objects.values_list('movie', 'other', 'count'))
+        self.assertIn(('interstellar', 'inception', 3), incremental)
+
+        call_command('build_cooccurrence', '--rebuild', stdout=StringIO())
+        self.assertEqual(set(MovieCooccurrence.objects.values_list('movie', 'other', 'count')), incremental)
+
+    def test_fast_mode(self):
+        response = self.post(['INCEPTION'], 'fast')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['source'], 'local')
+        self.assertEqual(body['recommendation']['title']['original'], 'Interstellar')
+        titles = [candidate['title'] for candidate in body['candidates']]
+        self.assertEqual(titles[:3], ['Interstellar', 'Tenet', 'The Prestige'])
+        self.assertNotIn('Inception', titles)
+        # 요청 기록은 다음 학습에 쓰이도록 저장
+        self.assertEqual(ViewingHistory.objects.count(), len(self.histories) + 1)
+
+        self.assertEqual(self.post(['Unknown movie'], 'fast').status_code, 404)
+        self.assertEqual(self.post(['Inception'], 'slow').status_code, 400)
+
+    def test_history_is_recorded_once_per_day(self):
+        for history in (['Tenet', 'Parasite'], ['parasite', ' TENET'], ['Tenet', 'Parasite']):
+            self.assertEqual(self.post(history, 'fast').status_code, 200)
+        self.assertEqual(ViewingHistory.objects.count(), len(self.histories) + 1)
+
+        with patch.object(ViewingHistory.objects, 'bulk_create', side_effect=DatabaseError('locked')):
+            with self.assertLogs('movie_recommendation.recommender', 'ERROR'):
+                self.assertEqual(self.post(['Inception'], 'fast').status_code, 200)
+
+    def test_prune_viewing_history(self):
+        old = timezone.now() - timedelta(days=40)
+        ViewingHistory.objects.update(created_at=old)
+        # 아직 학습에 반영되지 않은 기록은 오래돼도 남김
+        pending = ViewingHistory.objects.create(titles=['Tenet'])
+        ViewingHistory.objects.filter(pk=pending.pk).update(created_at=old)
+        ViewingHistory.objects.create(titles=['Parasite'])
+
+        out = StringIO()
+        call_command('prune_viewing_history', '--days', '30', '--batch-size', '3', stdout=out)
+        self.assertIn(f'Deleted {len(self.histories)}', out.getvalue())
+        self.assertEqual(ViewingHistory.objects.count(), 2)
+
+    def test_llm_falls_back_to_local(self):
+        with patch_upstream(lambda request: httpx.Response(503)):
+            response = self.post(['Parasite'], 'llm')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['fallback'])
+        self.assertEqual(response.json()['recommendation']['title']['original'], 'Memories of Murder')
+
+    def test_hybrid_passes_candidates(self):
+        def handler(request):
+            body = json.loads(request.content)
+            self.assertIn('Candidates', body['system'][0]['text'])
+            self.assertTrue(body['messages'][0]['content'].startswith('Interstellar, Tenet'))
+            return httpx.Response(200, json=claude_reply({'summary': 'hybrid'}))
+
+        with patch_upstream(handler):
+            response = self.post(['Inception'], 'hybrid')
+        self.assertEqual(response.json(), {'summary': 'hybrid'})
@@ -1,6 +1,7 @@
 from django.urls import path, include
-from .views import recommendMovie
+from .views import recommendMovie, recommendationCacheStats
 
 urlpatterns = [
     path("recommendation/", recommendMovie),
-]
\ No newline at end of file
+    path("recommendation/cache/stats/", recommendationCacheStats),
+]
@@ -1,56 +1,107 @@
-from rest_framework.response import Response
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.decorators import api_view
+from rest_framework.response import Response
 from rest_framework import status
-import requests
-import os
-import json
+from llm.cache import make_key, normalize_history, recommendation_cache
+from llm.client import get_client, build_payload, parse_json_reply, LLMError
+from llm.http import read_request_data, json_response, unavailable_response
+from llm.prompts import prompts
+from llm.resilience import UpstreamUnavailable
+from llm.singleflight import single_flight
+from .recommender import local_recommender, record_history
+
+MODES = ('fast', 'llm', 'hybrid')
+
+def local_response(candidates, fallback=False):
+    """로컬 추천 결과를 모델 응답과 비슷한 형태로 만듭니다"""
+    title, _ = candidates[0]
+    return {
+        'recommendation': {
+            'title': {'original': title, 'korean': title},
+            'recommendationReason': 'Often watched together with the movies in your viewing history.',
+        },
+        'candidates': [{'title': title, 'score': score} for title, score in candidates],
+        'summary': f"People who watched your movies also watched {title}.",
+        'source': 'local',
+        'fallback': fallback,
+    }
+
 
 # Create your views here.
-@api_view(['POST'])
-def recommendMovie(request):
-    viewing_history = request.data.get('viewing_history')
+@csrf_exempt
+@require_POST
+async def recommendMovie(request):
+    data = read_request_data(request)
+    viewing_history = data.get('viewing_history')
+    # fast: 로컬 추천만, llm: 모델 (기본값), hybrid: 로컬 후보 중에서 모델이 선택
+    mode = data.get('mode') or request.GET.get('mode', 'llm')
     
     if not viewing_history: 
-        return Response({'error': 'viewing_history is required'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # 프롬프트 파일을 읽어오기
-    prompt_path = os.path.join(os.path.dirname(__file__), 'prompts', 'ai_prompt.txt') 
-    with open(prompt_path, 'r', encoding='utf-8') as file: 
-        prompt_template = file.read()
-
-    # 프롬프트에 시청 기록을 삽입 
-    prompt = prompt_template.format(viewing_history=viewing_history)
-
-    # Claude API 호출
-    api_url = os.environ.get('X_API_URL') 
-
-    headers = { 
-        'x-api-key': os.environ.get('X_API_KEY'), 
-        'content-type': 'application/json',
-        'anthropic-version': '2023-06-01',
-        } 
-    
-    post_data = {
-            'model': 'claude-3-5-sonnet-20241022',
-            'max_tokens': 1024,
-            'messages': [
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-        }
-    
-    response = requests.post(
-        url = api_url, 
-        json = post_data,
-        headers = headers
-    )
-
-    if response.status_code == 200: 
-        return Response(json.loads(response.json()["content"][0]["text"]), status=status.HTTP_200_OK) 
-    else: 
-        return Response(
+        return json_response({'error': 'viewing_history is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if mode not in MODES:
+        return json_response({'error': f"mode must be one of {', '.join(MODES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 공동 출현 후보를 메모리 인덱스에서 조회
+    candidates = await local_recommender.arecommend(viewing_history)
+
+    if mode == 'fast':
+        # 학습용으로 기록 (같은 기록은 하루 한 번만 저장)
+        await sync_to_async(record_history)(viewing_history)
+        if not candidates:
+            return json_response(
+                {'error': 'No local recommendation for this viewing history yet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return json_response(local_response(candidates), status=status.HTTP_200_OK)
+
+    # 프롬프트에 시청 기록을 삽입 (템플릿은 시작 시 로드, 파일이 바뀌면 다시 로드)
+    # hybrid는 후보 목록만 넘겨 모델이 고르게 하므로 프롬프트와 답변이 짧아짐
+    if mode == 'hybrid' and candidates:
+        template = prompts.get('movie_recommendation_hybrid')
+        candidate_titles = ', '.join(title for title, _ in candidates)
+        system, prompt = template.render_parts(candidates=candidate_titles, viewing_history=viewing_history)
+        key_parts = (normalize_history(viewing_history), template.version, settings.LLM_MODEL, candidate_titles)
+    else:
+        template = prompts.get('movie_recommendation')
+        system, prompt = template.render_parts(viewing_history=viewing_history)
+        key_parts = (normalize_history(viewing_history), template.version, settings.LLM_MODEL)
+
+    # 같은 시청 기록(순서·대소문자 무관) + 프롬프트 버전 + 모델이면 캐시된 응답 사용
+    cache_key = make_key(*key_parts)
+    cached = await recommendation_cache.aget(cache_key)
+    if cached is not None:
+        return json_response(cached, status=status.HTTP_200_OK)
+
+    # 캐시에 없는 요청만 학습용으로 기록 (같은 기록은 하루 한 번만 저장)
+    await sync_to_async(record_history)(viewing_history)
+
+    async def fetch():
+        response_json = await get_client().create_message(build_payload(prompt, system=system))
+        recommendation = parse_json_reply(response_json)
+        await recommendation_cache.aset(cache_key, recommendation)
+        return recommendation
+
+    # Claude API 호출 (공용 비동기 클라이언트), 동시에 들어온 같은 요청은 한 번만 호출
+    # 업스트림이 느리거나 장애면 로컬 추천으로 대신 응답
+    try:
+        recommendation = await single_flight.do(cache_key, fetch)
+    except UpstreamUnavailable as e:
+        if candidates:
+            return json_response(local_response(candidates, fallback=True), status=status.HTTP_200_OK)
+        return unavailable_response({'error': 'Recommendation is temporarily unavailable, retry later'}, e)
+    except LLMError:
+        if candidates:
+            return json_response(local_response(candidates, fallback=True), status=status.HTTP_200_OK)
+        return json_response(
             {'error': 'Failed to get recommendation from Claude API'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+    return json_response(recommendation, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def recommendationCacheStats(request):
+    return Response(recommendation_cache.stats())
@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import WorldCupInfo, WorldCupItem
+from .models import WorldCupInfo, WorldCupItem, WorldCupItemStat
 
 # Register your models here.
 admin.site.register(WorldCupInfo)
-admin.site.register(WorldCupItem)
\ No newline at end of file
+admin.site.register(WorldCupItem)
+admin.site.register(WorldCupItemStat)
\ No newline at end of file
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MovieWorldcupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movie_worldcup'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,75 @@
+import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from .models import WorldCupInfo
+from .serializers import WorldCupInfoSerializer
+
+EMPTY_PAYLOAD = b'[]'
+ARCHIVE_KEY = 'worldcup:archive'
+
+
+def month_range(year, month):
+    """해당 월의 [시작일, 다음 달 1일) 범위를 반환합니다. 잘못된 값이면 ValueError"""
+    startDate = datetime.date(year, month, 1)
+    endDate = datetime.date(year, month + 1, 1) if month < 12 else datetime.date(year + 1, 1, 1)
+    return startDate, endDate
+
+
+def monthly_info_key(year, month):
+    return f'worldcup:monthlyInfo:{year}:{month}'
+
+
+def monthly_info_timeout(year, month):
+    """지난 달은 바뀌지 않으므로 무기한, 이번 달(이후)은 짧은 TTL"""
+    today = timezone.localdate()
+    if (year, month) < (today.year, today.month):
+        return None
+    return settings.WORLDCUP_CURRENT_MONTH_CACHE_TTL
+
+
+def get_monthly_info_payload(year, month):
+    """월별 WorldCupInfo 목록을 JSON 바이트로 반환합니다 (캐시 우선)."""
+    key = monthly_info_key(year, month)
+    payload = cache.get(key)
+    if payload is None:
+        startDate, endDate = month_range(year, month)
+        worldCupInfo = WorldCupInfo.objects.filter(createdDate__gte=startDate, createdDate__lt=endDate)
+        serializer = WorldCupInfoSerializer(worldCupInfo, many=True)
+        payload = JSONRenderer().render(serializer.data)
+        cache.set(key, payload, monthly_info_timeout(year, month))
+    return payload
+
+
+def invalidate_month(date):
+    """해당 월 캐시를 지웁니다. 커밋 전에 다른 요청이 옛 값을 다시 채울 수 있어 커밋 후 한 번 더 지움"""
+    if date is None:
+        return
+    key = monthly_info_key(date.year, date.month)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_archive_payload():
+    """월드컵이 있는 (year, month, count) 목록을 최신 월부터 JSON 바이트로 반환합니다 (캐시 우선)."""
+    payload = cache.get(ARCHIVE_KEY)
+    if payload is None:
+        buckets = (
+            WorldCupInfo.objects
+            .annotate(year=ExtractYear('createdDate'), month=ExtractMonth('createdDate'))
+            .values('year', 'month')
+            .annotate(count=Count('pk'))
+            .order_by('-year', '-month')
+        )
+        payload = JSONRenderer().render(list(buckets))
+        cache.set(ARCHIVE_KEY, payload, None)
+    return payload
+
+
+def invalidate_archive():
+    cache.delete(ARCHIVE_KEY)
+    transaction.on_commit(lambda: cache.delete(ARCHIVE_KEY))
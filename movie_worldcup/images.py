@@ -0,0 +1,168 @@
+"""
+월드컵 이미지 리사이즈 변형본(WebP/JPEG) 생성
+
+generate_variants()는 Django에 의존하지 않는 순수 함수라서
+별도 프로세스(ProcessPoolExecutor)에서 그대로 실행됩니다.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# 변형본이 아직 다 만들어지지 않은 이미지의 URL 맵을 캐시하는 시간 (초). 다 만들어진 맵은 무기한
+PARTIAL_VARIANTS_TTL = 60
+
+
+def variant_name(name, width, fmt):
+    """images/info/poster.png -> images/info/variants/poster_w320.webp"""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}_w{width}.{fmt}')
+
+
+def generate_variants(media_root, name, widths, force=False):
+    """원본 이미지의 너비별 WebP/JPEG 변형본을 만들고 생성한 파일 이름 목록을 반환합니다.
+
+    원본보다 큰 너비는 원본 크기로 저장하며(업스케일 없음),
+    원본보다 최신인 변형본이 이미 있으면 건너뜁니다.
+    """
+    source = os.path.join(media_root, name)
+    source_mtime = os.path.getmtime(source)
+    targets = []
+    for width in widths:
+        for fmt in VARIANT_FORMATS:
+            target = variant_name(name, width, fmt)
+            path = os.path.join(media_root, target)
+            if force or not os.path.exists(path) or os.path.getmtime(path) < source_mtime:
+                targets.append((width, fmt, target, path))
+    if not targets:
+        return []
+
+    created = []
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        resized = {}
+        for width, fmt, target, path in targets:
+            if width not in resized:
+                if image.width > width:
+                    height = max(1, round(image.height * width / image.width))
+                    resized[width] = image.resize((width, height), Image.LANCZOS)
+                else:
+                    resized[width] = image
+            variant = resized[width]
+            if fmt == 'jpeg' and variant.mode == 'RGBA':
+                # JPEG는 투명도를 지원하지 않으므로 흰 배경에 합성
+                background = Image.new('RGB', variant.size, (255, 255, 255))
+                background.paste(variant, mask=variant.getchannel('A'))
+                variant = background
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pil_format, options = VARIANT_FORMATS[fmt]
+            # 다른 요청이 쓰는 중인 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            variant.save(tmp_path, pil_format, **options)
+            os.replace(tmp_path, path)
+            created.append(target)
+    return created
+
+
+def variants_key(name):
+    return 'worldcup:variants:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def variant_urls(fieldfile, widths):
+    """이미지 필드의 변형본 URL 맵 {'webp': {'320': url, ...}, 'jpeg': {...}} (없으면 빈 dict)
+
+    직렬화할 때마다 storage.exists()를 부르지 않도록 결과를 캐시하며,
+    변형본을 만들면 forget_variants()로 지웁니다.
+    """
+    from django.core.cache import cache
+
+    if not fieldfile:
+        return {}
+    key = variants_key(fieldfile.name)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == tuple(widths):
+        return cached[1]
+    storage = fieldfile.storage
+    urls = {}
+    found = 0
+    for fmt in VARIANT_FORMATS:
+        for width in widths:
+            name = variant_name(fieldfile.name, width, fmt)
+            if storage.exists(name):
+                urls.setdefault(fmt, {})[str(width)] = storage.url(name)
+                found += 1
+    complete = found == len(VARIANT_FORMATS) * len(widths)
+    cache.set(key, (tuple(widths), urls), None if complete else PARTIAL_VARIANTS_TTL)
+    return urls
+
+
+def forget_variants(name):
+    """캐시된 변형본 URL 맵을 지웁니다 (변형본을 새로 만든 뒤 호출)"""
+    from django.core.cache import cache
+
+    cache.delete(variants_key(name))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+def _get_executor(workers, queue_size):
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            # 스레드가 있는 웹 워커에서 fork하지 않도록 spawn 사용
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _slots = threading.BoundedSemaphore(queue_size)
+        return _executor, _slots
+
+
+def schedule_variants(fieldfile, on_done=None):
+    """요청 경로 밖(프로세스 풀)에서 변형본 생성을 예약합니다.
+
+    대기 작업이 WORLDCUP_IMAGE_QUEUE_SIZE를 넘으면 건너뛰며,
+    빠진 이미지는 worldcup_image_variants 명령으로 채울 수 있습니다.
+    WORLDCUP_IMAGE_WORKERS가 0이면 현재 프로세스에서 바로 처리합니다.
+    """
+    from django.conf import settings
+
+    if not fieldfile:
+        return
+    media_root = str(settings.MEDIA_ROOT)
+    widths = tuple(settings.WORLDCUP_IMAGE_WIDTHS)
+    if settings.WORLDCUP_IMAGE_WORKERS <= 0:
+        generate_variants(media_root, fieldfile.name, widths)
+        forget_variants(fieldfile.name)
+        if on_done:
+            on_done()
+        return
+
+    executor, slots = _get_executor(settings.WORLDCUP_IMAGE_WORKERS, settings.WORLDCUP_IMAGE_QUEUE_SIZE)
+    if not slots.acquire(blocking=False):
+        logger.warning(f"Image variant queue is full, skipping {fieldfile.name}")
+        return
+
+    def done(future):
+        slots.release()
+        if future.exception() is not None:
+            logger.error(f"Failed to generate variants for {fieldfile.name}: {future.exception()}")
+            return
+        forget_variants(fieldfile.name)
+        if on_done:
+            on_done()
+
+    future = executor.submit(generate_variants, media_root, fieldfile.name, widths)
+    future.add_done_callback(done)
@@ -0,0 +1,49 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from movie_worldcup.cache import invalidate_month
+from movie_worldcup.images import forget_variants, generate_variants
+from movie_worldcup.models import WorldCupInfo, WorldCupItem
+
+
+class Command(BaseCommand):
+    help = "기존 월드컵 이미지의 리사이즈 변형본(WebP/JPEG)을 병렬로 생성합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="프로세스 수")
+        parser.add_argument('--force', action='store_true', help="이미 있는 변형본도 다시 생성")
+
+    def handle(self, *args, **options):
+        names = set(WorldCupInfo.objects.exclude(infoImage='').values_list('infoImage', flat=True))
+        names |= set(WorldCupItem.objects.exclude(itemImage='').values_list('itemImage', flat=True))
+        media_root = str(settings.MEDIA_ROOT)
+        widths = tuple(settings.WORLDCUP_IMAGE_WIDTHS)
+
+        started = time.perf_counter()
+        created = failed = 0
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {
+                executor.submit(generate_variants, media_root, name, widths, options['force']): name
+                for name in sorted(names)
+            }
+            for future in as_completed(futures):
+                try:
+                    created += len(future.result())
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{futures[future]}: {e}")
+
+        # srcset이 목록 캐시에 반영되도록 변형본 URL 캐시와 월별 캐시를 비움
+        for name in names:
+            forget_variants(name)
+        for createdDate in WorldCupInfo.objects.values_list('createdDate', flat=True).distinct():
+            invalidate_month(createdDate)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {len(names)} images in {elapsed:.2f}s: {created} variants created, {failed} failed."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie_worldcup', '0002_remove_worldcupinfo_image_remove_worldcupitem_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='worldcupinfo',
+            name='createdDate',
+            field=models.DateField(auto_now=True, db_index=True),
+        ),
+    ]
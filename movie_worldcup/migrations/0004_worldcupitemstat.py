@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 07:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie_worldcup', '0003_worldcupinfo_createddate_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorldCupItemStat',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stat', serialize=False, to='movie_worldcup.worldcupitem')),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('matches', models.PositiveIntegerField(default=0)),
+                ('championships', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
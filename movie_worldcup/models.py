@@ -7,10 +7,17 @@ class WorldCupInfo(models.Model):
     description = models.TextField('')
     totalRound = models.IntegerField(default=4)
     infoImage = models.ImageField(upload_to='images/info/', blank=True)
-    createdDate = models.DateField(auto_now=True)
+    createdDate = models.DateField(auto_now=True, db_index=True)
 
 class WorldCupItem(models.Model):
     worldCupId = models.ForeignKey(WorldCupInfo, on_delete=models.CASCADE)
     itemId = models.AutoField(primary_key=True, unique=True)
     itemImage = models.ImageField(upload_to='images/items/', blank=True)
-    description = models.CharField(max_length=200)
\ No newline at end of file
+    description = models.CharField(max_length=200)
+
+class WorldCupItemStat(models.Model):
+    """아이템별 누적 대결 통계 (votes.VoteBuffer가 모아서 F() 증가로 반영)"""
+    item = models.OneToOneField(WorldCupItem, on_delete=models.CASCADE, primary_key=True, related_name='stat')
+    wins = models.PositiveIntegerField(default=0)
+    matches = models.PositiveIntegerField(default=0)
+    championships = models.PositiveIntegerField(default=0)
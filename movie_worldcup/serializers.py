@@ -1,12 +1,66 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import WorldCupInfo, WorldCupItem
+from .images import variant_urls
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """fields 인자로 출력할 필드를 줄일 수 있는 시리얼라이저"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
 
 class WorldCupInfoSerializer(serializers.ModelSerializer):
+    infoImageSrcset = serializers.SerializerMethodField()
+
     class Meta:
         model = WorldCupInfo
-        fields = ('worldCupId', 'title', 'description', 'totalRound', 'infoImage', 'createdDate')
+        fields = ('worldCupId', 'title', 'description', 'totalRound', 'infoImage', 'infoImageSrcset', 'createdDate')
+
+    def get_infoImageSrcset(self, obj):
+        return variant_urls(obj.infoImage, settings.WORLDCUP_IMAGE_WIDTHS)
+
+class WorldCupItemSerializer(DynamicFieldsModelSerializer):
+    itemImageSrcset = serializers.SerializerMethodField()
 
-class WorldCupItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorldCupItem
-        fields = ('worldCupId', 'itemId', 'itemImage', 'description')
\ No newline at end of file
+        fields = ('worldCupId', 'itemId', 'itemImage', 'itemImageSrcset', 'description')
+
+    def get_itemImageSrcset(self, obj):
+        return variant_urls(obj.itemImage, settings.WORLDCUP_IMAGE_WIDTHS)
+
+
+class WorldCupBundleSerializer(DynamicFieldsModelSerializer, WorldCupInfoSerializer):
+    """WorldCupInfo + 소속 WorldCupItem 목록 (prefetch_related('worldcupitem_set') 필요)"""
+
+    def __init__(self, *args, **kwargs):
+        item_fields = kwargs.pop('item_fields', None)
+        super().__init__(*args, **kwargs)
+        if 'items' in self.fields:
+            self.fields['items'] = WorldCupItemSerializer(source='worldcupitem_set', many=True, fields=item_fields)
+
+    items = WorldCupItemSerializer(source='worldcupitem_set', many=True)
+
+    class Meta(WorldCupInfoSerializer.Meta):
+        fields = WorldCupInfoSerializer.Meta.fields + ('items',)
+
+
+class WorldCupRankingSerializer(serializers.ModelSerializer):
+    """아이템 승률 순위 (wins/matches/championships 주석(annotate) 필요)"""
+    wins = serializers.IntegerField(read_only=True)
+    matches = serializers.IntegerField(read_only=True)
+    championships = serializers.IntegerField(read_only=True)
+    winRate = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WorldCupItem
+        fields = ('itemId', 'itemImage', 'description', 'wins', 'matches', 'championships', 'winRate')
+
+    def get_winRate(self, obj):
+        return round(obj.wins / obj.matches, 4) if obj.matches else 0.0
@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import WorldCupInfo, WorldCupItem
+from .cache import invalidate_archive, invalidate_month
+from .images import schedule_variants
+
+
+def loaded_image_name(instance, field):
+    value = instance.__dict__.get(field)
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_init, sender=WorldCupInfo)
+@receiver(post_init, sender=WorldCupItem)
+def remember_loaded_image(sender, instance, **kwargs):
+    """이미지가 바뀐 저장에서만 변형본을 만들도록 불러온 이미지 이름을 기억"""
+    field = 'infoImage' if sender is WorldCupInfo else 'itemImage'
+    instance._loaded_image = loaded_image_name(instance, field)
+
+
+def image_changed(instance, fieldfile, created):
+    """이미지가 있고 새 행이거나 불러온(마지막으로 변형본을 예약한) 뒤 바뀌었으면 True"""
+    if not fieldfile or (not created and fieldfile.name == getattr(instance, '_loaded_image', None)):
+        return False
+    instance._loaded_image = fieldfile.name
+    return True
+
+
+@receiver(pre_save, sender=WorldCupInfo)
+def remember_previous_month(sender, instance, **kwargs):
+    """createdDate는 auto_now라 저장 시 바뀌므로 이전 월을 기억해 둠"""
+    instance._previous_created_date = None
+    if instance.pk is not None:
+        instance._previous_created_date = (
+            WorldCupInfo.objects.filter(pk=instance.pk).values_list('createdDate', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=WorldCupInfo)
+def worldcup_info_saved(sender, instance, created, **kwargs):
+    invalidate_month(getattr(instance, '_previous_created_date', None))
+    invalidate_month(instance.createdDate)
+    invalidate_archive()
+    if image_changed(instance, instance.infoImage, created):
+        # 변형본이 만들어지면 목록 캐시에 srcset이 반영되도록 다시 무효화
+        createdDate = instance.createdDate
+        transaction.on_commit(
+            lambda: schedule_variants(instance.infoImage, on_done=lambda: invalidate_month(createdDate))
+        )
+
+
+@receiver(post_save, sender=WorldCupItem)
+def worldcup_item_saved(sender, instance, created, **kwargs):
+    if image_changed(instance, instance.itemImage, created):
+        transaction.on_commit(lambda: schedule_variants(instance.itemImage))
+
+
+@receiver(post_delete, sender=WorldCupInfo)
+def worldcup_info_deleted(sender, instance, **kwargs):
+    invalidate_month(instance.createdDate)
+    invalidate_archive()
@@ -1,3 +1,343 @@
-from django.test import TestCase
+import datetime
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from .models import WorldCupInfo, WorldCupItem, WorldCupItemStat
+from .cache import monthly_info_timeout
+from .serializers import WorldCupBundleSerializer
+from .images import generate_variants, variant_name, variant_urls
+from .votes import tally_bracket, BracketError, VoteBuffer
 
-# Create your tests here.
+# 테스트가 실제 파일 캐시(BASE_DIR/django_cache)를 비우지 않도록 메모리 캐시 사용
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MonthlyWorldCupInfoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.today = timezone.localdate()
+        self.info = WorldCupInfo.objects.create(title="영화 월드컵", description="설명", totalRound=8)
+
+    def url(self, date):
+        return f'/api/worldcup/monthlyWorldCupInfo/{date.year}/{date.month}'
+
+    def test_monthly_info(self):
+        response = self.client.get(self.url(self.today))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['title'], "영화 월드컵")
+
+    def test_monthly_info_cached(self):
+        self.client.get(self.url(self.today))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url(self.today))
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_invalidated_on_save_and_delete(self):
+        self.client.get(self.url(self.today))
+        self.info.title = "바뀐 제목"
+        self.info.save()
+        self.assertEqual(self.client.get(self.url(self.today)).json()[0]['title'], "바뀐 제목")
+
+        self.info.delete()
+        self.assertEqual(self.client.get(self.url(self.today)).status_code, 400)
+
+    def test_previous_month_invalidated_when_moved(self):
+        """auto_now로 createdDate가 바뀌면 이전 월 캐시도 지워야 함"""
+        last_month = self.today.replace(day=1) - datetime.timedelta(days=1)
+        WorldCupInfo.objects.filter(pk=self.info.pk).update(createdDate=last_month)
+        self.assertEqual(self.client.get(self.url(last_month)).status_code, 200)
+        self.info.save()
+        self.assertEqual(self.client.get(self.url(last_month)).status_code, 400)
+
+    def test_empty_month(self):
+        response = self.client.get('/api/worldcup/monthlyWorldCupInfo/2000/1')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "worldCupInfo is empty")
+
+    def test_invalid_month(self):
+        response = self.client.get('/api/worldcup/monthlyWorldCupInfo/2024/13')
+        self.assertEqual(response.status_code, 400)
+
+    def test_timeout(self):
+        self.assertIsNone(monthly_info_timeout(2000, 1))
+        with self.settings(WORLDCUP_CURRENT_MONTH_CACHE_TTL=30):
+            self.assertEqual(monthly_info_timeout(self.today.year, self.today.month), 30)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MonthlyWorldCupBundleTests(TestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        self.url = f'/api/worldcup/monthlyWorldCupBundle/{today.year}/{today.month}'
+        for i in range(3):
+            info = WorldCupInfo.objects.create(title=f"월드컵 {i}", description="설명")
+            for j in range(4):
+                WorldCupItem.objects.create(worldCupId=info, description=f"영화 {i}-{j}")
+
+    def test_bundle_uses_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 3)
+        self.assertEqual(len(data[0]['items']), 4)
+        self.assertIn('description', data[0]['items'][0])
+
+    def test_bundle_fields_projection(self):
+        response = self.client.get(self.url, {'fields': 'worldCupId,title,items.itemId'})
+        data = response.json()
+        self.assertEqual(set(data[0]), {'worldCupId', 'title', 'items'})
+        self.assertEqual(set(data[0]['items'][0]), {'itemId'})
+
+    def test_bundle_without_items_uses_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'fields': 'title'})
+        self.assertEqual(set(response.json()[0]), {'title'})
+
+    def test_bundle_empty_fields_returns_all_fields(self):
+        for fields in ('', ',', ' , '):
+            data = self.client.get(self.url, {'fields': fields}).json()
+            self.assertEqual(set(data[0]), set(WorldCupBundleSerializer.Meta.fields))
+            self.assertEqual(len(data[0]['items']), 4)
+
+    def test_bundle_unknown_field(self):
+        response = self.client.get(self.url, {'fields': 'title,items.secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('items.secret', response.json()['error'])
+
+    def test_bundle_empty_month(self):
+        response = self.client.get('/api/worldcup/monthlyWorldCupBundle/2000/1')
+        self.assertEqual(response.status_code, 400)
+
+
+def make_image_file(name, size=(800, 600), mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WorldCupImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = self.settings(MEDIA_ROOT=self.media_root, WORLDCUP_IMAGE_WIDTHS=(160, 320), WORLDCUP_IMAGE_WORKERS=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_generate_variants(self):
+        info = WorldCupInfo.objects.create(title="t", description="d", infoImage=make_image_file('poster.png', mode='RGBA'))
+        created = generate_variants(self.media_root, info.infoImage.name, (160, 1000))
+        self.assertEqual(len(created), 4)
+        with Image.open(os.path.join(self.media_root, variant_name(info.infoImage.name, 160, 'webp'))) as image:
+            self.assertEqual(image.size, (160, 120))
+        # 원본보다 큰 너비는 업스케일하지 않음
+        with Image.open(os.path.join(self.media_root, variant_name(info.infoImage.name, 1000, 'jpeg'))) as image:
+            self.assertEqual(image.size, (800, 600))
+        # 이미 최신이면 건너뜀
+        self.assertEqual(generate_variants(self.media_root, info.infoImage.name, (160, 1000)), [])
+
+    def test_upload_generates_srcset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            info = WorldCupInfo.objects.create(title="t", description="d", infoImage=make_image_file('poster.png'))
+            WorldCupItem.objects.create(worldCupId=info, description="item", itemImage=make_image_file('item.png'))
+        today = timezone.localdate()
+        data = self.client.get(f'/api/worldcup/monthlyWorldCupInfo/{today.year}/{today.month}').json()
+        self.assertEqual(set(data[0]['infoImageSrcset']), {'webp', 'jpeg'})
+        self.assertTrue(data[0]['infoImageSrcset']['webp']['320'].endswith('poster_w320.webp'))
+
+        items = self.client.get(f'/api/worldcup/monthlyWorldCupItems/{info.pk}/').json()
+        self.assertEqual(set(items[0]['itemImageSrcset']['jpeg']), {'160', '320'})
+
+    def test_srcset_lookup_is_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            info = WorldCupInfo.objects.create(title="t", description="d", infoImage=make_image_file('poster.png'))
+        with patch.object(FileSystemStorage, 'exists', autospec=True, side_effect=FileSystemStorage.exists) as exists:
+            first = variant_urls(info.infoImage, (160, 320))
+            self.assertEqual(variant_urls(info.infoImage, (160, 320)), first)
+        self.assertEqual(exists.call_count, 4)
+        self.assertEqual(set(first['webp']), {'160', '320'})
+
+    def test_variants_only_scheduled_when_image_changes(self):
+        with patch('movie_worldcup.signals.schedule_variants') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                info = WorldCupInfo.objects.create(title="t", description="d", infoImage=make_image_file('poster.png'))
+                item = WorldCupItem.objects.create(worldCupId=info, description="i", itemImage=make_image_file('item.png'))
+            self.assertEqual(schedule.call_count, 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                info.title = "바뀐 제목"
+                info.save()
+                WorldCupItem.objects.get(pk=item.pk).save()
+            self.assertEqual(schedule.call_count, 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                info.infoImage = make_image_file('poster2.png')
+                info.save()
+            self.assertEqual(schedule.call_count, 3)
+
+    def test_no_image_empty_srcset(self):
+        today = timezone.localdate()
+        WorldCupInfo.objects.create(title="t", description="d")
+        data = self.client.get(f'/api/worldcup/monthlyWorldCupInfo/{today.year}/{today.month}').json()
+        self.assertEqual(data[0]['infoImageSrcset'], {})
+
+    def test_backfill_command_uses_process_pool(self):
+        info = WorldCupInfo.objects.create(title="t", description="d", infoImage=make_image_file('poster.png'))
+        out = StringIO()
+        call_command('worldcup_image_variants', '--workers', '2', stdout=out)
+        self.assertIn('4 variants created', out.getvalue())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, variant_name(info.infoImage.name, 320, 'jpeg'))))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WorldCupTournamentTests(TestCase):
+    def setUp(self):
+        self.info = WorldCupInfo.objects.create(title="4강", description="d", totalRound=4)
+        self.items = [WorldCupItem.objects.create(worldCupId=self.info, description=f"영화 {i}") for i in range(4)]
+        self.buffer = VoteBuffer()
+        patcher = patch('movie_worldcup.views.vote_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def bracket(self, champion=0):
+        a, b, c, d = (item.pk for item in self.items)
+        final_loser = c if champion == 0 else a
+        return {'matches': [
+            {'winner': a, 'loser': b},
+            {'winner': c, 'loser': d},
+            {'winner': a if champion == 0 else c, 'loser': final_loser},
+        ]}
+
+    def post_result(self, data):
+        return self.client.post(
+            f'/api/worldcup/worldCupResult/{self.info.pk}/', data, content_type='application/json')
+
+    def test_tally_bracket(self):
+        a, b, c, d = (item.pk for item in self.items)
+        champion, tally = tally_bracket(self.bracket()['matches'], {a, b, c, d}, 4)
+        self.assertEqual(champion, a)
+        self.assertEqual(tally[a], [2, 2, 1])
+        self.assertEqual(tally[c], [1, 2, 0])
+        self.assertEqual(tally[b], [0, 1, 0])
+
+    def test_invalid_brackets(self):
+        a, b, c, d = (item.pk for item in self.items)
+        ids = {a, b, c, d}
+        invalid = [
+            [{'winner': a, 'loser': b}],
+            [{'winner': a, 'loser': b}, {'winner': b, 'loser': c}, {'winner': a, 'loser': d}],
+            [{'winner': a, 'loser': b}, {'winner': c, 'loser': d}, {'winner': a, 'loser': 999}],
+            [{'winner': a, 'loser': a}, {'winner': c, 'loser': d}, {'winner': a, 'loser': c}],
+            # 결승에 1라운드 탈락자가 올라옴
+            [{'winner': a, 'loser': b}, {'winner': c, 'loser': d}, {'winner': b, 'loser': c}],
+            # 1라운드에서 두 번 출전
+            [{'winner': a, 'loser': b}, {'winner': a, 'loser': c}, {'winner': a, 'loser': d}],
+        ]
+        for matches in invalid:
+            with self.assertRaises(BracketError):
+                tally_bracket(matches, ids, 4)
+        with self.assertRaises(BracketError):
+            tally_bracket([{'winner': a, 'loser': b}, {'winner': a, 'loser': c}], ids, 3)
+
+    def test_non_object_body(self):
+        response = self.post_result([self.bracket()])
+        self.assertEqual(response.status_code, 400)
+
+    def test_results_are_buffered_then_flushed(self):
+        with self.settings(WORLDCUP_VOTE_FLUSH_SIZE=3, WORLDCUP_VOTE_FLUSH_INTERVAL=60):
+            for champion in (0, 0):
+                self.assertEqual(self.post_result(self.bracket(champion)).status_code, 202)
+            self.assertFalse(WorldCupItemStat.objects.exists())
+            self.assertEqual(self.buffer.pending_items(), 4)
+
+            self.post_result(self.bracket(2))
+
+        self.assertEqual(self.buffer.pending_items(), 0)
+        stats = {stat.item_id: (stat.wins, stat.matches, stat.championships) for stat in WorldCupItemStat.objects.all()}
+        a, b, c, d = (item.pk for item in self.items)
+        self.assertEqual(stats[a], (5, 6, 2))
+        self.assertEqual(stats[c], (4, 6, 1))
+        self.assertEqual(stats[b], (0, 3, 0))
+
+    def test_failed_flush_keeps_vote_and_rearms_timer(self):
+        with self.settings(WORLDCUP_VOTE_FLUSH_SIZE=1, WORLDCUP_VOTE_FLUSH_INTERVAL=60):
+            with patch('movie_worldcup.votes.write_stats', side_effect=DatabaseError('database is locked')):
+                with self.assertLogs('movie_worldcup.votes', 'ERROR'):
+                    response = self.post_result(self.bracket())
+        # 결과는 버퍼에 남았으므로 202 (재시도하면 두 번 집계됨), 새 결과가 없어도 타이머가 다시 반영
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.buffer.pending_items(), 4)
+        self.assertIsNotNone(self.buffer._timer)
+        self.addCleanup(self.buffer._timer.cancel)
+
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(WorldCupItemStat.objects.get(item=self.items[0]).championships, 1)
+
+    def test_flush_query_count_is_constant(self):
+        self.buffer.add({item.pk: [1, 1, 0] for item in self.items})
+        # 존재 확인 + INSERT OR IGNORE + UPDATE 1회 (+ savepoint)
+        with self.assertNumQueries(5):
+            self.buffer.flush()
+
+    def test_ranking(self):
+        with self.settings(WORLDCUP_VOTE_FLUSH_SIZE=1):
+            self.post_result(self.bracket(0))
+        response = self.client.get(f'/api/worldcup/worldCupRanking/{self.info.pk}/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data[0]['itemId'], self.items[0].pk)
+        self.assertEqual(data[0]['winRate'], 1.0)
+        self.assertEqual(data[0]['championships'], 1)
+        self.assertEqual(data[-1]['winRate'], 0.0)
+
+    def test_result_for_missing_worldcup(self):
+        response = self.client.post('/api/worldcup/worldCupResult/999/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class WorldCupArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for createdDate in ('2024-01-05', '2024-01-20', '2024-03-01', '2023-12-31'):
+            info = WorldCupInfo.objects.create(title="t", description="d")
+            WorldCupInfo.objects.filter(pk=info.pk).update(createdDate=createdDate)
+        cache.clear()
+
+    def test_archive_buckets(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/worldcup/worldCupArchive/')
+        self.assertEqual(response.json(), [
+            {'year': 2024, 'month': 3, 'count': 1},
+            {'year': 2024, 'month': 1, 'count': 2},
+            {'year': 2023, 'month': 12, 'count': 1},
+        ])
+        with self.assertNumQueries(0):
+            self.client.get('/api/worldcup/worldCupArchive/')
+
+    def test_archive_invalidated_on_write(self):
+        self.client.get('/api/worldcup/worldCupArchive/')
+        WorldCupInfo.objects.create(title="new", description="d")
+        today = timezone.localdate()
+        self.assertIn(
+            {'year': today.year, 'month': today.month, 'count': 1},
+            self.client.get('/api/worldcup/worldCupArchive/').json(),
+        )
+        WorldCupInfo.objects.get(title="new").delete()
+        self.assertEqual(len(self.client.get('/api/worldcup/worldCupArchive/').json()), 3)
@@ -1,7 +1,14 @@
 from django.urls import path, include
-from .views import monthlyWorldCupInfo, monthlyWorldCupItems
+from .views import (
+    monthlyWorldCupInfo, monthlyWorldCupItems, monthlyWorldCupBundle, worldCupArchive,
+    worldCupResult, worldCupRanking,
+)
 
 urlpatterns = [
     path("monthlyWorldCupInfo/<int:year>/<int:month>", monthlyWorldCupInfo),
-    path("monthlyWorldCupItems/<int:worldCupId>/", monthlyWorldCupItems)
+    path("monthlyWorldCupItems/<int:worldCupId>/", monthlyWorldCupItems),
+    path("monthlyWorldCupBundle/<int:year>/<int:month>", monthlyWorldCupBundle),
+    path("worldCupArchive/", worldCupArchive),
+    path("worldCupResult/<int:worldCupId>/", worldCupResult),
+    path("worldCupRanking/<int:worldCupId>/", worldCupRanking)
 ]
\ No newline at end of file
@@ -1,10 +1,13 @@
 from django.shortcuts import render
+from django.http import HttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from .models import WorldCupInfo, WorldCupItem
-from .serializers import WorldCupInfoSerializer, WorldCupItemSerializer
-import datetime
+from .serializers import WorldCupItemSerializer, WorldCupBundleSerializer, WorldCupRankingSerializer
+from .votes import tally_bracket, vote_buffer, BracketError
+from .cache import get_archive_payload, get_monthly_info_payload, month_range, EMPTY_PAYLOAD
 
 # Create your views here.
 @api_view(['GET'])
@@ -15,19 +18,22 @@ def monthlyWorldCupInfo(request, year, month):
     try: 
         year = int(year) 
         month = int(month) 
-        startDate = datetime.date(year, month, 1) 
-        endDate = datetime.date(year, month + 1, 1) if month < 12 else datetime.date(year + 1, 1, 1) 
-        worldCupInfo = WorldCupInfo.objects.filter( Q(createdDate__gte=startDate) & Q(createdDate__lt=endDate) )
-        if(len(worldCupInfo)<1):
+        payload = get_monthly_info_payload(year, month)
+        if payload == EMPTY_PAYLOAD:
             return Response({"error": "worldCupInfo is empty"}, status=400)
-        serializer = WorldCupInfoSerializer(worldCupInfo, many=True) 
-        return Response(serializer.data) 
+        return HttpResponse(payload, content_type='application/json')
     except ValueError: 
         return Response({"error": "Invalid year or month format."}, status=400) 
     except Exception as e: 
         return Response({"error": str(e)}, status=500)
     
 
+@api_view(['GET'])
+def worldCupArchive(request):
+    """월드컵이 있는 달 목록 [{year, month, count}] (빈 달을 하나씩 조회하지 않도록)"""
+    return HttpResponse(get_archive_payload(), content_type='application/json')
+
+
 @api_view(['GET'])
 def monthlyWorldCupItems(request, worldCupId):
     if not worldCupId: 
@@ -44,3 +50,88 @@ def monthlyWorldCupItems(request, worldCupId):
     except Exception as e: 
         return Response({"error": str(e)}, status=500)
 
+
+def parse_bundle_fields(value):
+    """fields 파라미터를 (월드컵 필드, 아이템 필드)로 나눕니다.
+
+    예) fields=worldCupId,title,items.itemId,items.itemImage
+    'items'만 주면 아이템의 모든 필드, items를 빼면 아이템을 조회하지 않음
+    비어 있으면(fields=, fields=, 등) 모든 필드
+    """
+    names = [part.strip() for part in (value or '').split(',') if part.strip()]
+    if not names:
+        return None, None
+    info_fields, item_fields = set(), set()
+    for name in names:
+        if name.startswith('items.'):
+            info_fields.add('items')
+            item_fields.add(name[len('items.'):])
+        else:
+            info_fields.add(name)
+    unknown = info_fields - set(WorldCupBundleSerializer.Meta.fields)
+    unknown |= {f"items.{name}" for name in item_fields - set(WorldCupItemSerializer.Meta.fields)}
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return info_fields, (item_fields or None)
+
+
+@api_view(['GET'])
+def monthlyWorldCupBundle(request, year, month):
+    """월별 월드컵 목록과 각 월드컵의 아이템을 한 번에 응답 (쿼리 2회)"""
+    try:
+        info_fields, item_fields = parse_bundle_fields(request.query_params.get('fields'))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    try:
+        startDate, endDate = month_range(int(year), int(month))
+    except ValueError:
+        return Response({"error": "Invalid year or month format."}, status=400)
+
+    worldCupInfo = WorldCupInfo.objects.filter(createdDate__gte=startDate, createdDate__lt=endDate)
+    if info_fields is None or 'items' in info_fields:
+        worldCupInfo = worldCupInfo.prefetch_related('worldcupitem_set')
+    worldCupInfo = list(worldCupInfo)
+    if not worldCupInfo:
+        return Response({"error": "worldCupInfo is empty"}, status=400)
+    serializer = WorldCupBundleSerializer(worldCupInfo, many=True, fields=info_fields, item_fields=item_fields)
+    return Response(serializer.data)
+
+
+@api_view(['POST'])
+def worldCupResult(request, worldCupId):
+    """완료된 대진 결과 1회분을 받아 아이템별 승리/대결 수를 집계 (버퍼에 모아 일괄 반영)"""
+    try:
+        worldCupInfo = WorldCupInfo.objects.get(worldCupId=worldCupId)
+    except WorldCupInfo.DoesNotExist:
+        return Response({"error": "worldCupInfo does not exist"}, status=404)
+
+    if not isinstance(request.data, dict):
+        return Response({"error": "request body must be a JSON object."}, status=400)
+    item_ids = set(WorldCupItem.objects.filter(worldCupId=worldCupInfo).values_list('itemId', flat=True))
+    try:
+        champion, tally = tally_bracket(request.data.get('matches'), item_ids, worldCupInfo.totalRound)
+    except BracketError as e:
+        return Response({"error": str(e)}, status=400)
+
+    vote_buffer.add(tally)
+    return Response({"champion": champion}, status=202)
+
+
+@api_view(['GET'])
+def worldCupRanking(request, worldCupId):
+    """월드컵 아이템 승률 순위 (대결 결과는 최대 WORLDCUP_VOTE_FLUSH_INTERVAL초 늦게 반영)"""
+    worldCupItems = WorldCupItem.objects.filter(worldCupId=worldCupId).annotate(
+        wins=Coalesce('stat__wins', Value(0)),
+        matches=Coalesce('stat__matches', Value(0)),
+        championships=Coalesce('stat__championships', Value(0)),
+    )
+    ranking = sorted(
+        worldCupItems,
+        key=lambda item: (item.wins / item.matches if item.matches else 0, item.championships),
+        reverse=True,
+    )
+    if not ranking:
+        return Response({"error": "worldCupItems are empty"}, status=400)
+    serializer = WorldCupRankingSerializer(ranking, many=True)
+    return Response(serializer.data)
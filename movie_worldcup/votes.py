@@ -0,0 +1,158 @@
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from .models import WorldCupItem, WorldCupItemStat
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ('wins', 'matches', 'championships')
+UPDATE_CHUNK_SIZE = 200
+
+
+class BracketError(ValueError):
+    """대진 결과가 올바르지 않을 때 발생"""
+
+
+def tally_bracket(matches, item_ids, totalRound):
+    """완료된 대진 결과를 검증하고 {itemId: [wins, matches, championships]}를 반환합니다.
+
+    matches: [{"winner": itemId, "loser": itemId}, ...] (진행 순서대로 totalRound - 1개)
+    라운드별로 totalRound/2, totalRound/4, ..., 1개의 대결이며, 각 라운드에는
+    직전 라운드의 승자만 한 번씩 출전합니다. 마지막 대결의 승자가 우승자입니다.
+    """
+    if totalRound < 2 or totalRound & (totalRound - 1):
+        raise BracketError("totalRound must be a power of two.")
+    if not isinstance(matches, list) or len(matches) != totalRound - 1:
+        raise BracketError(f"matches must contain {totalRound - 1} results.")
+
+    results = []
+    for match in matches:
+        try:
+            winner, loser = int(match['winner']), int(match['loser'])
+        except (KeyError, TypeError, ValueError):
+            raise BracketError("each match needs integer winner and loser.")
+        if winner == loser or winner not in item_ids or loser not in item_ids:
+            raise BracketError("match items must be different items of this worldCup.")
+        results.append((winner, loser))
+
+    tally = {}
+    advanced = None
+    start, size = 0, totalRound // 2
+    while size:
+        round_results = results[start:start + size]
+        players = {item_id for result in round_results for item_id in result}
+        if len(players) != 2 * size:
+            raise BracketError("an item can play only once per round.")
+        if advanced is not None and players != advanced:
+            raise BracketError("each round must be played by the winners of the previous round.")
+        for winner, loser in round_results:
+            for item_id, won in ((winner, 1), (loser, 0)):
+                stat = tally.setdefault(item_id, [0, 0, 0])
+                stat[0] += won
+                stat[1] += 1
+        advanced = {winner for winner, _ in round_results}
+        start, size = start + size, size // 2
+
+    champion, = advanced
+    tally[champion][2] = 1
+    return champion, tally
+
+
+class VoteBuffer:
+    """대결 결과를 메모리에 모았다가 한 트랜잭션으로 반영하는 워커 단위 버퍼
+
+    WORLDCUP_VOTE_FLUSH_SIZE개의 결과가 모이거나 첫 결과 후
+    WORLDCUP_VOTE_FLUSH_INTERVAL초가 지나면 F() 증가 UPDATE로 일괄 반영합니다.
+    클릭마다 쓰기 트랜잭션을 열지 않아 SQLite 잠금 경합을 줄입니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._plays = 0
+        self._timer = None
+
+    def add(self, tally):
+        with self._lock:
+            for item_id, delta in tally.items():
+                stat = self._pending.setdefault(item_id, [0, 0, 0])
+                for i, value in enumerate(delta):
+                    stat[i] += value
+            self._plays += 1
+            should_flush = self._plays >= settings.WORLDCUP_VOTE_FLUSH_SIZE
+            if not should_flush and self._timer is None:
+                self._start_timer()
+        if should_flush:
+            # 결과는 이미 버퍼에 있으므로 반영 실패를 요청 오류로 돌려주지 않음 (재시도하면 두 번 집계됨)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush worldcup votes: {e}")
+
+    def _start_timer(self):
+        # self._lock을 잡은 상태에서 호출
+        self._timer = threading.Timer(settings.WORLDCUP_VOTE_FLUSH_INTERVAL, self.flush_quietly)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush_quietly(self):
+        """타이머/종료 시 호출: 오류를 로그로만 남기고 이 스레드의 DB 연결을 닫습니다."""
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush worldcup votes: {e}")
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """모인 통계를 DB에 반영하고 반영한 아이템 수를 반환합니다."""
+        with self._lock:
+            pending, self._pending, self._plays = self._pending, {}, 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        try:
+            write_stats(pending)
+        except Exception:
+            # 실패한 통계는 버리지 않고 타이머로 다시 시도 (새 결과가 들어오지 않아도 반영되도록)
+            with self._lock:
+                for item_id, delta in pending.items():
+                    stat = self._pending.setdefault(item_id, [0, 0, 0])
+                    for i, value in enumerate(delta):
+                        stat[i] += value
+                if self._timer is None:
+                    self._start_timer()
+            raise
+        return len(pending)
+
+    def pending_items(self):
+        return len(self._pending)
+
+
+def write_stats(pending):
+    """{itemId: [wins, matches, championships]}를 CASE 식 F() 증가로 일괄 반영합니다."""
+    with transaction.atomic():
+        existing = set(WorldCupItem.objects.filter(pk__in=pending).values_list('pk', flat=True))
+        item_ids = sorted(existing)
+        WorldCupItemStat.objects.bulk_create(
+            [WorldCupItemStat(item_id=item_id) for item_id in item_ids], ignore_conflicts=True
+        )
+        for start in range(0, len(item_ids), UPDATE_CHUNK_SIZE):
+            chunk = item_ids[start:start + UPDATE_CHUNK_SIZE]
+            WorldCupItemStat.objects.filter(item_id__in=chunk).update(**{
+                field: F(field) + Case(
+                    *[When(item_id=item_id, then=Value(pending[item_id][i])) for item_id in chunk],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                for i, field in enumerate(STAT_FIELDS)
+            })
+
+
+vote_buffer = VoteBuffer()
+atexit.register(vote_buffer.flush_quietly)
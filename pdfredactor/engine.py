@@ -0,0 +1,316 @@
+"""
+PDF 마스킹 실행 엔진 (프로세스 풀)
+
+PyMuPDF 작업은 CPU를 쓰므로 요청 스레드가 아니라 별도 프로세스에서 실행합니다.
+- 워커는 spawn으로 만들고 시작할 때 fitz를 미리 import 합니다.
+- max_tasks_per_child개 작업마다 워커를 새로 띄워 누수된 메모리를 회수합니다.
+- 대기 중인 작업이 max_pending개를 넘으면 바로 EngineBusy로 거절합니다.
+- 작업마다 제한 시간이 있고, MuPDF 안에서 멈춘 워커는 스스로 종료되어 그 워커만 새로 뜹니다
+  (multiprocessing.Pool은 죽은 워커를 교체하며 다른 워커의 작업에는 영향이 없음).
+- 마스킹할 페이지가 parallel_min_pages개 이상이면 페이지 구간을 나눠 여러 워커가 동시에 처리하고 합칩니다.
+Django에 의존하지 않습니다 (워커 프로세스는 Django를 불러오지 않음).
+
+엔진(과 프로세스 풀)은 웹 서버 프로세스마다 하나씩 생기므로 워커·대기열·통계는 모두 프로세스 단위입니다.
+"""
+import faulthandler
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from .planner import apply_plan
+
+# 제한 시간이 지나도 워커가 멈추지 못하면(MuPDF 호출 안에서 멈춤) 이만큼 더 기다린 뒤 워커를 종료 (초)
+HARD_TIMEOUT_GRACE = 5.0
+
+
+class EngineBusy(Exception):
+    """대기열이 가득 차 작업을 받을 수 없음"""
+
+
+class JobTimeout(Exception):
+    """작업이 제한 시간 안에 끝나지 않음"""
+
+
+def _warm_up():
+    # 워커 시작 시 fitz(MuPDF)를 미리 불러와 첫 작업의 지연을 없앰
+    import fitz  # noqa: F401
+
+
+def _on_alarm(signum, frame):
+    raise JobTimeout()
+
+
+def _guarded(fn, args, kill_at):
+    """워커에서 fn(*args)를 실행합니다. kill_at(time.time() 기준)까지 끝나지 않으면 이 워커 프로세스만 종료합니다.
+
+    faulthandler의 감시 스레드는 GIL 없이 동작하므로 C 코드 안에서 멈춘 경우에도 스택을 남기고 종료됩니다.
+    """
+    if kill_at is not None:
+        faulthandler.dump_traceback_later(max(0.1, kill_at - time.time()), exit=True)
+    try:
+        return fn(*args)
+    finally:
+        if kill_at is not None:
+            faulthandler.cancel_dump_traceback_later()
+
+
+@contextmanager
+def _deadline(deadline):
+    """deadline(time.time() 기준)까지 남은 시간을 제한합니다.
+
+    deadline은 제출 시각부터 계산하므로 대기열에서 이미 만료된 작업은 바로 버립니다.
+    메인 스레드에서 실행되면(워커 프로세스) SIGALRM을 쓰며,
+    MuPDF 호출 도중에는 끊기지 않고 페이지 사이에서 JobTimeout이 발생합니다.
+    """
+    remaining = None if deadline is None else deadline - time.time()
+    if remaining is not None and remaining <= 0:
+        raise JobTimeout()
+    use_alarm = remaining is not None and threading.current_thread() is threading.main_thread() and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        yield
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def run_job(input_path, output_path, plan, deadline=None):
+    """input_path의 PDF에 계획을 적용해 output_path로 저장합니다. (적용한 페이지 수, 처리 시간)을 반환합니다"""
+    import fitz
+    started = time.perf_counter()
+    with _deadline(deadline):
+        with fitz.open(input_path, filetype='pdf') as doc:
+            applied = apply_plan(doc, plan)
+            # apply_redactions()가 교체한 원래 콘텐츠 스트림(마스킹 전 내용)이 파일에 남지 않도록 참조되지 않는 객체를 제거
+            doc.save(output_path, garbage=1)
+    return applied, time.perf_counter() - started
+
+
+def split_pages(page_indices, parts):
+    """정렬된 페이지 목록을 최대 parts개의 연속 구간으로 고르게 나눕니다"""
+    parts = max(1, min(parts, len(page_indices)))
+    size, extra = divmod(len(page_indices), parts)
+    chunks, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(page_indices[start:end])
+        start = end
+    return chunks
+
+
+def _goto_links(page):
+    """페이지 안의 문서 내부 이동 링크 (insert_link에 그대로 넘길 수 있는 형태)"""
+    import fitz
+    return [{key: link[key] for key in ('kind', 'from', 'page', 'to', 'zoom') if key in link}
+            for link in page.get_links() if link['kind'] == fitz.LINK_GOTO]
+
+
+def redact_pages(input_path, output_path, plan, page_indices, deadline=None):
+    """page_indices 페이지만 마스킹해 그 페이지들만 담은 PDF로 저장합니다.
+
+    (실제로 담은 페이지 목록, 페이지별 내부 링크)를 반환합니다. 내부 링크는 다른 페이지를 가리키므로
+    select() 후에는 사라져 merge_pages가 다시 만듭니다.
+    """
+    import fitz
+    with _deadline(deadline):
+        with fitz.open(input_path, filetype='pdf') as doc:
+            pages = [index for index in page_indices if index < len(doc)]
+            apply_plan(doc, plan, pages)
+            links = [_goto_links(doc[index]) for index in pages]
+            if pages:
+                doc.select(pages)
+                # 선택하지 않은 페이지의 객체는 쓰지 않음
+                doc.save(output_path, garbage=1)
+    return pages, links
+
+
+def merge_pages(input_path, output_path, parts, deadline=None):
+    """원본의 페이지를 구간별 결과(part_path, 페이지 목록, 내부 링크)의 페이지로 바꿔 output_path로 저장합니다.
+
+    결과 페이지를 문서 끝에 한 번에 붙인 뒤 select() 한 번으로 순서를 맞추므로
+    마스킹하지 않은 페이지는 원본 객체가 그대로 남습니다. 교체된 페이지를 가리키던
+    목차·내부 링크는 select()에서 빠지므로 원본 기준으로 다시 넣습니다.
+    """
+    import fitz
+    with _deadline(deadline):
+        with fitz.open(input_path, filetype='pdf') as doc:
+            page_count = len(doc)
+            toc = doc.get_toc(simple=False)
+            links = [_goto_links(doc[index]) for index in range(page_count)]
+            order = list(range(page_count))
+            for part_path, pages, part_links in parts:
+                if not pages:
+                    continue
+                first = len(doc)
+                with fitz.open(part_path, filetype='pdf') as part:
+                    doc.insert_pdf(part)
+                for offset, (index, page_links) in enumerate(zip(pages, part_links)):
+                    order[index] = first + offset
+                    links[index] = page_links
+            doc.select(order)
+            if toc:
+                doc.set_toc(toc)
+            for index, page_links in enumerate(links):
+                if not page_links:
+                    continue
+                page = doc[index]
+                existing = {(tuple(link['from']), link.get('page')) for link in _goto_links(page)}
+                for link in page_links:
+                    if (tuple(link['from']), link.get('page')) not in existing:
+                        page.insert_link(link)
+            # 교체된 원본 페이지(마스킹 전 내용)가 파일에 남지 않도록 참조되지 않는 객체를 제거
+            doc.save(output_path, garbage=1)
+    return sum(len(pages) for _, pages, _ in parts)
+
+
+class RedactionEngine:
+    """프로세스 풀 하나와 그 대기열. 웹 서버 프로세스마다 따로 만들어지며,
+    max_pending은 한 프로세스가 동시에 받는 요청(스레드·ASGI 워커)에만 의미가 있습니다"""
+
+    def __init__(self, workers, max_pending, timeout, max_tasks_per_child=50, parallel_min_pages=0):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        # 마스킹할 페이지가 이 수 이상이면 페이지 구간을 나눠 처리 (0이면 사용 안 함)
+        self.parallel_min_pages = parallel_min_pages
+        self.hard_timeout_grace = HARD_TIMEOUT_GRACE
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pool = None
+        self._pending = 0
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'timedOut': 0, 'rejected': 0,
+                       'maxPendingSeen': 0, 'parallelJobs': 0, 'totalSeconds': 0.0}
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.get_context('spawn').Pool(
+                self.workers, initializer=_warm_up, maxtasksperchild=self.max_tasks_per_child)
+        return self._pool
+
+    def run(self, input_path, output_path, plan):
+        """작업을 실행하고 끝날 때까지 기다립니다. (적용한 페이지 수, 처리 시간)을 반환합니다.
+
+        대기열이 가득 차면 EngineBusy, 제한 시간을 넘기면 JobTimeout
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats['rejected'] += 1
+                raise EngineBusy()
+            self._pending += 1
+            self._stats['submitted'] += 1
+            self._stats['maxPendingSeen'] = max(self._stats['maxPendingSeen'], self._pending)
+            pool = self._get_pool() if self.workers else None
+        deadline = time.time() + self.timeout if self.timeout else None
+        try:
+            if pool is None:
+                result = run_job(input_path, output_path, plan, deadline)
+            elif self._use_parallel(plan):
+                result = self._run_parallel(pool, input_path, output_path, plan, deadline)
+            else:
+                result = self._wait(self._submit(pool, run_job, (input_path, output_path, plan, deadline), deadline),
+                                    deadline)
+        except JobTimeout:
+            self._count('timedOut')
+            raise
+        except BaseException:
+            self._count('failed')
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._idle.notify_all()
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['totalSeconds'] += result[1]
+        return result
+
+    def _use_parallel(self, plan):
+        return bool(self.parallel_min_pages) and self.workers > 1 and len(plan.pages) >= self.parallel_min_pages
+
+    def _submit(self, pool, fn, args, deadline):
+        kill_at = None if deadline is None else deadline + self.hard_timeout_grace
+        return pool.apply_async(_guarded, (fn, args, kill_at))
+
+    def _wait(self, async_result, deadline):
+        # 제한 시간은 대기열에서 기다린 시간을 포함. 멈춘 워커가 스스로 종료될 때까지 조금 더 기다림
+        timeout = None if deadline is None else max(0, deadline - time.time()) + self.hard_timeout_grace + 1
+        try:
+            return async_result.get(timeout)
+        except multiprocessing.TimeoutError:
+            # 아직 시작하지 않은 작업은 워커가 꺼낸 뒤 deadline이 지난 것을 보고 바로 버림
+            raise JobTimeout()
+
+    def _run_parallel(self, pool, input_path, output_path, plan, deadline):
+        """마스킹할 페이지를 워커 수만큼 연속 구간으로 나눠 동시에 처리한 뒤 한 워커에서 합칩니다"""
+        started = time.perf_counter()
+        self._count('parallelJobs')
+        chunks = split_pages(plan.page_indices(), self.workers)
+        part_paths = [f'{output_path}.part{i}' for i in range(len(chunks))]
+        results = [self._submit(pool, redact_pages, (input_path, part_path, plan, chunk, deadline), deadline)
+                   for part_path, chunk in zip(part_paths, chunks)]
+        try:
+            parts = [(part_path, *self._wait(result, deadline)) for part_path, result in zip(part_paths, results)]
+            applied = self._wait(self._submit(pool, merge_pages, (input_path, output_path, parts, deadline), deadline),
+                                 deadline)
+        finally:
+            # 실패한 경우에도 남은 구간 작업이 끝난 뒤(늦어도 워커 종료 시각) 구간 파일을 지움
+            for result in results:
+                result.wait(None if deadline is None else max(0, deadline - time.time()) + self.hard_timeout_grace + 1)
+            for part_path in part_paths:
+                try:
+                    os.unlink(part_path)
+                except FileNotFoundError:
+                    pass
+        return applied, time.perf_counter() - started
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """이 프로세스의 엔진 통계 (웹 서버 워커마다 따로 집계됨)"""
+        with self._lock:
+            stats = dict(self._stats, pending=self._pending, workers=self.workers, maxPending=self.max_pending,
+                         pid=os.getpid())
+        stats['totalSeconds'] = round(stats['totalSeconds'], 3)
+        return stats
+
+    def shutdown(self):
+        """진행 중인 요청이 끝나기를 기다린 뒤 풀을 닫습니다.
+
+        워커가 종료돼 결과가 오지 않는 작업이 남아 있으면 join()이 끝나지 않으므로 terminate()로 닫습니다.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._idle.wait_for(lambda: self._pending == 0)
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+_engine = None
+_engine_config = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """설정(PDF_REDACT_*)에 맞는 엔진을 돌려줍니다. 설정이 바뀌면 새로 만듭니다"""
+    global _engine, _engine_config
+    from django.conf import settings
+
+    config = (settings.PDF_REDACT_WORKERS, settings.PDF_REDACT_MAX_PENDING, settings.PDF_REDACT_TIMEOUT,
+              settings.PDF_REDACT_MAX_TASKS_PER_CHILD, settings.PDF_REDACT_PARALLEL_MIN_PAGES)
+    with _engine_lock:
+        if _engine_config != config:
+            previous = _engine
+            _engine = RedactionEngine(*config)
+            _engine_config = config
+            if previous is not None:
+                threading.Thread(target=previous.shutdown, daemon=True).start()
+        return _engine
@@ -0,0 +1,146 @@
+"""
+비동기 마스킹 작업
+
+요청은 원본을 PDF_REDACT_JOB_DIR로 옮기고 RedactionJob만 남긴 뒤 바로 응답합니다.
+run_redaction_jobs 명령이 대기 작업을 하나씩 가져가(조건부 UPDATE로 중복 처리 방지)
+마스킹 엔진에서 처리하고, prune_redaction_jobs 명령이 만료된 작업과 파일을 지웁니다.
+"""
+import json
+import logging
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .engine import EngineBusy, JobTimeout, get_engine
+from .models import RedactionJob, RedactionJobStatus
+from .planner import RedactionPlan
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (RedactionJobStatus.PENDING, RedactionJobStatus.RUNNING)
+
+
+class TooManyJobs(Exception):
+    """리딤코드의 대기·처리 중 작업이 PDF_REDACT_JOB_MAX_ACTIVE개를 넘음"""
+
+
+def new_expiry():
+    return timezone.now() + timedelta(seconds=settings.PDF_REDACT_JOB_TTL)
+
+
+def create_job(redeem_code, upload, redactions_json):
+    """업로드 임시 파일을 작업 폴더로 옮기고 대기 작업을 만듭니다 (파일 내용은 복사하지 않음)"""
+    os.makedirs(settings.PDF_REDACT_JOB_DIR, exist_ok=True)
+    job = RedactionJob(redeem_code=redeem_code, redactions=redactions_json, expires_at=new_expiry())
+    file_move_safe(upload.temporary_file_path(), job.input_path, allow_overwrite=True)
+    try:
+        with transaction.atomic():
+            # 개수를 세기 전에 리딤코드 행에 (값이 바뀌지 않는) UPDATE를 먼저 실행해 쓰기 잠금을 잡음.
+            # SQLite는 select_for_update()를 무시하지만 쓰기는 DB 전체를 잠그므로, 같은 코드의 동시 제출은
+            # 앞 트랜잭션이 끝날 때까지 기다렸다가 갱신된 개수를 봄 (PostgreSQL 등에서는 행 잠금)
+            type(redeem_code).objects.filter(pk=redeem_code.pk).update(code=F('code'))
+            active = RedactionJob.objects.filter(redeem_code=redeem_code, status__in=ACTIVE_STATUSES).count()
+            if active >= settings.PDF_REDACT_JOB_MAX_ACTIVE:
+                raise TooManyJobs()
+            job.save(force_insert=True)
+    except OperationalError as e:
+        job.delete_files()
+        # 잠금 대기 시간을 넘긴 경우(SQLite "database is locked")는 혼잡으로 보고 다시 시도하게 함
+        if 'locked' in str(e):
+            raise TooManyJobs() from e
+        raise
+    except BaseException:
+        job.delete_files()
+        raise
+    return job
+
+
+def claim_next_job():
+    """가장 오래된 대기 작업을 처리 중으로 바꿔 반환합니다. 다른 워커가 먼저 가져가면 다음 작업을 봅니다"""
+    while True:
+        job = (RedactionJob.objects.filter(status=RedactionJobStatus.PENDING, expires_at__gt=timezone.now())
+               .order_by('created_at').first())
+        if job is None:
+            return None
+        now = timezone.now()
+        # 가져가는 순간 만료 시각을 늘려 처리 중에 정리되지 않도록 함
+        expires_at = new_expiry()
+        claimed = RedactionJob.objects.filter(
+            pk=job.pk, status=RedactionJobStatus.PENDING, expires_at__gt=now,
+        ).update(status=RedactionJobStatus.RUNNING, started_at=now, expires_at=expires_at)
+        if claimed:
+            job.status, job.started_at, job.expires_at = RedactionJobStatus.RUNNING, now, expires_at
+            return job
+
+
+def stale_cutoff():
+    # 엔진 제한 시간 + 여유 시간이 지나도 끝나지 않았으면 처리하던 워커가 없는 것으로 봄
+    return timezone.now() - timedelta(seconds=settings.PDF_REDACT_TIMEOUT * 2 + 60)
+
+
+def requeue_stale_jobs():
+    """워커가 죽어 처리 중으로 남은 작업을 다시 대기 상태로 돌립니다. 돌린 작업 수를 반환합니다"""
+    return RedactionJob.objects.filter(status=RedactionJobStatus.RUNNING, started_at__lt=stale_cutoff()).update(
+        status=RedactionJobStatus.PENDING, started_at=None, expires_at=new_expiry())
+
+
+def process_job(job):
+    """작업을 엔진에서 처리하고 결과 상태를 저장합니다. 엔진이 가득 차면 대기 상태로 되돌립니다"""
+    try:
+        plan = RedactionPlan.parse(json.loads(job.redactions))
+        applied, _ = get_engine().run(job.input_path, job.output_path, plan)
+    except EngineBusy:
+        RedactionJob.objects.filter(pk=job.pk).update(status=RedactionJobStatus.PENDING, started_at=None)
+        job.status, job.started_at = RedactionJobStatus.PENDING, None
+        return job
+    except JobTimeout:
+        finish_job(job, RedactionJobStatus.FAILED, error_code=5002, error_message="문서 처리 시간이 초과되었습니다.")
+    except Exception as e:
+        logger.exception(f"Redaction job {job.pk} failed")
+        finish_job(job, RedactionJobStatus.FAILED, error_code=5001, error_message=str(e)[:255])
+    else:
+        finish_job(job, RedactionJobStatus.DONE, pages_applied=applied)
+    # 원본은 더 이상 필요 없음
+    try:
+        os.unlink(job.input_path)
+    except FileNotFoundError:
+        pass
+    return job
+
+
+def finish_job(job, status, **fields):
+    job.status = status
+    job.finished_at = timezone.now()
+    # 결과는 완료 시점부터 보관 기간 동안 내려받을 수 있음
+    job.expires_at = job.finished_at + timedelta(seconds=settings.PDF_REDACT_JOB_TTL)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=['status', 'finished_at', 'expires_at', *fields])
+
+
+def prune_expired_jobs(batch_size=1000):
+    """만료된 작업과 파일을 배치 단위로 삭제하고 삭제한 작업 수를 반환합니다.
+
+    처리 중인 작업은 워커가 멈춘 것으로 보이는(stale_cutoff 이전에 시작한) 경우에만 지웁니다.
+    """
+    now = timezone.now()
+    expired = RedactionJob.objects.filter(expires_at__lte=now).exclude(
+        status=RedactionJobStatus.RUNNING, started_at__gte=stale_cutoff())
+    deleted = 0
+    while True:
+        jobs = list(expired[:batch_size])
+        if not jobs:
+            return deleted
+        # 목록을 읽은 뒤 다른 워커가 상태를 바꿨을 수 있으므로 조건을 다시 걸어 삭제
+        deleted_now = 0
+        for job in jobs:
+            if expired.filter(pk=job.pk).delete()[0]:
+                job.delete_files()
+                deleted_now += 1
+        deleted += deleted_now
+        if deleted_now < len(jobs):
+            # 남은 항목은 지울 수 없는 상태이므로 같은 목록을 반복하지 않도록 종료
+            return deleted
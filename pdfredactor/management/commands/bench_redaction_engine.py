@@ -0,0 +1,67 @@
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import fitz  # PyMuPDF
+from django.core.management.base import BaseCommand, CommandError
+from pdfredactor.engine import RedactionEngine
+from pdfredactor.planner import RedactionPlan
+
+
+class Command(BaseCommand):
+    help = ("마스킹 엔진 처리량 벤치마크. 워커 수별로 동시에 --jobs개 문서를 처리하고 초당 처리 문서 수를 보고합니다 "
+            "(0은 요청 스레드에서 처리하던 이전 방식)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+        parser.add_argument('--jobs', type=int, default=16)
+        parser.add_argument('--pages', type=int, default=50)
+        parser.add_argument('--boxes', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['jobs'] < 1:
+            raise CommandError("--jobs must be positive.")
+        rng = random.Random(options['seed'])
+        plan = RedactionPlan.parse([
+            {
+                'pageIndex': rng.randrange(options['pages']),
+                'x': rng.uniform(0, 500), 'y': rng.uniform(0, 780),
+                'width': rng.uniform(5, 90), 'height': rng.uniform(5, 40),
+            }
+            for _ in range(options['boxes'])
+        ])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'source.pdf')
+            with fitz.open() as doc:
+                for number in range(options['pages']):
+                    page = doc.new_page()
+                    for line in range(10):
+                        page.insert_text((40, 60 + line * 60), f"page {number} line {line} confidential " * 3, fontsize=9)
+                doc.save(source)
+
+            self.stdout.write(f"{os.cpu_count()} CPUs, {options['jobs']} jobs x {options['pages']} pages / {options['boxes']} boxes")
+            self.stdout.write(f"{'workers':>8} {'jobs/s':>9} {'wall ms':>10} {'job avg ms':>11} {'max pending':>12}")
+            baseline = None
+            for workers in options['workers']:
+                engine = RedactionEngine(workers=workers, max_pending=options['jobs'], timeout=600)
+                try:
+                    # 워커를 미리 띄워 시작 비용은 제외
+                    engine.run(source, os.path.join(tmp, 'warm.pdf'), plan)
+                    # 동기 웹 워커 여러 개가 동시에 요청하는 상황 (inline은 GIL 때문에 사실상 직렬)
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=options['jobs']) as pool:
+                        list(pool.map(lambda i: engine.run(source, os.path.join(tmp, f'out{i}.pdf'), plan),
+                                      range(options['jobs'])))
+                    elapsed = time.perf_counter() - started
+                    stats = engine.stats()
+                finally:
+                    engine.shutdown()
+                rate = options['jobs'] / elapsed
+                baseline = baseline or rate
+                self.stdout.write(
+                    f"{workers:>8} {rate:>9.2f} {elapsed * 1000:>10.1f} "
+                    f"{(stats['totalSeconds'] / stats['completed']) * 1000:>11.1f} {stats['maxPendingSeen']:>12}"
+                    f"  ({rate / baseline:.2f}x)")
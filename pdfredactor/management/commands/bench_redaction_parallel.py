@@ -0,0 +1,126 @@
+import hashlib
+import os
+import random
+import tempfile
+import time
+import fitz  # PyMuPDF
+from django.core.management.base import BaseCommand, CommandError
+from pdfredactor.engine import RedactionEngine
+from pdfredactor.planner import RedactionPlan
+
+
+def stream_digests(doc):
+    digests = set()
+    for xref in range(1, doc.xref_length()):
+        stream = doc.xref_stream_raw(xref)
+        if stream:
+            digests.add(hashlib.sha256(stream).hexdigest())
+    return digests
+
+
+def outline(doc):
+    """목차 (객체 번호는 제외)"""
+    return [(level, title, page, {key: value for key, value in dest.items() if key != 'xref'})
+            for level, title, page, dest in doc.get_toc(simple=False)]
+
+
+def page_links(page):
+    return sorted((link['kind'], link.get('page', -1), link.get('uri', ''), tuple(round(v, 2) for v in link['from']))
+                  for link in page.get_links())
+
+
+def verify(original_path, serial_path, parallel_path, touched):
+    """페이지 단위로 병렬 결과를 검증하고 문제 목록을 반환합니다.
+
+    - 마스킹하지 않은 페이지의 콘텐츠 스트림은 원본과 바이트 단위로 같아야 함
+    - 마스킹한 페이지의 콘텐츠 스트림은 직렬 결과와 바이트 단위로 같아야 함
+    - 모든 페이지의 렌더링 결과(픽셀)·링크와 목차가 직렬 결과와 같아야 함
+    - 병렬 결과 파일의 모든 스트림은 직렬 결과에도 있어야 함 (교체된 원본 페이지가 남지 않음)
+    """
+    problems = []
+    with fitz.open(original_path) as original, fitz.open(serial_path) as serial, fitz.open(parallel_path) as parallel:
+        if len(parallel) != len(original):
+            return [f"page count {len(parallel)} != {len(original)}"]
+        for index in range(len(original)):
+            expected = serial if index in touched else original
+            if parallel[index].read_contents() != expected[index].read_contents():
+                problems.append(f"page {index}: content stream differs")
+            if parallel[index].get_pixmap(dpi=18).samples != serial[index].get_pixmap(dpi=18).samples:
+                problems.append(f"page {index}: rendering differs")
+            if page_links(parallel[index]) != page_links(serial[index]):
+                problems.append(f"page {index}: links differ")
+        extra = len(stream_digests(parallel) - stream_digests(serial))
+        if extra:
+            problems.append(f"{extra} streams not present in serial output")
+        if outline(parallel) != outline(serial):
+            problems.append("table of contents differs")
+    return problems
+
+
+class Command(BaseCommand):
+    help = ("페이지 구간 병렬 마스킹 벤치마크. 같은 문서를 한 워커에서 직렬로 처리할 때와 "
+            "페이지 구간을 워커들에 나눠 처리한 뒤 합칠 때를 비교하고 결과를 바이트 단위로 검증합니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=2000)
+        parser.add_argument('--touched', type=float, default=0.5, help="마스킹할 페이지 비율 (0~1)")
+        parser.add_argument('--boxes-per-page', type=int, default=5)
+        parser.add_argument('--workers', type=int, nargs='+', default=[2, 4])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['pages'] < 1 or not 0 < options['touched'] <= 1:
+            raise CommandError("--pages must be positive and --touched in (0, 1].")
+        rng = random.Random(options['seed'])
+        touched = sorted(rng.sample(range(options['pages']), max(1, int(options['pages'] * options['touched']))))
+        plan = RedactionPlan.parse([
+            {
+                'pageIndex': page_index,
+                'x': rng.uniform(0, 500), 'y': rng.uniform(0, 780),
+                'width': rng.uniform(5, 90), 'height': rng.uniform(5, 40),
+                'color': rng.choice([-16777216, -65536]),
+            }
+            for page_index in touched for _ in range(options['boxes_per_page'])
+        ])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'source.pdf')
+            with fitz.open() as doc:
+                for number in range(options['pages']):
+                    page = doc.new_page()
+                    for line in range(10):
+                        page.insert_text((40, 60 + line * 60), f"page {number} line {line} confidential " * 3, fontsize=9)
+                doc.set_toc([[1, f"page {number}", number + 1] for number in range(0, options['pages'], 10)])
+                # 다른 페이지로 이동하는 링크 (마스킹 페이지를 가리키거나 마스킹 페이지에 있는 링크 포함)
+                for number in range(0, options['pages'], 7):
+                    doc[number].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(0, 0, 30, 30),
+                                             'page': rng.randrange(options['pages'])})
+                doc.save(source)
+
+            self.stdout.write(f"{os.cpu_count()} CPUs, {options['pages']} pages, {len(touched)} redacted "
+                              f"({plan.box_count} boxes), best of {options['repeat']}")
+            self.stdout.write(f"{'workers':>8} {'serial ms':>10} {'parallel ms':>12} {'speedup':>8}  verify")
+            for workers in options['workers']:
+                serial = self._measure(RedactionEngine(workers, 1, None), source, os.path.join(tmp, 'serial.pdf'),
+                                       plan, options['repeat'])
+                parallel = self._measure(RedactionEngine(workers, 1, None, parallel_min_pages=1), source,
+                                         os.path.join(tmp, 'parallel.pdf'), plan, options['repeat'])
+                problems = verify(source, os.path.join(tmp, 'serial.pdf'), os.path.join(tmp, 'parallel.pdf'), set(touched))
+                self.stdout.write(
+                    f"{workers:>8} {serial * 1000:>10.1f} {parallel * 1000:>12.1f} {serial / parallel:>7.2f}x  "
+                    f"{'ok' if not problems else '; '.join(problems[:5])}")
+
+    def _measure(self, engine, source, output, plan, repeat):
+        try:
+            # 워커를 미리 띄워 시작 비용은 제외
+            engine.run(source, output, RedactionPlan())
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                engine.run(source, output, plan)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            return best
+        finally:
+            engine.shutdown()
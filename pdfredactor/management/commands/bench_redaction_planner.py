@@ -0,0 +1,73 @@
+import json
+import random
+import time
+import fitz  # PyMuPDF
+from django.core.management.base import BaseCommand
+from pdfredactor.planner import RedactionPlan, apply_plan, int_to_rgb
+
+
+def legacy_apply(doc, redactions):
+    """이전 RedactPdfView의 처리 방식 (목록을 세 번 순회하고 검정 상자를 중복 추가)"""
+    for item in redactions:
+        page_index = item.get('pageIndex')
+        if 0 <= page_index < len(doc):
+            doc[page_index].add_redact_annot(
+                fitz.Rect(item['x'], item['y'], item['x'] + item['width'], item['y'] + item['height']), fill=(0, 0, 0))
+    for item in redactions:
+        page_index = item.get('pageIndex')
+        if 0 <= page_index < len(doc):
+            doc[page_index].add_redact_annot(
+                fitz.Rect(item['x'], item['y'], item['x'] + item['width'], item['y'] + item['height']),
+                fill=int_to_rgb(item.get('color', -16777216)))
+    for page_index in {item['pageIndex'] for item in redactions}:
+        if 0 <= page_index < len(doc):
+            doc[page_index].apply_redactions()
+
+
+class Command(BaseCommand):
+    help = "마스킹 계획 벤치마크 (이전 3회 순회 방식 vs 페이지별 계획). 기본: 500쪽에 상자 10,000개"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=500)
+        parser.add_argument('--boxes', type=int, default=10_000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        source = fitz.open()
+        for number in range(options['pages']):
+            page = source.new_page()
+            for line in range(10):
+                page.insert_text((40, 60 + line * 60), f"page {number} line {line} confidential " * 3, fontsize=9)
+        pdf_bytes = source.tobytes()
+        source.close()
+
+        redactions = [
+            {
+                'pageIndex': rng.randrange(options['pages']),
+                'x': rng.uniform(0, 500), 'y': rng.uniform(0, 780),
+                'width': rng.uniform(5, 90), 'height': rng.uniform(5, 40),
+                'color': rng.choice([-16777216, -65536, -1]),
+            }
+            for _ in range(options['boxes'])
+        ]
+        payload = json.dumps(redactions)
+        self.stdout.write(f"{options['boxes']} boxes over {options['pages']} pages")
+
+        doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+        started = time.perf_counter()
+        legacy_apply(doc, json.loads(payload))
+        legacy = time.perf_counter() - started
+        doc.close()
+
+        doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+        started = time.perf_counter()
+        plan = RedactionPlan.parse(json.loads(payload))
+        parsed = time.perf_counter() - started
+        apply_plan(doc, plan)
+        planned = time.perf_counter() - started
+        doc.close()
+
+        self.stdout.write(f"{'legacy (3 passes, duplicate boxes)':<38} {legacy * 1000:>10.1f} ms")
+        self.stdout.write(f"{'planner parse + group':<38} {parsed * 1000:>10.1f} ms")
+        self.stdout.write(f"{'planner total':<38} {planned * 1000:>10.1f} ms  ({legacy / planned:.2f}x)")
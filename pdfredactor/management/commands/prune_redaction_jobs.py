@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from pdfredactor.jobs import prune_expired_jobs
+
+
+class Command(BaseCommand):
+    help = "만료된 비동기 마스킹 작업과 원본·결과 파일을 일괄 삭제합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="한 번에 삭제할 작업 수")
+
+    def handle(self, *args, **options):
+        deleted = prune_expired_jobs(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired redaction jobs."))
@@ -0,0 +1,66 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from pdfredactor.jobs import claim_next_job, process_job, requeue_stale_jobs
+from pdfredactor.models import RedactionJobStatus
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ("비동기 마스킹 작업 워커. 대기 작업을 가져와 마스킹 엔진(PDF_REDACT_WORKERS 프로세스)에서 처리합니다. "
+            "여러 개를 동시에 실행해도 같은 작업을 두 번 처리하지 않습니다.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, help="동시에 처리할 작업 수 (기본: 엔진 워커 수)")
+        parser.add_argument('--once', action='store_true', help="대기 작업을 모두 처리하면 종료")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'] or settings.PDF_REDACT_WORKERS)
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs.")
+        self._stop = threading.Event()
+        if concurrency == 1:
+            # 스레드 없이 현재 스레드에서 처리
+            processed = self._loop(options['once'])
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [pool.submit(self._loop, options['once']) for _ in range(concurrency)]
+                try:
+                    processed = sum(future.result() for future in futures)
+                except KeyboardInterrupt:
+                    # 처리 중인 작업은 마치고 종료
+                    self._stop.set()
+                    processed = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} redaction jobs."))
+
+    def _loop(self, once):
+        processed = 0
+        try:
+            while not self._stop.is_set():
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        break
+                    self._stop.wait(settings.PDF_REDACT_JOB_POLL_INTERVAL)
+                    continue
+                try:
+                    process_job(job)
+                except Exception:
+                    # 작업 하나의 오류(DB 오류 등)로 워커가 멈추지 않도록 기록만 하고 계속 진행
+                    logger.exception(f"Failed to process redaction job {job.pk}")
+                    continue
+                if job.status == RedactionJobStatus.PENDING:
+                    # 엔진이 가득 차 되돌린 작업은 잠시 뒤 다시 가져감
+                    self._stop.wait(settings.PDF_REDACT_JOB_POLL_INTERVAL)
+                    continue
+                processed += 1
+                self.stdout.write(f"{job.pk} {job.status}")
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                close_old_connections()
+        return processed
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-18 07:40
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('redactor_pro_code_issuance', '0005_add_status_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RedactionJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('redactions', models.TextField(help_text='검사를 통과한 redactions JSON')),
+                ('status', models.CharField(choices=[('pending', '대기'), ('running', '처리 중'), ('done', '완료'), ('failed', '실패')], db_index=True, default='pending', max_length=10)),
+                ('error_code', models.PositiveIntegerField(blank=True, null=True)),
+                ('error_message', models.CharField(blank=True, default='', max_length=255)),
+                ('pages_applied', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('redeem_code', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redaction_jobs', to='redactor_pro_code_issuance.redeemcode')),
+            ],
+        ),
+    ]
@@ -1,3 +1,50 @@
+import os
+import uuid
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class RedactionJobStatus(models.TextChoices):
+    """비동기 마스킹 작업 상태"""
+    PENDING = 'pending', '대기'
+    RUNNING = 'running', '처리 중'
+    DONE = 'done', '완료'
+    FAILED = 'failed', '실패'
+
+
+class RedactionJob(models.Model):
+    """비동기 마스킹 작업
+
+    원본·결과 PDF는 DB가 아니라 PDF_REDACT_JOB_DIR 아래 작업 id 이름의 파일로 보관합니다.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    redeem_code = models.ForeignKey('redactor_pro_code_issuance.RedeemCode', on_delete=models.CASCADE,
+                                    related_name='redaction_jobs')
+    redactions = models.TextField(help_text="검사를 통과한 redactions JSON")
+    status = models.CharField(max_length=10, choices=RedactionJobStatus.choices,
+                              default=RedactionJobStatus.PENDING, db_index=True)
+    error_code = models.PositiveIntegerField(null=True, blank=True)
+    error_message = models.CharField(max_length=255, blank=True, default='')
+    pages_applied = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+    @property
+    def input_path(self):
+        return os.path.join(settings.PDF_REDACT_JOB_DIR, f'{self.id}.in.pdf')
+
+    @property
+    def output_path(self):
+        return os.path.join(settings.PDF_REDACT_JOB_DIR, f'{self.id}.out.pdf')
+
+    def delete_files(self):
+        for path in (self.input_path, self.output_path):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,97 @@
+"""
+마스킹 요청 파싱·적용
+
+redactions 목록을 한 번만 검사해 pageIndex별로 묶고(좌표는 array('d')에 4개씩),
+각 페이지를 한 번씩만 방문해 주석을 추가하고 적용합니다.
+Django에 의존하지 않으므로 별도 프로세스에서도 그대로 쓸 수 있습니다.
+"""
+from array import array
+from numbers import Real
+import fitz  # PyMuPDF
+
+# Android 기본 색 (불투명 검정, AARRGGBB)
+DEFAULT_COLOR = -16777216
+REQUIRED_FIELDS = ('pageIndex', 'x', 'y', 'width', 'height')
+
+
+class RedactionPlanError(ValueError):
+    """redactions 형식이 올바르지 않음"""
+
+
+def int_to_rgb(color_int):
+    """Android int 색(AARRGGBB)을 PyMuPDF RGB 튜플(0..1)로 변환합니다 (알파는 무시)"""
+    color = color_int & 0xFFFFFFFF
+    return (((color >> 16) & 0xFF) / 255.0, ((color >> 8) & 0xFF) / 255.0, (color & 0xFF) / 255.0)
+
+
+def _is_number(value):
+    return isinstance(value, Real) and not isinstance(value, bool)
+
+
+class RedactionPlan:
+    def __init__(self):
+        # pageIndex -> (좌표 array('d') [x0, y0, x1, y1, ...], 색 array('L'))
+        self.pages = {}
+        self.box_count = 0
+
+    @classmethod
+    def parse(cls, redactions):
+        """redactions 목록을 검사해 계획을 만듭니다.
+
+        필드가 빠졌거나 pageIndex가 음수인 항목은 이전처럼 건너뛰고,
+        타입이 잘못된 항목이 있으면 RedactionPlanError를 발생시킵니다.
+        """
+        if not isinstance(redactions, list):
+            raise RedactionPlanError("redactions must be a list.")
+        plan = cls()
+        pages = plan.pages
+        for item in redactions:
+            if not isinstance(item, dict):
+                raise RedactionPlanError("Each redaction must be an object.")
+            page_index, x, y, width, height = (item.get(field) for field in REQUIRED_FIELDS)
+            if page_index is None or x is None or y is None or width is None or height is None:
+                continue
+            if not isinstance(page_index, int) or isinstance(page_index, bool):
+                raise RedactionPlanError("pageIndex must be an integer.")
+            if not (_is_number(x) and _is_number(y) and _is_number(width) and _is_number(height)):
+                raise RedactionPlanError("x, y, width and height must be numbers.")
+            color = item.get('color', DEFAULT_COLOR)
+            if not isinstance(color, int) or isinstance(color, bool):
+                raise RedactionPlanError("color must be an integer.")
+            if page_index < 0:
+                continue
+
+            entry = pages.get(page_index)
+            if entry is None:
+                entry = pages[page_index] = (array('d'), array('L'))
+            entry[0].extend((x, y, x + width, y + height))
+            entry[1].append(color & 0xFFFFFFFF)
+            plan.box_count += 1
+        return plan
+
+    def page_indices(self):
+        return sorted(self.pages)
+
+    def rects(self, page_index):
+        """페이지의 (x0, y0, x1, y1, rgb) 목록"""
+        coords, colors = self.pages[page_index]
+        for i, color in enumerate(colors):
+            yield coords[4 * i], coords[4 * i + 1], coords[4 * i + 2], coords[4 * i + 3], int_to_rgb(color)
+
+
+def apply_plan(doc, plan, page_indices=None):
+    """문서에 계획을 적용합니다. 페이지마다 한 번씩 주석을 모두 추가한 뒤 apply_redactions()를 호출합니다.
+
+    범위를 벗어난 pageIndex는 건너뜁니다. 적용한 페이지 수를 반환합니다.
+    """
+    page_count = len(doc)
+    applied = 0
+    for page_index in plan.page_indices() if page_indices is None else page_indices:
+        if page_index >= page_count:
+            continue
+        page = doc[page_index]
+        for x0, y0, x1, y1, rgb in plan.rects(page_index):
+            page.add_redact_annot(fitz.Rect(x0, y0, x1, y1), fill=rgb)
+        page.apply_redactions()
+        applied += 1
+    return applied
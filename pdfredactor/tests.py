@@ -1,8 +1,45 @@
-from django.test import TestCase, RequestFactory, override_settings
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from io import BytesIO, StringIO
 from unittest.mock import patch, MagicMock
+import fitz
+from django.core.management import call_command
+from django.db import DatabaseError, OperationalError
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from django.utils import timezone
+from redactor_pro_code_issuance.jwt_utils import create_jwt_token
+from redactor_pro_code_issuance.models import RedeemCode, RedeemCodeStatus
+from . import jobs
+from .engine import EngineBusy, JobTimeout, RedactionEngine, run_job, split_pages
+from .jobs import claim_next_job, prune_expired_jobs, requeue_stale_jobs
+from .models import RedactionJob, RedactionJobStatus
+from .planner import RedactionPlan, RedactionPlanError, int_to_rgb
 from .views import RedactPdfView
-import json
-from io import BytesIO
+
+def pro_auth_headers(code='TESTCODE', device_id='test-device'):
+    """Pro 인증을 통과하는 요청 헤더 (리딤코드와 JWT를 만듦)"""
+    RedeemCode.objects.create(email='pro@example.com', code=code, status=RedeemCodeStatus.USED, uuid=device_id)
+    return {
+        'HTTP_X_REDACT_API_KEY': 'test_secret_key',
+        'HTTP_AUTHORIZATION': f'Bearer {create_jwt_token(code, device_id)}',
+    }
+
+
+def make_pdf(path, pages=1, attachment_size=0):
+    """텍스트가 있는 테스트 PDF를 만듭니다. attachment_size만큼 압축되지 않는 첨부 파일로 크기를 키움"""
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"secret text on page {number}")
+    if attachment_size:
+        doc.embfile_add('blob.bin', os.urandom(attachment_size))
+    doc.save(path)
+    doc.close()
 
 @override_settings(REDACT_API_KEY='test_secret_key')
 class RedactPdfViewTests(TestCase):
@@ -10,7 +47,7 @@ class RedactPdfViewTests(TestCase):
         self.factory = RequestFactory()
         self.view = RedactPdfView.as_view()
 
-    @patch('pdfredactor.views.fitz')
+    @patch('pdfredactor.planner.fitz')
     def test_post_valid_redaction_with_color(self, mock_fitz):
         # Mock fitz.open
         mock_doc = MagicMock()
@@ -94,3 +131,330 @@ class RedactPdfViewTests(TestCase):
         
         self.assertEqual(response.status_code, 403)
         self.assertEqual(response.data['error'], "권한이 없습니다.")
+
+
+@override_settings(REDACT_API_KEY='test_secret_key', JWT_SECRET_KEY='test_jwt_secret', PDF_REDACT_WORKERS=0)
+class RedactPdfFileIOTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.view = RedactPdfView.as_view()
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.headers = pro_auth_headers()
+
+    def test_memory_ceiling(self):
+        size = 8 * 1024 * 1024
+        source = os.path.join(self.dir.name, 'large.pdf')
+        make_pdf(source, attachment_size=size)
+        redactions = [{"pageIndex": 0, "x": 60, "y": 50, "width": 300, "height": 40}]
+        with open(source, 'rb') as file:
+            request = self.factory.post('/redact/', {'file': file, 'redactions': json.dumps(redactions)}, **self.headers)
+
+        output = os.path.join(self.dir.name, 'out.pdf')
+        tracemalloc.start()
+        try:
+            response = self.view(request)
+            with open(output, 'wb') as out:
+                for chunk in response.streaming_content:
+                    out.write(chunk)
+            response.close()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(response.status_code, 200)
+        # 업로드·결과 PDF 전체가 파이썬 메모리에 올라가지 않아야 함 (이전에는 파일 크기의 2배 이상)
+        self.assertLess(peak, size / 4)
+        with fitz.open(output) as doc:
+            self.assertNotIn('secret text', doc[0].get_text())
+            self.assertEqual(doc.embfile_count(), 1)
+
+    def test_colored_box_applied_once(self):
+        source = os.path.join(self.dir.name, 'two.pdf')
+        make_pdf(source, pages=2)
+        redactions = [
+            {"pageIndex": 1, "x": 60, "y": 50, "width": 300, "height": 40, "color": -65536},
+            {"pageIndex": 7, "x": 0, "y": 0, "width": 10, "height": 10},
+        ]
+        with open(source, 'rb') as file:
+            request = self.factory.post('/redact/', {'file': file, 'redactions': json.dumps(redactions)}, **self.headers)
+        add_redact_annot = fitz.Page.add_redact_annot
+        with patch.object(fitz.Page, 'add_redact_annot', autospec=True, side_effect=add_redact_annot) as spy:
+            response = self.view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(spy.call_count, 1)
+
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertIn('secret text', doc[0].get_text())
+            self.assertNotIn('secret text', doc[1].get_text())
+            self.assertEqual(doc[1].get_pixmap().pixel(200, 70), (255, 0, 0))
+
+    def test_invalid_redaction_types(self):
+        request = self.factory.post(
+            '/redact/', {'file': BytesIO(b'%PDF'), 'redactions': '[{"pageIndex": "0", "x": 1, "y": 1, "width": 1, "height": 1}]'},
+            **self.headers)
+        response = self.view(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error_code'], 3002)
+
+    @override_settings(PDF_REDACT_MAX_PENDING=0)
+    def test_engine_busy(self):
+        source = os.path.join(self.dir.name, 'one.pdf')
+        make_pdf(source)
+        with open(source, 'rb') as file:
+            request = self.factory.post('/redact/', {'file': file, 'redactions': '[]'}, **self.headers)
+        response = self.view(request)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data['error_code'], 5003)
+
+
+class RedactionJobTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.job_dir = os.path.join(self.dir.name, 'jobs')
+        settings_override = override_settings(
+            REDACT_API_KEY='test_secret_key', JWT_SECRET_KEY='test_jwt_secret',
+            PDF_REDACT_WORKERS=0, PDF_REDACT_JOB_DIR=self.job_dir, PDF_REDACT_JOB_MAX_ACTIVE=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.headers = pro_auth_headers()
+        self.source = os.path.join(self.dir.name, 'in.pdf')
+        make_pdf(self.source, pages=2)
+
+    def submit(self, headers=None):
+        redactions = [{"pageIndex": 1, "x": 60, "y": 50, "width": 300, "height": 40}]
+        with open(self.source, 'rb') as file:
+            return self.client.post('/api/pdf/redact/jobs/', {'file': file, 'redactions': json.dumps(redactions)},
+                                    **(headers or self.headers))
+
+    def test_submit_poll_download(self):
+        response = self.submit()
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(response['Location'], f'/api/pdf/redact/jobs/{job_id}/')
+        self.assertTrue(os.path.exists(os.path.join(self.job_dir, f'{job_id}.in.pdf')))
+
+        response = self.client.get(f'/api/pdf/redact/jobs/{job_id}/', **self.headers)
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertIn('Retry-After', response)
+        response = self.client.get(f'/api/pdf/redact/jobs/{job_id}/download/', **self.headers)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['error_code'], 4002)
+
+        call_command('run_redaction_jobs', '--once', '--concurrency', '1', stdout=StringIO())
+        response = self.client.get(f'/api/pdf/redact/jobs/{job_id}/', **self.headers)
+        data = response.json()
+        self.assertEqual((data['status'], data['pages_applied']), ('done', 1))
+        self.assertFalse(os.path.exists(os.path.join(self.job_dir, f'{job_id}.in.pdf')))
+
+        response = self.client.get(data['download_url'], **self.headers)
+        self.assertEqual(response.status_code, 200)
+        with fitz.open(stream=b''.join(response.streaming_content), filetype='pdf') as doc:
+            self.assertIn('secret text', doc[0].get_text())
+            self.assertNotIn('secret text', doc[1].get_text())
+
+    def test_jobs_are_private_to_redeem_code(self):
+        job_id = self.submit().json()['job_id']
+        other = pro_auth_headers(code='OTHERCOD', device_id='other-device')
+        response = self.client.get(f'/api/pdf/redact/jobs/{job_id}/', **other)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['error_code'], 4001)
+        response = self.client.get(f'/api/pdf/redact/jobs/{job_id}/', HTTP_X_REDACT_API_KEY='test_secret_key')
+        self.assertEqual(response.json()['error_code'], 2001)
+
+    def test_active_job_limit(self):
+        self.submit()
+        self.submit()
+        response = self.submit()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['error_code'], 4003)
+        # 거절된 업로드는 작업 폴더에 남지 않음
+        self.assertEqual(len(os.listdir(self.job_dir)), 2)
+
+    def test_locked_database_is_too_many_jobs(self):
+        with patch.object(RedactionJob, 'save', side_effect=OperationalError('database is locked')):
+            response = self.submit()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['error_code'], 4003)
+        self.assertEqual(os.listdir(self.job_dir), [])
+
+    def test_failed_job(self):
+        job_id = self.submit().json()['job_id']
+        with open(os.path.join(self.job_dir, f'{job_id}.in.pdf'), 'wb') as file:
+            file.write(b'not a pdf')
+        call_command('run_redaction_jobs', '--once', '--concurrency', '1', stdout=StringIO())
+        data = self.client.get(f'/api/pdf/redact/jobs/{job_id}/', **self.headers).json()
+        self.assertEqual((data['status'], data['error_code']), ('failed', 5001))
+
+    def test_claim_is_exclusive_and_stale_jobs_requeue(self):
+        self.submit()
+        job = claim_next_job()
+        self.assertEqual(job.status, RedactionJobStatus.RUNNING)
+        self.assertIsNone(claim_next_job())
+
+        RedactionJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(claim_next_job().pk, job.pk)
+
+    def test_prune_expired_jobs(self):
+        expired = self.submit().json()['job_id']
+        kept = self.submit().json()['job_id']
+        RedactionJob.objects.filter(pk=expired).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(prune_expired_jobs(), 1)
+        self.assertEqual(list(RedactionJob.objects.values_list('pk', flat=True)), [uuid.UUID(kept)])
+        self.assertEqual(os.listdir(self.job_dir), [f'{kept}.in.pdf'])
+
+    def test_running_job_survives_prune(self):
+        job_id = self.submit().json()['job_id']
+        RedactionJob.objects.filter(pk=job_id).update(expires_at=timezone.now() + timedelta(seconds=1))
+        job = claim_next_job()
+        # 가져갈 때 만료가 연장되고, 처리 중인 작업은 만료돼도 정리되지 않음
+        self.assertGreater(job.expires_at, timezone.now() + timedelta(minutes=1))
+        RedactionJob.objects.filter(pk=job_id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(prune_expired_jobs(), 0)
+        self.assertTrue(os.path.exists(job.input_path))
+
+        # 워커가 멈춘 것으로 보이는 오래된 작업은 정리
+        RedactionJob.objects.filter(pk=job_id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(prune_expired_jobs(), 1)
+        self.assertFalse(os.path.exists(job.input_path))
+
+    def test_worker_survives_job_errors(self):
+        first = self.submit().json()['job_id']
+        second = self.submit().json()['job_id']
+
+        def process_job(job):
+            if str(job.pk) == first:
+                raise DatabaseError("Save with update_fields did not affect any rows.")
+            return jobs.process_job(job)
+
+        with patch('pdfredactor.management.commands.run_redaction_jobs.process_job', side_effect=process_job), \
+                self.assertLogs('pdfredactor.management.commands.run_redaction_jobs', 'ERROR'):
+            call_command('run_redaction_jobs', '--once', '--concurrency', '1', stdout=StringIO())
+        self.assertEqual(RedactionJob.objects.get(pk=second).status, RedactionJobStatus.DONE)
+
+
+class RedactionEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.source = os.path.join(self.dir.name, 'in.pdf')
+        make_pdf(self.source, pages=2)
+        self.plan = RedactionPlan.parse([{"pageIndex": 1, "x": 60, "y": 50, "width": 300, "height": 40}])
+
+    def test_process_pool(self):
+        engine = RedactionEngine(workers=1, max_pending=4, timeout=60, max_tasks_per_child=1)
+        self.addCleanup(engine.shutdown)
+        for i in range(2):
+            output = os.path.join(self.dir.name, f'out{i}.pdf')
+            applied, _ = engine.run(self.source, output, self.plan)
+            self.assertEqual(applied, 1)
+            with fitz.open(output) as doc:
+                self.assertIn('secret text', doc[0].get_text())
+                self.assertNotIn('secret text', doc[1].get_text())
+
+        # 워커 안에서 제한 시간이 지나면 JobTimeout이 그대로 전달되고 풀은 계속 사용 가능
+        with patch.object(engine, 'timeout', 1e-6):
+            with self.assertRaises(JobTimeout):
+                engine.run(self.source, os.path.join(self.dir.name, 'late.pdf'), self.plan)
+        engine.run(self.source, os.path.join(self.dir.name, 'again.pdf'), self.plan)
+
+        stats = engine.stats()
+        self.assertEqual((stats['submitted'], stats['completed'], stats['timedOut']), (4, 3, 1))
+        self.assertEqual(stats['pending'], 0)
+
+    def test_hung_worker_is_replaced(self):
+        engine = RedactionEngine(workers=2, max_pending=4, timeout=0.5)
+        engine.hard_timeout_grace = 0.5
+        self.addCleanup(engine.shutdown)
+        # MuPDF 안에서 멈춘 것처럼 제한 시간 처리(_deadline) 밖에서 멈춘 작업: 그 워커만 종료되고 다른 작업은 계속 처리됨
+        hung = engine._submit(engine._get_pool(), time.sleep, (30,), time.time() + 0.5)
+        with patch.object(engine, 'timeout', 60):
+            applied, _ = engine.run(self.source, os.path.join(self.dir.name, 'during.pdf'), self.plan)
+        self.assertEqual(applied, 1)
+        with self.assertRaises(JobTimeout):
+            engine._wait(hung, time.time())
+        with patch.object(engine, 'timeout', 60):
+            applied, _ = engine.run(self.source, os.path.join(self.dir.name, 'after.pdf'), self.plan)
+        self.assertEqual(applied, 1)
+
+    def test_parallel_matches_serial(self):
+        source = os.path.join(self.dir.name, 'toc.pdf')
+        with fitz.open() as doc:
+            for number in range(6):
+                doc.new_page().insert_text((72, 72), f"secret text on page {number}")
+            doc.set_toc([[1, 'first', 1], [1, 'redacted', 4]])
+            doc[0].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(0, 0, 50, 50), 'page': 3})
+            doc[4].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(0, 0, 50, 50), 'page': 1})
+            doc.save(source)
+        plan = RedactionPlan.parse(
+            [{"pageIndex": index, "x": 60, "y": 50, "width": 300, "height": 40} for index in (1, 3, 4, 9)])
+        serial_path = os.path.join(self.dir.name, 'serial.pdf')
+        run_job(source, serial_path, plan)
+
+        engine = RedactionEngine(workers=2, max_pending=4, timeout=60, parallel_min_pages=2)
+        self.addCleanup(engine.shutdown)
+        output = os.path.join(self.dir.name, 'parallel.pdf')
+        applied, _ = engine.run(source, output, plan)
+        self.assertEqual(applied, 3)
+        self.assertEqual(engine.stats()['parallelJobs'], 1)
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ['in.pdf', 'parallel.pdf', 'serial.pdf', 'toc.pdf'])
+
+        with fitz.open(source) as original, fitz.open(serial_path) as serial, fitz.open(output) as parallel:
+            self.assertEqual(len(parallel), 6)
+            for index in range(6):
+                # 마스킹하지 않은 페이지는 원본, 마스킹한 페이지는 직렬 결과와 콘텐츠가 바이트 단위로 같음
+                expected = serial if index in (1, 3, 4) else original
+                self.assertEqual(parallel[index].read_contents(), expected[index].read_contents())
+            self.assertEqual(parallel.get_toc(), serial.get_toc())
+            self.assertEqual([link['page'] for link in parallel[0].get_links()], [3])
+            self.assertEqual([link['page'] for link in parallel[4].get_links()], [1])
+            # 교체된 원본 페이지의 콘텐츠가 파일에 남지 않음
+            for doc in (serial, parallel):
+                streams = {doc.xref_stream(xref) for xref in range(1, doc.xref_length())}
+                self.assertIn(original[0].read_contents(), streams)
+                self.assertNotIn(original[3].read_contents(), streams)
+
+    def test_split_pages(self):
+        self.assertEqual(split_pages([1, 2, 5, 8, 9], 2), [[1, 2, 5], [8, 9]])
+        self.assertEqual(split_pages([4], 3), [[4]])
+
+    def test_rejects_when_queue_full(self):
+        engine = RedactionEngine(workers=0, max_pending=0, timeout=60)
+        with self.assertRaises(EngineBusy):
+            engine.run(self.source, os.path.join(self.dir.name, 'out.pdf'), self.plan)
+        self.assertEqual(engine.stats()['rejected'], 1)
+
+    def test_expired_job_is_dropped(self):
+        output = os.path.join(self.dir.name, 'out.pdf')
+        with self.assertRaises(JobTimeout):
+            run_job(self.source, output, self.plan, deadline=0)
+        self.assertFalse(os.path.exists(output))
+
+
+class RedactionPlanTests(SimpleTestCase):
+    def test_parse_groups_by_page(self):
+        plan = RedactionPlan.parse([
+            {"pageIndex": 2, "x": 1, "y": 2, "width": 3, "height": 4},
+            {"pageIndex": 0, "x": 0, "y": 0, "width": 1.5, "height": 1, "color": -65536},
+            {"pageIndex": 2, "x": 5, "y": 5, "width": 1, "height": 1, "color": -1},
+            {"pageIndex": 1, "x": 5},
+            {"pageIndex": -1, "x": 0, "y": 0, "width": 1, "height": 1},
+        ])
+        self.assertEqual(plan.box_count, 3)
+        self.assertEqual(plan.page_indices(), [0, 2])
+        self.assertEqual(list(plan.rects(0)), [(0, 0, 1.5, 1, (1.0, 0.0, 0.0))])
+        self.assertEqual(list(plan.rects(2)), [(1, 2, 4, 6, (0.0, 0.0, 0.0)), (5, 5, 6, 6, (1.0, 1.0, 1.0))])
+
+    def test_parse_rejects_bad_types(self):
+        for redactions in [{}, ["x"], [{"pageIndex": True, "x": 0, "y": 0, "width": 1, "height": 1}],
+                           [{"pageIndex": 0, "x": "0", "y": 0, "width": 1, "height": 1}],
+                           [{"pageIndex": 0, "x": 0, "y": 0, "width": 1, "height": 1, "color": "red"}]]:
+            with self.subTest(redactions=redactions), self.assertRaises(RedactionPlanError):
+                RedactionPlan.parse(redactions)
+
+    def test_int_to_rgb(self):
+        self.assertEqual(int_to_rgb(-16777216), (0.0, 0.0, 0.0))
+        self.assertEqual(int_to_rgb(0xFF00FF00), (0.0, 1.0, 0.0))
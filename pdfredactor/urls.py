@@ -1,6 +1,10 @@
 from django.urls import path
-from .views import RedactPdfView
+from .views import RedactEngineStatsView, RedactJobCreateView, RedactJobDetailView, RedactJobDownloadView, RedactPdfView
 
 urlpatterns = [
     path('redact/', RedactPdfView.as_view(), name='redact_pdf'),
+    path('redact/jobs/', RedactJobCreateView.as_view(), name='redact_job_create'),
+    path('redact/jobs/<uuid:job_id>/', RedactJobDetailView.as_view(), name='redact_job_detail'),
+    path('redact/jobs/<uuid:job_id>/download/', RedactJobDownloadView.as_view(), name='redact_job_download'),
+    path('engine/stats/', RedactEngineStatsView.as_view(), name='redact_engine_stats'),
 ]
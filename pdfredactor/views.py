@@ -1,213 +1,174 @@
 import json
-import fitz  # PyMuPDF
-from io import BytesIO
+import os
+import tempfile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from django.http import FileResponse
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
+from django.urls import reverse
+from django.utils import timezone
+from .engine import EngineBusy, JobTimeout, get_engine
+from .jobs import TooManyJobs, create_job
+from .models import RedactionJob, RedactionJobStatus
+from .planner import RedactionPlan, RedactionPlanError
 
-class RedactPdfView(APIView):
+# 결과 PDF를 보낼 때 한 번에 읽는 크기
+OUTPUT_CHUNK_SIZE = 256 * 1024
+
+
+def authenticate_pro(request):
+    """API Key와 Pro JWT(리딤코드·기기)를 검증합니다.
+
+    성공하면 (RedeemCode, None), 실패하면 (None, 오류 Response)를 반환합니다.
+    """
+    # API Key 헤더 검증
+    from django.conf import settings
+    api_key = request.headers.get('X-Redact-Api-Key')
+    if not api_key or api_key != settings.REDACT_API_KEY:
+        return None, Response({
+            "message": "권한이 없습니다.",
+            "error_code": 1001
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    # JWT 토큰 검증
+    from redactor_pro_code_issuance.jwt_utils import verify_jwt_token
+    from redactor_pro_code_issuance.models import RedeemCode
+    
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None, Response({
+            "message": "인증이 필요합니다. 리딤코드를 등록해주세요.",
+            "error_code": 2001
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    # Bearer 토큰 추출
+    if not auth_header.startswith('Bearer '):
+        return None, Response({
+            "message": "유효하지 않은 인증 토큰입니다.",
+            "error_code": 2002
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    token = auth_header[7:]  # "Bearer " 이후 부분
+    payload = verify_jwt_token(token)
+    
+    if payload is None:
+        return None, Response({
+            "message": "유효하지 않은 인증 토큰입니다.",
+            "error_code": 2002
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    # DB에서 리딤코드의 현재 device_id 확인
+    redeem_code_str = payload.get('sub')
+    token_device_id = payload.get('device_id')
+    
+    try:
+        redeem_code = RedeemCode.objects.get(code=redeem_code_str)
+        if redeem_code.uuid != token_device_id:
+            return None, Response({
+                "message": "다른 기기에서 Pro 기능이 활성화되어 있습니다. 리딤코드를 다시 등록하면 다른 기기의 Pro 기능이 비활성화됩니다.",
+                "error_code": 2003
+            }, status=status.HTTP_401_UNAUTHORIZED)
+    except RedeemCode.DoesNotExist:
+        return None, Response({
+            "message": "유효하지 않은 인증 토큰입니다.",
+            "error_code": 2002
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    return redeem_code, None
+
+
+def parse_upload(request):
+    """file·redactions 파라미터를 검사합니다. (파일, redactions JSON, 계획, 오류 Response)를 반환합니다"""
+    file_obj = request.FILES.get('file')
+    redactions_json = request.data.get('redactions')
+
+    if not file_obj or not redactions_json:
+        return None, None, None, Response(
+            {
+                "message": "필수 파라미터(file, redactions)가 누락되었습니다.",
+                "error_code": 3001
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # 마스킹 데이터는 PDF를 열기 전에 한 번만 검사해 페이지별로 묶음
+    try:
+        plan = RedactionPlan.parse(json.loads(redactions_json))
+    except (json.JSONDecodeError, RedactionPlanError):
+        return None, None, None, Response(
+            {
+                "message": "마스킹 데이터(redactions) 형식이 올바르지 않습니다.",
+                "error_code": 3002
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return file_obj, redactions_json, plan, None
+
+
+class TemporaryUploadMixin:
+    def initialize_request(self, request, *args, **kwargs):
+        # 업로드 파일을 메모리에 올리지 않고 바로 임시 파일로 받음 (본문을 읽기 전에 설정해야 함)
+        request.upload_handlers = [TemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+class RedactPdfView(TemporaryUploadMixin, APIView):
     parser_classes = (MultiPartParser, FormParser)
 
     def post(self, request, *args, **kwargs):
-        # API Key 헤더 검증
         from django.conf import settings
-        api_key = request.headers.get('X-Redact-Api-Key')
-        if not api_key or api_key != settings.REDACT_API_KEY:
-             return Response({
-                "message": "권한이 없습니다.",
-                "error_code": 1001
-            }, status=status.HTTP_403_FORBIDDEN)
+        redeem_code, error = authenticate_pro(request)
+        if error:
+            return error
 
-        # JWT 토큰 검증
-        from redactor_pro_code_issuance.jwt_utils import verify_jwt_token
-        from redactor_pro_code_issuance.models import RedeemCode
-        
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
-            return Response({
-                "message": "인증이 필요합니다. 리딤코드를 등록해주세요.",
-                "error_code": 2001
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        # Bearer 토큰 추출
-        if not auth_header.startswith('Bearer '):
-            return Response({
-                "message": "유효하지 않은 인증 토큰입니다.",
-                "error_code": 2002
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        token = auth_header[7:]  # "Bearer " 이후 부분
-        payload = verify_jwt_token(token)
-        
-        if payload is None:
-            return Response({
-                "message": "유효하지 않은 인증 토큰입니다.",
-                "error_code": 2002
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        # DB에서 리딤코드의 현재 device_id 확인
-        redeem_code_str = payload.get('sub')
-        token_device_id = payload.get('device_id')
-        
+        file_obj, _, plan, error = parse_upload(request)
+        if error:
+            return error
+
+        output_path = None
         try:
-            redeem_code = RedeemCode.objects.get(code=redeem_code_str)
-            if redeem_code.uuid != token_device_id:
-                return Response({
-                    "message": "다른 기기에서 Pro 기능이 활성화되어 있습니다. 리딤코드를 다시 등록하면 다른 기기의 Pro 기능이 비활성화됩니다.",
-                    "error_code": 2003
-                }, status=status.HTTP_401_UNAUTHORIZED)
-        except RedeemCode.DoesNotExist:
-            return Response({
-                "message": "유효하지 않은 인증 토큰입니다.",
-                "error_code": 2002
-            }, status=status.HTTP_401_UNAUTHORIZED)
+            # 결과는 임시 파일에 저장하고 청크 단위로 스트리밍
+            fd, output_path = tempfile.mkstemp(suffix='.pdf', dir=settings.FILE_UPLOAD_TEMP_DIR)
+            os.close(fd)
+            # PyMuPDF 작업은 프로세스 풀에서 실행 (업로드 임시 파일 경로만 넘김)
+            get_engine().run(file_obj.temporary_file_path(), output_path, plan)
+            output_file = open(output_path, 'rb')
+            # 열린 파일은 삭제 후에도 읽을 수 있으므로 바로 지워 응답이 끝나면 디스크에서도 사라지게 함
+            os.unlink(output_path)
+            output_path = None
 
-        file_obj = request.FILES.get('file')
-        redactions_json = request.data.get('redactions')
+            response = FileResponse(
+                output_file,
+                as_attachment=True,
+                filename="redacted_result.pdf",
+                content_type="application/pdf"
+            )
+            response.block_size = OUTPUT_CHUNK_SIZE
+            return response
 
-        if not file_obj or not redactions_json:
+        except EngineBusy:
+            os.unlink(output_path)
             return Response(
                 {
-                    "message": "필수 파라미터(file, redactions)가 누락되었습니다.",
-                    "error_code": 3001
+                    "message": "처리 중인 문서가 많습니다. 잠시 후 다시 시도해주세요.",
+                    "error_code": 5003
                 },
-                status=status.HTTP_400_BAD_REQUEST
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '5'}
             )
-
-        try:
-            redactions = json.loads(redactions_json)
-        except json.JSONDecodeError:
+        except JobTimeout:
+            os.unlink(output_path)
             return Response(
                 {
-                    "message": "마스킹 데이터(redactions) 형식이 올바르지 않습니다.",
-                    "error_code": 3002
+                    "message": "문서 처리 시간이 초과되었습니다.",
+                    "error_code": 5002
                 },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        try:
-            # Open the PDF from memory
-            # file_obj.read() reads the entire file into bytes
-            doc = fitz.open(stream=file_obj.read(), filetype="pdf")
-
-            for item in redactions:
-                page_index = item.get('pageIndex')
-                x = item.get('x')
-                y = item.get('y')
-                width = item.get('width')
-                height = item.get('height')
-                # color is not strictly needed for redaction (it just sets the color of the box), 
-                # but we can use it if we want to customize the appearance before applying.
-                # For now, default black is fine or we can ignore it as apply_redactions handles the removal.
-                
-                if page_index is None or x is None or y is None or width is None or height is None:
-                    continue # Skip invalid items
-
-                if 0 <= page_index < len(doc):
-                    page = doc[page_index]
-                    # Create rectangle: (x0, y0, x1, y1)
-                    # Android coordinates are top-left origin, same as PyMuPDF default.
-                    rect = fitz.Rect(x, y, x + width, y + height)
-                    
-                    # Add redaction annotation
-                    # fill=(0, 0, 0) makes it black. 
-                    page.add_redact_annot(rect, fill=(0, 0, 0))
-            
-            # Apply redactions to the whole document
-            # apply_redactions() processes all pages by default if called on page? 
-            # Actually page.apply_redactions() is for a single page. 
-            # doc doesn't have apply_redactions. We need to apply per page or iterate.
-            # Let's iterate pages that were modified or just iterate all pages if we want to be safe, 
-            # but here we added annotations to specific pages.
-            # Wait, page.add_redact_annot adds to that specific page. 
-            # So we should call page.apply_redactions() on that page.
-            
-            # Optimization: Track modified pages to call apply_redactions only on them?
-            # Or just apply immediately in the loop? 
-            # Applying immediately in the loop might be problematic if multiple redactions are on the same page?
-            # No, apply_redactions() applies all pending redaction annotations on that page.
-            # So it's better to add all annotations first, then apply.
-            
-            # Let's group by page index
-            pages_to_redact = set()
-            for item in redactions:
-                page_index = item.get('pageIndex')
-                if page_index is not None and 0 <= page_index < len(doc):
-                    pages_to_redact.add(page_index)
-
-            # Re-iterate to add annotations (or do it in one pass if we are careful)
-            # Actually, we can just add annotations in the loop.
-            # Then iterate through unique pages and apply.
-            
-            # Reset doc stream position? No, we opened it in memory.
-            
-            # Let's re-structure the loop slightly for clarity
-            pass
-
-            # Re-implementation of the loop
-            # Helper to convert Android int color to PyMuPDF RGB tuple
-            def _int_to_rgb(color_int):
-                # Ensure 32-bit unsigned
-                color = color_int & 0xFFFFFFFF
-                # Extract components (AARRGGBB)
-                # alpha = (color >> 24) & 0xFF  # Unused for now
-                red = (color >> 16) & 0xFF
-                green = (color >> 8) & 0xFF
-                blue = color & 0xFF
-                # Return normalized tuple (0..1)
-                return (red / 255.0, green / 255.0, blue / 255.0)
-
-            for item in redactions:
-                page_index = item.get('pageIndex')
-                x = item.get('x')
-                y = item.get('y')
-                width = item.get('width')
-                height = item.get('height')
-                # Default to black (-16777216) if not provided
-                color_int = item.get('color', -16777216)
-
-                if page_index is not None and x is not None and y is not None and width is not None and height is not None:
-                     if 0 <= page_index < len(doc):
-                        page = doc[page_index]
-                        rect = fitz.Rect(x, y, x + width, y + height)
-                        
-                        rgb_color = _int_to_rgb(color_int)
-                        
-                        # Add redaction annotation with the specific color
-                        page.add_redact_annot(rect, fill=rgb_color)
-
-            # Apply redactions on pages that have them
-            # We can just iterate all pages or keep track. 
-            # Since we don't know which pages have annotations easily without tracking, 
-            # let's just track the indices we touched.
-            
-            # Actually, let's use the set we created mentally
-            pages_with_redactions = set()
-            for item in redactions:
-                 if 'pageIndex' in item:
-                     pages_with_redactions.add(item['pageIndex'])
-            
-            for page_idx in pages_with_redactions:
-                if 0 <= page_idx < len(doc):
-                    page = doc[page_idx]
-                    page.apply_redactions()
-
-            # Save to buffer
-            output_buffer = BytesIO()
-            doc.save(output_buffer)
-            doc.close()
-            output_buffer.seek(0)
-
-            return FileResponse(
-                output_buffer,
-                as_attachment=True,
-                filename="redacted_result.pdf",
-                content_type="application/pdf"
+                status=status.HTTP_504_GATEWAY_TIMEOUT
             )
-
         except Exception as e:
+            if output_path:
+                os.unlink(output_path)
             return Response(
                 {
                     "message": f"서버 내부 오류가 발생했습니다: {str(e)}",
@@ -215,3 +176,116 @@ class RedactPdfView(APIView):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class RedactEngineStatsView(APIView):
+    def get(self, request, *args, **kwargs):
+        # 대기열 깊이·처리량 등 엔진 지표 (API Key 필요). 요청을 받은 웹 서버 프로세스의 값
+        from django.conf import settings
+        api_key = request.headers.get('X-Redact-Api-Key')
+        if not api_key or api_key != settings.REDACT_API_KEY:
+            return Response({
+                "message": "권한이 없습니다.",
+                "error_code": 1001
+            }, status=status.HTTP_403_FORBIDDEN)
+        return Response(get_engine().stats())
+
+
+def job_response(job, status_code=status.HTTP_200_OK):
+    data = {
+        "job_id": str(job.id),
+        "status": job.status,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "expires_at": job.expires_at,
+    }
+    if job.status == RedactionJobStatus.DONE:
+        data["pages_applied"] = job.pages_applied
+        data["download_url"] = reverse('redact_job_download', args=[job.id])
+    elif job.status == RedactionJobStatus.FAILED:
+        data["message"] = job.error_message
+        data["error_code"] = job.error_code
+    return Response(data, status=status_code)
+
+
+def get_job(redeem_code, job_id):
+    """리딤코드 소유의 만료되지 않은 작업. 없으면 (None, 404 Response)"""
+    job = RedactionJob.objects.filter(pk=job_id, redeem_code=redeem_code, expires_at__gt=timezone.now()).first()
+    if job is None:
+        return None, Response({
+            "message": "작업을 찾을 수 없습니다. 만료되었을 수 있습니다.",
+            "error_code": 4001
+        }, status=status.HTTP_404_NOT_FOUND)
+    return job, None
+
+
+class RedactJobCreateView(TemporaryUploadMixin, APIView):
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        # 파일을 작업 폴더로 옮기고 바로 작업 id를 응답 (처리는 run_redaction_jobs 명령이 담당)
+        redeem_code, error = authenticate_pro(request)
+        if error:
+            return error
+
+        file_obj, redactions_json, _, error = parse_upload(request)
+        if error:
+            return error
+
+        try:
+            job = create_job(redeem_code, file_obj, redactions_json)
+        except TooManyJobs:
+            return Response({
+                "message": "처리 중인 작업이 너무 많습니다. 이전 작업이 끝난 뒤 다시 시도해주세요.",
+                "error_code": 4003
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response = job_response(job, status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('redact_job_detail', args=[job.id])
+        return response
+
+
+class RedactJobDetailView(APIView):
+    def get(self, request, job_id, *args, **kwargs):
+        redeem_code, error = authenticate_pro(request)
+        if error:
+            return error
+        job, error = get_job(redeem_code, job_id)
+        if error:
+            return error
+        response = job_response(job)
+        if job.status in (RedactionJobStatus.PENDING, RedactionJobStatus.RUNNING):
+            # 다음 상태 확인까지 기다릴 시간 (초)
+            response['Retry-After'] = '2'
+        return response
+
+
+class RedactJobDownloadView(APIView):
+    def get(self, request, job_id, *args, **kwargs):
+        redeem_code, error = authenticate_pro(request)
+        if error:
+            return error
+        job, error = get_job(redeem_code, job_id)
+        if error:
+            return error
+        if job.status != RedactionJobStatus.DONE:
+            return Response({
+                "message": "아직 결과를 내려받을 수 없습니다.",
+                "error_code": 4002,
+                "status": job.status
+            }, status=status.HTTP_409_CONFLICT)
+
+        try:
+            output_file = open(job.output_path, 'rb')
+        except FileNotFoundError:
+            return Response({
+                "message": "작업을 찾을 수 없습니다. 만료되었을 수 있습니다.",
+                "error_code": 4001
+            }, status=status.HTTP_404_NOT_FOUND)
+        response = FileResponse(
+            output_file,
+            as_attachment=True,
+            filename="redacted_result.pdf",
+            content_type="application/pdf"
+        )
+        response.block_size = OUTPUT_CHUNK_SIZE
+        return response
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Quiz
+from .models import Quiz, DailyQuizDeck
 
 # Register your models here.
-admin.site.register(Quiz)
\ No newline at end of file
+admin.site.register(Quiz)
+admin.site.register(DailyQuizDeck)
\ No newline at end of file
@@ -0,0 +1,57 @@
+import random
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from quiz.models import Quiz, QuizRevision
+from quiz.sampling import invalidate_pools, sample_encoded, sample_quizzes
+
+
+class Command(BaseCommand):
+    help = "랜덤 퀴즈 샘플링 벤치마크 (전체 로드 방식 vs 기본키 캐시 vs 인코딩 캐시). 생성한 데이터는 롤백됩니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--k', type=int, default=10, help="한 번에 뽑을 퀴즈 수")
+        parser.add_argument('--repeat', type=int, default=50, help="기본키 캐시 방식 반복 횟수")
+        parser.add_argument('--legacy-repeat', type=int, default=3, help="전체 로드 방식 반복 횟수")
+
+    def handle(self, *args, **options):
+        k = options['k']
+        self.stdout.write(f"{'rows':>10} {'legacy ms':>12} {'legacy MiB':>11} {'cold ms':>10} {'warm ms':>10} {'warm MiB':>9} {'encoded ms':>11}")
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._populate(size)
+                legacy_ms, legacy_mib = self._measure(
+                    lambda: random.sample(list(Quiz.objects.all()), k), options['legacy_repeat'])
+                invalidate_pools()
+                cold_ms, _ = self._measure(lambda: sample_quizzes(k), 1)
+                warm_ms, warm_mib = self._measure(lambda: sample_quizzes(k), options['repeat'])
+                sample_encoded(k)
+                encoded_ms, _ = self._measure(lambda: sample_encoded(k), options['repeat'])
+                self.stdout.write(
+                    f"{size:>10} {legacy_ms:>12.2f} {legacy_mib:>11.2f} {cold_ms:>10.2f} {warm_ms:>10.3f} {warm_mib:>9.3f} {encoded_ms:>11.3f}")
+                transaction.set_rollback(True)
+            invalidate_pools()
+
+    def _populate(self, size):
+        base = Quiz.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        batch = 5000
+        for start in range(0, size, batch):
+            # 97번째마다 번호를 건너뛰어 빈 번호가 있는 테이블을 재현
+            Quiz.objects.bulk_create(
+                Quiz(pk=base + i + i // 96, title=f"quiz {i}", body="x" * 200, answer=i % 4)
+                for i in range(start, min(start + batch, size))
+            )
+        QuizRevision.bump()
+
+    def _measure(self, func, repeat):
+        """평균 실행 시간(ms)과 최대 메모리(MiB)를 반환합니다."""
+        tracemalloc.start()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak / (1024 * 1024)
@@ -0,0 +1,63 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from quiz.models import DailyQuizDeck
+from quiz.sampling import QuizDeck, QuizPoolTooSmall
+
+
+class Command(BaseCommand):
+    help = "날짜별 퀴즈 덱을 미리 생성합니다. Quiz가 바뀌지 않았다면 기존 덱은 건너뜁니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="시작 날짜 (YYYY-MM-DD, 기본값: 오늘)")
+        parser.add_argument('--days', type=int, default=2, help="생성할 일수 (기본값: 오늘과 내일)")
+        parser.add_argument('--sizes', type=int, nargs='+', default=[5, 10, 20], help="덱 크기 목록")
+        parser.add_argument('--count', type=int, default=3, help="크기별 덱 개수")
+        parser.add_argument('--keep-days', type=int, default=7, help="이 일수보다 오래된 덱은 삭제")
+        parser.add_argument('--force', action='store_true', help="변경이 없어도 다시 생성")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                start = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD.")
+        else:
+            start = timezone.localdate()
+
+        created = updated = skipped = 0
+        for offset in range(options['days']):
+            date = start + datetime.timedelta(days=offset)
+            existing = {
+                (deck.size, deck.slot): deck
+                for deck in DailyQuizDeck.objects.filter(date=date).only('id', 'size', 'slot', 'revision')
+            }
+            for size in options['sizes']:
+                for slot in range(options['count']):
+                    try:
+                        deck = QuizDeck(size, seed=f"daily:{date.isoformat()}:{size}:{slot}")
+                    except QuizPoolTooSmall as e:
+                        self.stderr.write(f"Skipping size {size}: {e}")
+                        break
+
+                    current = existing.get((size, slot))
+                    if current and current.revision == deck.revision and not options['force']:
+                        skipped += 1
+                        continue
+                    if current:
+                        current.revision = deck.revision
+                        current.payload = deck.render().decode()
+                        current.save(update_fields=['revision', 'payload', 'updated_at'])
+                        updated += 1
+                    else:
+                        DailyQuizDeck.objects.create(
+                            date=date, size=size, slot=slot,
+                            revision=deck.revision, payload=deck.render().decode(),
+                        )
+                        created += 1
+
+        cutoff = start - datetime.timedelta(days=options['keep_days'])
+        deleted, _ = DailyQuizDeck.objects.filter(date__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Daily decks: {created} created, {updated} updated, {skipped} unchanged, {deleted} pruned."
+        ))
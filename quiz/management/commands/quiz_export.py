@@ -0,0 +1,46 @@
+import csv
+import json
+import time
+from django.core.management.base import BaseCommand
+from quiz.models import Quiz
+
+FIELDS = ('id', 'title', 'body', 'answer')
+
+
+class Command(BaseCommand):
+    help = "Quiz를 JSONL/CSV로 내보냅니다. 서버 측 이터레이터로 읽어 메모리 사용량이 일정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="출력 파일 경로 (기본값: 표준출력)")
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help="출력 형식 (기본값: 확장자로 판단, 표준출력은 jsonl)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="DB에서 한 번에 읽을 행 수")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        rows = Quiz.objects.order_by('pk').values_list(*FIELDS).iterator(chunk_size=options['chunk_size'])
+
+        stream = self.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        started = time.perf_counter()
+        count = 0
+        try:
+            if fmt == 'csv':
+                writer = csv.writer(stream)
+                writer.writerow(FIELDS)
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+            else:
+                for row in rows:
+                    stream.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + '\n')
+                    count += 1
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        # 표준출력은 데이터로 쓰일 수 있으므로 통계는 표준에러로 출력
+        self.stderr.write(
+            f"Exported {count} rows in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f} rows/s)",
+            style_func=self.style.SUCCESS,
+        )
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-18 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_quiz_answer_quiz_body'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
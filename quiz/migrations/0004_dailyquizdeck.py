@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_quizrevision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyQuizDeck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('size', models.PositiveIntegerField()),
+                ('slot', models.PositiveIntegerField(default=0)),
+                ('revision', models.PositiveBigIntegerField(help_text='생성 당시 QuizRevision')),
+                ('payload', models.TextField(help_text='QuizSerializer 결과 JSON 배열')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'size', 'slot'), name='unique_daily_quiz_deck')],
+            },
+        ),
+    ]
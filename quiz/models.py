@@ -1,7 +1,52 @@
 from django.db import models
+from django.db.models import F
 
 # Create your models here.
 class Quiz(models.Model):
     title = models.CharField(max_length=200)
     body = models.TextField(default='')
     answer = models.IntegerField(default=0)
+
+
+class QuizRevision(models.Model):
+    """Quiz 테이블 변경 카운터 (단일 행)
+
+    Quiz가 추가/수정/삭제될 때마다 1씩 증가하며,
+    각 워커의 캐시는 이 값이 바뀌었을 때만 다시 만들어집니다.
+    """
+    revision = models.PositiveBigIntegerField(default=0)
+
+    SINGLETON_PK = 1
+
+    @classmethod
+    def current(cls):
+        """현재 리비전 (행이 없으면 0)"""
+        revision = cls.objects.filter(pk=cls.SINGLETON_PK).values_list('revision', flat=True).first()
+        return revision or 0
+
+    @classmethod
+    def bump(cls):
+        """리비전을 1 증가시킵니다."""
+        updated = cls.objects.filter(pk=cls.SINGLETON_PK).update(revision=F('revision') + 1)
+        if not updated:
+            _, created = cls.objects.get_or_create(pk=cls.SINGLETON_PK, defaults={'revision': 1})
+            if not created:
+                cls.objects.filter(pk=cls.SINGLETON_PK).update(revision=F('revision') + 1)
+
+
+class DailyQuizDeck(models.Model):
+    """날짜별로 미리 만들어 둔 퀴즈 덱 (generate_daily_decks 명령으로 생성)"""
+    date = models.DateField()
+    size = models.PositiveIntegerField()
+    slot = models.PositiveIntegerField(default=0)
+    revision = models.PositiveBigIntegerField(help_text="생성 당시 QuizRevision")
+    payload = models.TextField(help_text="QuizSerializer 결과 JSON 배열")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'size', 'slot'], name='unique_daily_quiz_deck'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} size={self.size} slot={self.slot}"
@@ -0,0 +1,177 @@
+import hashlib
+import random
+import threading
+import time
+from array import array
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from .models import Quiz, QuizRevision
+from .serializers import QuizSerializer
+
+
+class QuizPoolTooSmall(Exception):
+    """요청한 퀴즈 수가 전체 퀴즈 수보다 많을 때 발생"""
+
+    def __init__(self, requested, available):
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Requested {requested} quizzes but only {available} are available.")
+
+
+class RevisionCachedPool:
+    """QuizRevision이 바뀔 때만 다시 만들어지는 워커 단위 캐시
+
+    같은 워커의 변경은 시그널로 즉시 무효화되고, 다른 워커의 변경은
+    QUIZ_POOL_CHECK_INTERVAL 초마다 QuizRevision을 확인해 반영합니다.
+    하위 클래스는 build()에서 캐시할 값을 만들어 반환합니다.
+    """
+
+    def __init__(self, empty):
+        self._lock = threading.Lock()
+        # (revision, value)를 한 번에 교체해 두 값이 어긋나지 않게 함
+        self._state = (None, empty)
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.last_build_seconds = 0.0
+
+    def build(self):
+        raise NotImplementedError
+
+    def invalidate(self):
+        with self._lock:
+            self._state = (None, self._state[1])
+
+    def snapshot(self):
+        """최신 상태의 (revision, 캐시 값)을 반환합니다 (필요하면 다시 만듦)."""
+        now = time.monotonic()
+        interval = getattr(settings, 'QUIZ_POOL_CHECK_INTERVAL', 1.0)
+        state = self._state
+        if state[0] is not None and now - self._checked_at < interval:
+            self.hits += 1
+            return state
+
+        revision = QuizRevision.current()
+        with self._lock:
+            if revision != self._state[0]:
+                self.misses += 1
+                started = time.perf_counter()
+                self._state = (revision, self.build())
+                self.last_build_seconds = time.perf_counter() - started
+                self.rebuilds += 1
+            else:
+                self.hits += 1
+            self._checked_at = now
+            return self._state
+
+    def get(self):
+        return self.snapshot()[1]
+
+    def stats(self):
+        revision, value = self._state
+        return {
+            'revision': revision,
+            'size': len(value),
+            'hits': self.hits,
+            'misses': self.misses,
+            'rebuilds': self.rebuilds,
+            'last_build_seconds': round(self.last_build_seconds, 4),
+        }
+
+
+class QuizIdPool(RevisionCachedPool):
+    """Quiz 기본키를 압축 배열(array)로 보관 (오름차순, 빈 번호 허용)"""
+
+    def __init__(self):
+        super().__init__(array('q'))
+
+    def build(self):
+        pks = Quiz.objects.order_by('pk').values_list('pk', flat=True)
+        return array('q', pks.iterator(chunk_size=10000))
+
+    def ids(self):
+        return self.get()
+
+
+class EncodedQuizPool(RevisionCachedPool):
+    """QuizSerializer 결과를 JSON 바이트로 미리 인코딩해 보관
+
+    랜덤 API는 항목을 고르고 바이트를 이어 붙이기만 하므로
+    요청마다 ORM 조회나 직렬화가 일어나지 않습니다.
+    """
+
+    def __init__(self):
+        super().__init__([])
+
+    def build(self):
+        renderer = JSONRenderer()
+        quizzes = Quiz.objects.order_by('pk').iterator(chunk_size=2000)
+        return [renderer.render(QuizSerializer(quiz).data) for quiz in quizzes]
+
+    def entries(self):
+        return self.get()
+
+
+quiz_id_pool = QuizIdPool()
+encoded_quiz_pool = EncodedQuizPool()
+
+
+def invalidate_pools():
+    quiz_id_pool.invalidate()
+    encoded_quiz_pool.invalidate()
+
+
+def sample_quizzes(k, rng=None):
+    """Quiz 모델 객체 k개를 무작위로 뽑아 반환합니다.
+
+    캐시된 기본키 배열에서 k개를 고른 뒤 pk__in 쿼리 한 번으로 가져오므로
+    비용이 테이블 크기가 아닌 k에 비례합니다.
+    """
+    rng = rng or random
+    for _ in range(2):
+        ids = quiz_id_pool.ids()
+        if k > len(ids):
+            raise QuizPoolTooSmall(k, len(ids))
+        picked = rng.sample(ids, k)
+        quizzes = Quiz.objects.in_bulk(picked)
+        if len(quizzes) == k:
+            return [quizzes[pk] for pk in picked]
+        # 다른 워커에서 삭제된 행이 뽑혔다면 캐시를 버리고 한 번 더 시도
+        quiz_id_pool.invalidate()
+    return [quizzes[pk] for pk in picked if pk in quizzes]
+
+
+def _join_sample(entries, k, rng):
+    if k > len(entries):
+        raise QuizPoolTooSmall(k, len(entries))
+    return b'[' + b','.join(entries[i] for i in rng.sample(range(len(entries)), k)) + b']'
+
+
+def sample_encoded(k, rng=None):
+    """퀴즈 k개를 무작위로 뽑아 JSON 배열 바이트로 반환합니다."""
+    return _join_sample(encoded_quiz_pool.entries(), k, rng or random)
+
+
+class QuizDeck:
+    """시드로 고정된 퀴즈 묶음
+
+    같은 시드와 같은 Quiz 리비전이면 항상 같은 퀴즈가 같은 순서로 나오므로
+    (리비전, 개수, 시드)로 만든 강한 ETag로 캐시할 수 있습니다.
+    본문은 필요할 때만 만들어 304 응답에는 비용이 들지 않습니다.
+    """
+
+    def __init__(self, k, seed):
+        self.k = k
+        self.seed = seed
+        self.revision, self._entries = encoded_quiz_pool.snapshot()
+        if k > len(self._entries):
+            raise QuizPoolTooSmall(k, len(self._entries))
+
+    @property
+    def etag(self):
+        seed_hash = hashlib.sha256(self.seed.encode()).hexdigest()[:16]
+        return f'"quiz-deck-{self.revision}-{self.k}-{seed_hash}"'
+
+    def render(self):
+        return _join_sample(self._entries, self.k, random.Random(self.seed))
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Quiz, QuizRevision
+from .sampling import invalidate_pools
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, **kwargs):
+    """Quiz 변경 시 리비전을 올리고 현재 워커의 캐시를 비웁니다."""
+    QuizRevision.bump()
+    invalidate_pools()
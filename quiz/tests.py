@@ -1,3 +1,252 @@
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command, CommandError
 from django.test import TestCase
+from .models import DailyQuizDeck, Quiz, QuizRevision
+from .serializers import QuizSerializer
+from .sampling import (
+    encoded_quiz_pool, invalidate_pools, sample_encoded, sample_quizzes, QuizPoolTooSmall,
+)
 
-# Create your tests here.
+
+class QuizSamplingTests(TestCase):
+    def setUp(self):
+        invalidate_pools()
+        self.quizzes = [Quiz.objects.create(title=f"quiz {i}", answer=i) for i in range(10)]
+
+    def test_sample_returns_distinct_quizzes(self):
+        picked = sample_quizzes(5)
+        self.assertEqual(len(picked), 5)
+        self.assertEqual(len({quiz.pk for quiz in picked}), 5)
+
+    def test_sample_with_id_gaps(self):
+        """삭제로 빈 번호가 생겨도 존재하는 행만 뽑음"""
+        for quiz in self.quizzes[::2]:
+            quiz.delete()
+        picked = sample_quizzes(5, rng=random.Random(1))
+        self.assertEqual({quiz.pk for quiz in picked}, {quiz.pk for quiz in self.quizzes[1::2]})
+
+    def test_sample_uses_two_queries_when_warm(self):
+        sample_quizzes(1)
+        with self.settings(QUIZ_POOL_CHECK_INTERVAL=0):
+            # 리비전 확인 1회 + pk__in 조회 1회
+            with self.assertNumQueries(2):
+                sample_quizzes(3)
+
+    def test_pool_refreshes_on_create(self):
+        sample_quizzes(1)
+        Quiz.objects.create(title="new quiz")
+        self.assertEqual(len(sample_quizzes(11)), 11)
+
+    def test_pool_refreshes_on_revision_change_from_other_worker(self):
+        sample_quizzes(1)
+        # 다른 워커의 변경은 시그널 없이 리비전만 바뀐 상태로 보임
+        Quiz.objects.bulk_create([Quiz(title="bulk")])
+        QuizRevision.bump()
+        with self.settings(QUIZ_POOL_CHECK_INTERVAL=0):
+            self.assertEqual(len(sample_quizzes(11)), 11)
+
+    def test_sample_too_many(self):
+        with self.assertRaises(QuizPoolTooSmall):
+            sample_quizzes(11)
+
+
+class EncodedQuizPoolTests(TestCase):
+    def setUp(self):
+        invalidate_pools()
+        for i in range(5):
+            Quiz.objects.create(title=f"퀴즈 {i}", body=f"body {i}", answer=i)
+
+    def test_encoded_matches_serializer(self):
+        data = json.loads(sample_encoded(5))
+        expected = QuizSerializer(Quiz.objects.all(), many=True).data
+        self.assertCountEqual(data, [dict(item) for item in expected])
+
+    def test_warm_pool_does_no_queries(self):
+        sample_encoded(1)
+        with self.assertNumQueries(0):
+            sample_encoded(3)
+
+    def test_pool_invalidated_on_update(self):
+        sample_encoded(1)
+        quiz = Quiz.objects.first()
+        quiz.title = "changed"
+        quiz.save()
+        titles = {item['title'] for item in json.loads(sample_encoded(5))}
+        self.assertIn("changed", titles)
+
+    def test_stats(self):
+        before = encoded_quiz_pool.stats()
+        sample_encoded(1)
+        sample_encoded(1)
+        stats = encoded_quiz_pool.stats()
+        self.assertEqual(stats['size'], 5)
+        self.assertEqual(stats['rebuilds'] - before['rebuilds'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+
+
+class RandomQuizViewTests(TestCase):
+    def setUp(self):
+        invalidate_pools()
+        for i in range(3):
+            Quiz.objects.create(title=f"quiz {i}", body="body", answer=i)
+
+    def test_random_quiz(self):
+        response = self.client.get('/api/quiz/2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(set(response.json()[0]), {'title', 'body', 'answer'})
+
+    def test_random_quiz_larger_than_pool(self):
+        response = self.client.get('/api/quiz/4/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_pool_stats(self):
+        self.client.get('/api/quiz/1/')
+        response = self.client.get('/api/quiz/pool/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['encodedPool']['size'], 3)
+
+
+class QuizDeckViewTests(TestCase):
+    def setUp(self):
+        invalidate_pools()
+        for i in range(20):
+            Quiz.objects.create(title=f"quiz {i}", answer=i % 4)
+
+    def test_same_seed_same_deck(self):
+        first = self.client.get('/api/quiz/5/', {'seed': 'abc'})
+        second = self.client.get('/api/quiz/5/', {'seed': 'abc'})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('public', first['Cache-Control'])
+
+    def test_different_seed_different_etag(self):
+        first = self.client.get('/api/quiz/5/', {'seed': 'abc'})
+        second = self.client.get('/api/quiz/5/', {'seed': 'xyz'})
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/quiz/5/', {'seed': 'abc'})['ETag']
+        response = self.client.get('/api/quiz/5/', {'seed': 'abc'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_quiz_revision(self):
+        etag = self.client.get('/api/quiz/5/', {'seed': 'abc'})['ETag']
+        Quiz.objects.create(title="new quiz")
+        response = self.client.get('/api/quiz/5/', {'seed': 'abc'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_seed_deck_larger_than_pool(self):
+        response = self.client.get('/api/quiz/21/', {'seed': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DailyQuizDeckTests(TestCase):
+    def setUp(self):
+        invalidate_pools()
+        for i in range(10):
+            Quiz.objects.create(title=f"quiz {i}", answer=i % 4)
+
+    def generate(self, *args):
+        call_command('generate_daily_decks', '--sizes', '3', '5', '--count', '2', *args, stdout=StringIO())
+
+    def test_generate_and_serve(self):
+        self.generate()
+        # 오늘과 내일, 크기 2종 x 2개
+        self.assertEqual(DailyQuizDeck.objects.count(), 8)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/quiz/daily/5/', {'slot': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_generate_is_incremental(self):
+        self.generate()
+        before = dict(DailyQuizDeck.objects.values_list('id', 'updated_at'))
+        self.generate()
+        self.assertEqual(dict(DailyQuizDeck.objects.values_list('id', 'updated_at')), before)
+
+        Quiz.objects.create(title="new quiz")
+        self.generate()
+        revisions = set(DailyQuizDeck.objects.values_list('revision', flat=True))
+        self.assertEqual(revisions, {QuizRevision.current()})
+
+    def test_missing_deck(self):
+        response = self.client.get('/api/quiz/daily/5/')
+        self.assertEqual(response.status_code, 404)
+
+
+class QuizImportExportTests(TestCase):
+    def setUp(self):
+        invalidate_pools()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_import_jsonl_in_batches(self):
+        with open(self.path('quizzes.jsonl'), 'w', encoding='utf-8') as f:
+            for i in range(25):
+                f.write(json.dumps({'title': f"퀴즈 {i}", 'body': 'body', 'answer': i % 4}, ensure_ascii=False) + '\n')
+        out = StringIO()
+        call_command('quiz_import', self.path('quizzes.jsonl'), '--batch-size', '10', stdout=out)
+        self.assertEqual(Quiz.objects.count(), 25)
+        self.assertIn('rows/s', out.getvalue())
+
+    def test_import_updates_existing_and_bumps_revision(self):
+        quiz = Quiz.objects.create(title="old", answer=1)
+        revision = QuizRevision.current()
+        with open(self.path('quizzes.csv'), 'w', encoding='utf-8', newline='') as f:
+            f.write(f"id,title,body,answer\n{quiz.pk},new,,2\n,other,b,3\n")
+        call_command('quiz_import', self.path('quizzes.csv'), stdout=StringIO())
+        quiz.refresh_from_db()
+        self.assertEqual((quiz.title, quiz.answer), ("new", 2))
+        self.assertEqual(Quiz.objects.count(), 2)
+        self.assertEqual(QuizRevision.current(), revision + 1)
+
+    def test_import_from_stdin(self):
+        with patch('sys.stdin', StringIO('{"title": "a"}\n{"title": "b", "answer": 1}\n')):
+            call_command('quiz_import', '-', stdout=StringIO())
+        self.assertEqual(sorted(Quiz.objects.values_list('title', flat=True)), ['a', 'b'])
+
+    def test_import_duplicate_ids_keep_last_row(self):
+        rows = '{"id": 7, "title": "a"}\n{"id": 7, "title": "b", "answer": 1}\n{"id": 7, "title": "c", "answer": 2}\n'
+        with patch('sys.stdin', StringIO(rows)):
+            call_command('quiz_import', '-', '--batch-size', '2', stdout=StringIO())
+        self.assertEqual(list(Quiz.objects.values_list('pk', 'title', 'answer')), [(7, 'c', 2)])
+
+    def test_import_invalid_row_rolls_back(self):
+        with patch('sys.stdin', StringIO('{"title": "a"}\n{"body": "no title"}\n')):
+            with self.assertRaisesMessage(CommandError, "Line 2"):
+                call_command('quiz_import', '-', '--batch-size', '1', stdout=StringIO())
+        self.assertFalse(Quiz.objects.exists())
+
+    def test_export_round_trip(self):
+        for i in range(5):
+            Quiz.objects.create(title=f"quiz {i}", body="line1\nline2", answer=i)
+        for fmt in ('jsonl', 'csv'):
+            path = self.path(f'quizzes.{fmt}')
+            err = StringIO()
+            call_command('quiz_export', path, '--chunk-size', '2', stderr=err)
+            self.assertIn('Exported 5 rows', err.getvalue())
+            expected = list(Quiz.objects.order_by('pk').values_list('title', 'body', 'answer'))
+            Quiz.objects.all().delete()
+            call_command('quiz_import', path, stdout=StringIO())
+            self.assertEqual(list(Quiz.objects.order_by('pk').values_list('title', 'body', 'answer')), expected)
+
+    def test_export_to_stdout(self):
+        Quiz.objects.create(title="quiz")
+        out = StringIO()
+        call_command('quiz_export', stdout=out, stderr=StringIO())
+        self.assertEqual(json.loads(out.getvalue())['title'], "quiz")
@@ -1,7 +1,9 @@
 from django.urls import path, include
-from .views import helloAPI, randomQuiz
+from .views import helloAPI, randomQuiz, dailyQuiz, quizPoolStats
 
 urlpatterns = [
     path("hello/", helloAPI),
+    path("daily/<int:size>/", dailyQuiz),
+    path("pool/stats/", quizPoolStats),
     path("<int:id>/", randomQuiz)
-]
\ No newline at end of file
+]
@@ -1,8 +1,13 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-from .models import Quiz
-from .serializers import QuizSerializer
-import random
+from .models import DailyQuizDeck
+from .sampling import sample_encoded, quiz_id_pool, encoded_quiz_pool, QuizDeck, QuizPoolTooSmall
+
+MAX_SEED_LENGTH = 128
 
 # Create your views here.
 @api_view(['GET'])
@@ -11,8 +16,51 @@ def helloAPI(request):
 
 @api_view(['GET'])
 def randomQuiz(request, id):
-    totalQuiz = Quiz.objects.all()
-    randomQuizs = random.sample(list(totalQuiz), id)
-    serializer = QuizSerializer(randomQuizs, many=True)
-    return Response(serializer.data)
+    seed = request.query_params.get('seed')
+    if seed is not None:
+        return quizDeck(request, id, seed)
+    try:
+        payload = sample_encoded(id)
+    except QuizPoolTooSmall as e:
+        return Response({"error": str(e)}, status=400)
+    # 미리 인코딩된 JSON 바이트를 그대로 응답
+    return HttpResponse(payload, content_type='application/json')
+
+def quizDeck(request, id, seed):
+    """시드 고정 덱: 같은 시드면 같은 퀴즈 묶음을 ETag와 함께 응답"""
+    if not seed or len(seed) > MAX_SEED_LENGTH:
+        return Response({"error": f"seed must be 1-{MAX_SEED_LENGTH} characters."}, status=400)
+    try:
+        deck = QuizDeck(id, seed)
+    except QuizPoolTooSmall as e:
+        return Response({"error": str(e)}, status=400)
 
+    if deck.etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(deck.render(), content_type='application/json')
+    response['ETag'] = deck.etag
+    response['Cache-Control'] = f'public, max-age={settings.QUIZ_DECK_MAX_AGE}'
+    return response
+
+@api_view(['GET'])
+def dailyQuiz(request, size):
+    """오늘의 덱: 미리 생성된 덱을 인덱스 조회 한 번으로 응답"""
+    try:
+        slot = int(request.query_params.get('slot', 0))
+    except ValueError:
+        return Response({"error": "Invalid slot format."}, status=400)
+
+    payload = DailyQuizDeck.objects.filter(
+        date=timezone.localdate(), size=size, slot=slot
+    ).values_list('payload', flat=True).first()
+    if payload is None:
+        return Response({"error": "daily deck is not generated"}, status=404)
+    return HttpResponse(payload, content_type='application/json')
+
+@api_view(['GET'])
+def quizPoolStats(request):
+    return Response({
+        'idPool': quiz_id_pool.stats(),
+        'encodedPool': encoded_quiz_pool.stats(),
+    })
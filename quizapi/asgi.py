@@ -3,6 +3,11 @@ ASGI config for quizapi project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+LLM 엔드포인트(추천/상담)는 async 뷰이므로 ASGI 워커로 실행해야
+한 워커가 여러 모델 호출을 동시에 기다릴 수 있습니다.
+
+    gunicorn quizapi.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
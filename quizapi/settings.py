@@ -59,6 +59,7 @@ INSTALLED_APPS = [
     'movie_recommendation',
     'movie_worldcup',
     'counchillor',
+    'llm',
     'rest_framework',
     'pdfredactor',
     'redactor_pro_code_issuance',
@@ -109,6 +110,15 @@ DATABASES = {
 }
 
 
+# Cache
+# 워커 간에 무효화가 공유되도록 기본값은 파일 기반 캐시
+# (예: CACHE_URL=redis://127.0.0.1:6379/1)
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default=f'filecache://{BASE_DIR / "django_cache"}'),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -157,6 +167,20 @@ MEDIA_URL = '/media/'
 # Redeem Code API Key
 REDEEM_API_KEY = env('REDEEM_API_KEY', default='')
 REDACT_API_KEY = env('REDACT_API_KEY', default='')
+# PDF 마스킹 프로세스 풀: 워커 수(0이면 요청 스레드에서 처리), 대기 가능한 작업 수, 작업 제한 시간(초), 워커 교체 주기(작업 수)
+# 풀과 대기열은 웹 서버 프로세스마다 따로 생기므로 기본 워커 수는 CPU 수를 WEB_CONCURRENCY(gunicorn 워커 수)로 나눈 값
+PDF_REDACT_WORKERS = env.int(
+    'PDF_REDACT_WORKERS', default=max(1, min(4, os.cpu_count() or 1) // env.int('WEB_CONCURRENCY', default=1)))
+PDF_REDACT_MAX_PENDING = env.int('PDF_REDACT_MAX_PENDING', default=16)
+PDF_REDACT_TIMEOUT = env.float('PDF_REDACT_TIMEOUT', default=60.0)
+PDF_REDACT_MAX_TASKS_PER_CHILD = env.int('PDF_REDACT_MAX_TASKS_PER_CHILD', default=50)
+# 마스킹할 페이지가 이 수 이상인 문서는 페이지 구간을 워커들에 나눠 처리한 뒤 합침 (0이면 사용 안 함, 워커 2개 이상 필요)
+PDF_REDACT_PARALLEL_MIN_PAGES = env.int('PDF_REDACT_PARALLEL_MIN_PAGES', default=0)
+# 비동기 마스킹 작업: 원본·결과 보관 폴더, 보관 기간(초), 리딤코드별 동시 대기 작업 수, 작업 워커의 확인 주기(초)
+PDF_REDACT_JOB_DIR = env('PDF_REDACT_JOB_DIR', default=os.path.join(BASE_DIR, 'redaction_jobs'))
+PDF_REDACT_JOB_TTL = env.int('PDF_REDACT_JOB_TTL', default=60 * 60)
+PDF_REDACT_JOB_MAX_ACTIVE = env.int('PDF_REDACT_JOB_MAX_ACTIVE', default=3)
+PDF_REDACT_JOB_POLL_INTERVAL = env.float('PDF_REDACT_JOB_POLL_INTERVAL', default=1.0)
 
 # Ko-fi Settings
 KOFI_VERIFICATION_TOKEN = env('KOFI_VERIFICATION_TOKEN', default='')
@@ -187,3 +211,64 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
     ],
 }
+
+# Quiz Settings
+# 다른 워커에서 변경된 Quiz를 확인하는 주기 (초)
+QUIZ_POOL_CHECK_INTERVAL = env.float('QUIZ_POOL_CHECK_INTERVAL', default=1.0)
+# 시드 고정 퀴즈 덱 응답의 Cache-Control max-age (초)
+QUIZ_DECK_MAX_AGE = env.int('QUIZ_DECK_MAX_AGE', default=60)
+
+# World Cup Settings
+# 이번 달 월드컵 목록 캐시 유지 시간 (초). 지난 달 목록은 변경 시에만 무효화
+WORLDCUP_CURRENT_MONTH_CACHE_TTL = env.int('WORLDCUP_CURRENT_MONTH_CACHE_TTL', default=60)
+# 업로드 이미지의 리사이즈 변형본 너비 (WebP/JPEG)
+WORLDCUP_IMAGE_WIDTHS = (160, 320, 640)
+# 변형본을 만드는 프로세스 수 (0이면 요청 프로세스에서 바로 처리)
+WORLDCUP_IMAGE_WORKERS = env.int('WORLDCUP_IMAGE_WORKERS', default=2)
+# 대기 가능한 변형본 작업 수 (넘치면 건너뛰고 worldcup_image_variants 명령으로 보충)
+WORLDCUP_IMAGE_QUEUE_SIZE = env.int('WORLDCUP_IMAGE_QUEUE_SIZE', default=32)
+# 월드컵 대결 결과를 모아서 DB에 반영하는 기준 (결과 수 / 초)
+WORLDCUP_VOTE_FLUSH_SIZE = env.int('WORLDCUP_VOTE_FLUSH_SIZE', default=50)
+WORLDCUP_VOTE_FLUSH_INTERVAL = env.float('WORLDCUP_VOTE_FLUSH_INTERVAL', default=5.0)
+
+# LLM (Claude API) Settings
+LLM_API_URL = env('X_API_URL', default='')
+LLM_API_KEY = env('X_API_KEY', default='')
+LLM_MODEL = env('LLM_MODEL', default='claude-3-5-sonnet-20241022')
+LLM_CONNECT_TIMEOUT = env.float('LLM_CONNECT_TIMEOUT', default=5.0)
+LLM_READ_TIMEOUT = env.float('LLM_READ_TIMEOUT', default=60.0)
+LLM_MAX_RETRIES = env.int('LLM_MAX_RETRIES', default=2)
+# 워커(이벤트 루프)당 업스트림 최대 동시 연결 수
+LLM_MAX_CONNECTIONS = env.int('LLM_MAX_CONNECTIONS', default=100)
+# 프롬프트 파일 변경 확인 주기 (초)
+LLM_PROMPT_CHECK_INTERVAL = env.float('LLM_PROMPT_CHECK_INTERVAL', default=1.0)
+# 영화 추천 응답 캐시: 메모리 LRU 항목 수, DB 계층 TTL (초)
+LLM_CACHE_MAX_ENTRIES = env.int('LLM_CACHE_MAX_ENTRIES', default=1024)
+LLM_CACHE_TTL = env.int('LLM_CACHE_TTL', default=60 * 60 * 24)
+# 동일 요청 합치기: 워커 간 잠금 테이블 사용 여부, 잠금 만료(초), 결과 공유 기간(초), 대기 중 확인 주기(초)
+LLM_SINGLEFLIGHT_CROSS_WORKER = env.bool('LLM_SINGLEFLIGHT_CROSS_WORKER', default=False)
+LLM_SINGLEFLIGHT_LOCK_TTL = env.int('LLM_SINGLEFLIGHT_LOCK_TTL', default=180)
+LLM_SINGLEFLIGHT_RESULT_TTL = env.int('LLM_SINGLEFLIGHT_RESULT_TTL', default=30)
+LLM_SINGLEFLIGHT_POLL_INTERVAL = env.float('LLM_SINGLEFLIGHT_POLL_INTERVAL', default=0.1)
+# 업스트림 벌크헤드: 워커당 동시 호출 수, 대기열 길이, 대기 시간 (초)
+LLM_MAX_CONCURRENT = env.int('LLM_MAX_CONCURRENT', default=20)
+LLM_MAX_WAITING = env.int('LLM_MAX_WAITING', default=20)
+LLM_QUEUE_TIMEOUT = env.float('LLM_QUEUE_TIMEOUT', default=2.0)
+# 서킷 브레이커: window초 안에 min_calls번 이상 호출 중 실패(오류 + 느린 호출) 비율이 넘으면 open_seconds 동안 차단
+LLM_BREAKER_WINDOW = env.int('LLM_BREAKER_WINDOW', default=30)
+LLM_BREAKER_MIN_CALLS = env.int('LLM_BREAKER_MIN_CALLS', default=10)
+LLM_BREAKER_FAILURE_RATIO = env.float('LLM_BREAKER_FAILURE_RATIO', default=0.5)
+LLM_BREAKER_SLOW_CALL_SECONDS = env.float('LLM_BREAKER_SLOW_CALL_SECONDS', default=30.0)
+LLM_BREAKER_OPEN_SECONDS = env.int('LLM_BREAKER_OPEN_SECONDS', default=30)
+# 로컬(공동 출현) 추천: 인덱스 변경 확인 주기(초), 영화별 이웃 수, 추천 후보 수
+MOVIE_RECOMMENDER_CHECK_INTERVAL = env.float('MOVIE_RECOMMENDER_CHECK_INTERVAL', default=60.0)
+MOVIE_RECOMMENDER_NEIGHBORS = env.int('MOVIE_RECOMMENDER_NEIGHBORS', default=50)
+MOVIE_RECOMMENDER_CANDIDATES = env.int('MOVIE_RECOMMENDER_CANDIDATES', default=10)
+# 학습에 반영된 시청 기록의 보관 기간(일). prune_viewing_history 명령이 이보다 오래된 기록을 삭제
+MOVIE_HISTORY_RETENTION_DAYS = env.int('MOVIE_HISTORY_RETENTION_DAYS', default=30)
+# 상담 세션: 만료(초, 턴마다 연장), 맥락 토큰 예산, 보관할 최근 턴 수, 요약·한 턴 최대 글자 수
+LLM_SESSION_TTL = env.int('LLM_SESSION_TTL', default=60 * 60 * 24 * 7)
+LLM_SESSION_CONTEXT_TOKENS = env.int('LLM_SESSION_CONTEXT_TOKENS', default=1500)
+LLM_SESSION_KEEP_TURNS = env.int('LLM_SESSION_KEEP_TURNS', default=20)
+LLM_SESSION_SUMMARY_CHARS = env.int('LLM_SESSION_SUMMARY_CHARS', default=1000)
+LLM_SESSION_MAX_TURN_CHARS = env.int('LLM_SESSION_MAX_TURN_CHARS', default=2000)